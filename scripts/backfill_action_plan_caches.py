@@ -0,0 +1,39 @@
+import asyncio
+from datetime import datetime
+
+import typer
+
+from skyvern.forge.app import DATABASE
+from skyvern.webeye.actions.caching import build_action_plan_key
+
+
+async def backfill_action_plan_caches(batch_size: int) -> None:
+    """
+    Cache the action plans of the tasks completed before the action_plan_caches table existed.
+    The tasks are read from the newest to the oldest and a plan key is only inserted if it's missing, so the plan of
+    the latest task wins, including a task completing while the backfill runs.
+    """
+    before: tuple[datetime, str] | None = None
+    task_count = 0
+    while tasks := await DATABASE.get_completed_tasks_with_navigation_goal(limit=batch_size, before=before):
+        for task in tasks:
+            if not task.url or not task.navigation_goal:
+                continue
+            await DATABASE.upsert_action_plan_cache(
+                plan_key=build_action_plan_key(task.url, task.navigation_goal),
+                task_id=task.task_id,
+                url=task.url,
+                navigation_goal=task.navigation_goal,
+                keep_existing=True,
+            )
+        task_count += len(tasks)
+        before = (tasks[-1].created_at, tasks[-1].task_id)
+        print(f"Backfilled the action plans of {task_count} tasks, up to {before[0].isoformat()}")
+
+
+def main(batch_size: int = typer.Option(1000, help="Number of tasks read per query")) -> None:
+    asyncio.run(backfill_action_plan_caches(batch_size))
+
+
+if __name__ == "__main__":
+    typer.run(main)
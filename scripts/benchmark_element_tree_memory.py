@@ -0,0 +1,65 @@
+import copy
+import json
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+import typer
+
+from skyvern.forge.sdk.core import skyvern_context
+from skyvern.forge.sdk.core.skyvern_context import SkyvernContext
+from skyvern.webeye.scraper.scraper import (
+    build_economy_element_tree,
+    copy_element_tree,
+    json_to_html,
+    trim_element_tree,
+)
+
+
+def deepcopy_pipeline(element_tree: list[dict]) -> None:
+    """The element tree pipeline before the structural copies: every stage deep-copies the tree."""
+    cleaned_tree = copy.deepcopy(element_tree)
+    trimmed_tree = trim_element_tree(copy.deepcopy(cleaned_tree))
+    economy_tree = copy.deepcopy(trimmed_tree)
+    "".join(json_to_html(element) for element in trimmed_tree)
+    "".join(json_to_html(element) for element in economy_tree)
+
+
+def structural_copy_pipeline(element_tree: list[dict]) -> None:
+    cleaned_tree = copy_element_tree(element_tree)
+    trimmed_tree = trim_element_tree(copy_element_tree(cleaned_tree))
+    economy_tree = build_economy_element_tree(trimmed_tree)
+    "".join(json_to_html(element) for element in trimmed_tree)
+    "".join(json_to_html(element) for element in economy_tree)
+
+
+def measure(pipeline: Callable[[list[dict]], None], element_tree: list[dict]) -> tuple[float, float]:
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    pipeline(element_tree)
+    elapsed = time.perf_counter() - start_time
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024 / 1024, elapsed
+
+
+def main(
+    snapshot_paths: list[Path] = typer.Argument(
+        ..., help="Saved element trees, eg: the visible_elements_tree artifacts of a task"
+    ),
+) -> None:
+    """Compare the memory peak of the element tree pipeline on saved page snapshots."""
+    skyvern_context.set(SkyvernContext())
+    for snapshot_path in snapshot_paths:
+        element_tree = json.loads(snapshot_path.read_text())
+        deepcopy_peak, deepcopy_time = measure(deepcopy_pipeline, element_tree)
+        structural_peak, structural_time = measure(structural_copy_pipeline, element_tree)
+        print(
+            f"{snapshot_path.name}: deepcopy {deepcopy_peak:.2f}MB/{deepcopy_time * 1000:.0f}ms, "
+            f"structural copy {structural_peak:.2f}MB/{structural_time * 1000:.0f}ms"
+        )
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,55 @@
+import subprocess
+import sys
+
+import typer
+
+# the entrypoints that should start without building the app services
+DEFAULT_MODULES = ["skyvern", "skyvern.cli.commands"]
+
+
+def measure_import_time(module: str) -> tuple[float, list[tuple[float, str]]]:
+    """
+    Import the module in a fresh interpreter with `-X importtime`.
+
+    :return: the cumulative import time of the module in ms, and the self time in ms of every imported module.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total_ms = 0.0
+    self_times: list[tuple[float, str]] = []
+    # import time: self [us] | cumulative | imported package
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        self_times.append((int(self_us) / 1000, name.strip()))
+        if name.strip() == module:
+            total_ms = int(cumulative_us) / 1000
+    return total_ms, self_times
+
+
+def main(
+    modules: list[str] = typer.Argument(None, help="The modules to import, the package and the CLI by default"),
+    budget_ms: float = typer.Option(1000, help="Fail if a module takes longer than this to import"),
+    top: int = typer.Option(10, help="The number of slowest imports to show"),
+) -> None:
+    """Measure the import time of the skyvern entrypoints and check them against a budget."""
+    over_budget = False
+    for module in modules or DEFAULT_MODULES:
+        total_ms, self_times = measure_import_time(module)
+        print(f"{module}: {total_ms:.0f}ms ({len(self_times)} modules)")
+        for self_ms, name in sorted(self_times, reverse=True)[:top]:
+            print(f"    {self_ms:8.1f}ms  {name}")
+        if total_ms > budget_ms:
+            print(f"{module} is over the budget of {budget_ms:.0f}ms")
+            over_budget = True
+    if over_budget:
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -6,10 +6,32 @@ const app = express();
 
 app.use(cors());
 
+// while the run is in progress the recording is uploaded in parts, listed in a manifest next to the video
+function getRecordingParts(path) {
+  if (fs.existsSync(path)) {
+    return [{ path, offset: 0, size: fs.statSync(path).size }];
+  }
+  const manifestPath = `${path}.parts/manifest.json`;
+  if (!fs.existsSync(manifestPath)) {
+    return [];
+  }
+  const manifest = JSON.parse(fs.readFileSync(manifestPath));
+  return manifest.parts.map((part) => ({
+    path: part.uri.replace(/^file:\/\//, ""),
+    offset: part.offset,
+    size: part.size,
+  }));
+}
+
 app.get("/artifact/recording", (req, res) => {
   const range = req.headers.range;
   const path = req.query.path;
-  const videoSize = fs.statSync(path).size;
+  const parts = getRecordingParts(path);
+  if (parts.length === 0) {
+    res.status(404).send("Recording not found");
+    return;
+  }
+  const videoSize = parts.reduce((size, part) => size + part.size, 0);
   const chunkSize = 1 * 1e6;
   const start = Number(range.replace(/\D/g, ""));
   const end = Math.min(start + chunkSize, videoSize - 1);
@@ -21,11 +43,18 @@ app.get("/artifact/recording", (req, res) => {
     "Content-Type": "video/mp4",
   };
   res.writeHead(206, headers);
-  const stream = fs.createReadStream(path, {
-    start,
-    end,
-  });
-  stream.pipe(res);
+  const chunks = parts
+    .filter((part) => part.offset <= end && part.offset + part.size > start)
+    .map((part) => {
+      const partStart = Math.max(start - part.offset, 0);
+      const partEnd = Math.min(end - part.offset, part.size - 1);
+      const buffer = Buffer.alloc(partEnd - partStart + 1);
+      const fd = fs.openSync(part.path, "r");
+      fs.readSync(fd, buffer, 0, buffer.length, partStart);
+      fs.closeSync(fd);
+      return buffer;
+    });
+  res.end(Buffer.concat(chunks));
 });
 
 app.get("/artifact/image", (req, res) => {
@@ -87,12 +87,24 @@ function TaskActions() {
       socket = new WebSocket(
         `${wssBaseUrl}/stream/tasks/${taskId}${credential}`,
       );
+      socket.binaryType = "blob";
       // Listen for messages
       socket.addEventListener("message", (event) => {
+        if (event.data instanceof Blob) {
+          // live view frames are sent as binary jpeg
+          const frameUrl = URL.createObjectURL(event.data);
+          setStreamImgSrc((previousSrc) => {
+            if (previousSrc.startsWith("blob:")) {
+              URL.revokeObjectURL(previousSrc);
+            }
+            return frameUrl;
+          });
+          return;
+        }
         try {
           const message: StreamMessage = JSON.parse(event.data);
           if (message.screenshot) {
-            setStreamImgSrc(message.screenshot);
+            setStreamImgSrc(`data:image/png;base64,${message.screenshot}`);
           }
           if (
             message.status === "completed" ||
@@ -219,7 +231,7 @@ function TaskActions() {
     if (task?.status === Status.Running && streamImgSrc.length > 0) {
       return (
         <div className="h-full w-full">
-          <ZoomableImage src={`data:image/png;base64,${streamImgSrc}`} />
+          <ZoomableImage src={streamImgSrc} />
         </div>
       );
     }
@@ -47,12 +47,24 @@ function WorkflowRunStream() {
       socket = new WebSocket(
         `${wssBaseUrl}/stream/workflow_runs/${workflowRunId}${credential}`,
       );
+      socket.binaryType = "blob";
       // Listen for messages
       socket.addEventListener("message", (event) => {
+        if (event.data instanceof Blob) {
+          // live view frames are sent as binary jpeg
+          const frameUrl = URL.createObjectURL(event.data);
+          setStreamImgSrc((previousSrc) => {
+            if (previousSrc.startsWith("blob:")) {
+              URL.revokeObjectURL(previousSrc);
+            }
+            return frameUrl;
+          });
+          return;
+        }
         try {
           const message: StreamMessage = JSON.parse(event.data);
           if (message.screenshot) {
-            setStreamImgSrc(message.screenshot);
+            setStreamImgSrc(`data:image/png;base64,${message.screenshot}`);
           }
           if (
             message.status === "completed" ||
@@ -143,7 +155,7 @@ function WorkflowRunStream() {
     return (
       <div className="h-full w-full">
         <ZoomableImage
-          src={`data:image/png;base64,${streamImgSrc}`}
+          src={streamImgSrc}
           className="rounded-md"
         />
       </div>
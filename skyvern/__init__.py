@@ -1,20 +1,30 @@
-from ddtrace import tracer
-from ddtrace.filters import FilterRequestsOnUrl
+import importlib
+import typing
 
 from skyvern.forge.sdk.forge_log import setup_logger
 
-tracer.configure(
-    settings={
-        "FILTERS": [
-            FilterRequestsOnUrl(r"http://.*/heartbeat$"),
-        ],
-    },
-)
 setup_logger()
 
+if typing.TYPE_CHECKING:
+    from skyvern.agent import SkyvernAgent, SkyvernClient
+    from skyvern.forge.sdk.workflow.models.workflow import WorkflowRunResponseBase
+
+# the public classes pull in the agent and its services, they are imported on first access to keep `import skyvern`
+# (and the CLI) fast. See skyvern.forge.app for the services.
+_LAZY_IMPORTS = {
+    "SkyvernAgent": "skyvern.agent",
+    "SkyvernClient": "skyvern.agent",
+    "WorkflowRunResponseBase": "skyvern.forge.sdk.workflow.models.workflow",
+}
+
+
+def __getattr__(name: str) -> typing.Any:
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
 
-from skyvern.forge import app  # noqa: E402, F401
-from skyvern.agent import SkyvernAgent, SkyvernClient  # noqa: E402
-from skyvern.forge.sdk.workflow.models.workflow import WorkflowRunResponseBase  # noqa: E402
 
 __all__ = ["SkyvernAgent", "SkyvernClient", "WorkflowRunResponseBase"]
@@ -9,13 +9,9 @@ from pathlib import Path
 from typing import Optional
 from urllib.parse import urlparse
 
-import requests
 import typer
-import uvicorn
 from dotenv import load_dotenv, set_key
-from mcp.server.fastmcp import FastMCP
 
-from skyvern.agent import SkyvernAgent
 from skyvern.config import settings
 from skyvern.forge import app
 from skyvern.forge.sdk.db.enums import OrganizationAuthTokenType
@@ -28,10 +24,10 @@ run_app = typer.Typer()
 setup_app = typer.Typer()
 cli_app.add_typer(run_app, name="run")
 cli_app.add_typer(setup_app, name="setup")
-mcp = FastMCP("Skyvern")
 
 
-@mcp.tool()
+# the heavy dependencies (the agent, uvicorn, mcp, requests) are imported by the commands using them,
+# so `skyvern --help` and the other commands start fast
 async def skyvern_run_task(prompt: str, url: str) -> dict[str, str]:
     """Use Skyvern to execute anything in the browser. Useful for accomplishing tasks that require browser automation.
 
@@ -46,6 +42,8 @@ async def skyvern_run_task(prompt: str, url: str) -> dict[str, str]:
                NYC to LA", "Sign up for the newsletter", "Find the price of item X", "Apply to a job")
         url: The starting URL of the website where the task should be performed
     """
+    from skyvern.agent import SkyvernAgent
+
     skyvern_agent = SkyvernAgent(
         base_url=settings.SKYVERN_BASE_URL,
         api_key=settings.SKYVERN_API_KEY,
@@ -434,6 +432,8 @@ def get_default_chrome_location(host_system: str) -> str:
 
 def setup_browser_config() -> tuple[str, Optional[str], Optional[str]]:
     """Configure browser settings for Skyvern."""
+    import requests
+
     print("\nConfiguring web browser for scraping...")
     browser_types = ["chromium-headless", "chromium-headful", "cdp-connect"]
 
@@ -563,6 +563,8 @@ async def _setup_local_organization() -> str:
     """
     Returns the API key for the local organization generated
     """
+    from skyvern.agent import SkyvernAgent
+
     skyvern_agent = SkyvernAgent(
         base_url=settings.SKYVERN_BASE_URL,
         api_key=settings.SKYVERN_API_KEY,
@@ -867,6 +869,8 @@ def setup_mcp() -> None:
 def run_server() -> None:
     load_dotenv()
     load_dotenv(".env")
+    import uvicorn
+
     from skyvern.config import settings
 
     port = settings.PORT
@@ -878,6 +882,18 @@ def run_server() -> None:
     )
 
 
+@run_app.command(name="worker")
+def run_worker(
+    slots: int = typer.Option(settings.RUN_QUEUE_WORKER_SLOTS, help="The number of runs executed at the same time"),
+) -> None:
+    """Run a worker executing the runs of the run queue."""
+    load_dotenv()
+    load_dotenv(".env")
+    from skyvern.forge.sdk.executor.worker import run_worker as run_queue_worker
+
+    asyncio.run(run_queue_worker(slots=slots))
+
+
 @run_app.command(name="ui")
 def run_ui() -> None:
     # FIXME: This is untested and may not work
@@ -934,6 +950,10 @@ def run_ui() -> None:
 @run_app.command(name="mcp")
 def run_mcp() -> None:
     """Run the MCP server."""
+    from mcp.server.fastmcp import FastMCP
+
+    mcp = FastMCP("Skyvern")
+    mcp.add_tool(skyvern_run_task)
     mcp.run(transport="stdio")
 
 
@@ -1,3 +1,6 @@
+import os
+import tempfile
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 from skyvern import constants
@@ -12,7 +15,62 @@ class Settings(BaseSettings):
     BROWSER_TYPE: str = "chromium-headful"
     BROWSER_REMOTE_DEBUGGING_URL: str = "http://127.0.0.1:9222"
     CHROME_EXECUTABLE_PATH: str | None = None
+    # keep warm browser contexts per browser type, organization and proxy location, a run leases one instead of
+    # launching a browser. the pooled contexts don't record videos or hars, runs are only pooled when VIDEO_PATH and
+    # HAR_PATH are empty
+    BROWSER_POOL_ENABLED: bool = False
+    BROWSER_POOL_MIN_SIZE: int = 1
+    BROWSER_POOL_MAX_SIZE: int = 4
+    # contexts of all the keys in the process. when it's reached, the least recently used idle context is closed to
+    # make room for a new one
+    BROWSER_POOL_MAX_TOTAL_SIZE: int = 16
+    # close the contexts idle for longer than this, the pool doesn't keep contexts warm for an organization that left
+    BROWSER_POOL_IDLE_TIMEOUT_SECONDS: int = 300
+    # recycle a pooled context after serving this many runs
+    BROWSER_POOL_MAX_USES: int = 20
+    BROWSER_POOL_HEALTH_CHECK_TIMEOUT_MS: int = 2000
     MAX_SCRAPING_RETRIES: int = 0
+    # between the scrapes of a page, only build the elements again when the page changed them. the rects and the
+    # visibility of all the elements are still computed on every scrape
+    ENABLE_INCREMENTAL_SCRAPE: bool = False
+    # wait until the page has been quiet (network, DOM mutations, animations) for PAGE_SETTLE_QUIET_MS before scraping
+    PAGE_SETTLE_QUIET_MS: int = 500
+    PAGE_SETTLE_POLL_INTERVAL_MS: int = 100
+    PAGE_SETTLE_TIMEOUT_MS: int = 3000
+    PAGE_SETTLE_AFTER_SCROLL_TIMEOUT_MS: int = 2000
+    # artifact rows are inserted in batches, payloads are uploaded by a bounded pool of workers
+    ARTIFACT_BATCH_SIZE: int = 50
+    ARTIFACT_FLUSH_INTERVAL_MS: int = 1000
+    ARTIFACT_UPLOAD_CONCURRENCY: int = 8
+    ARTIFACT_MAX_PENDING_UPLOADS: int = 100
+    ARTIFACT_MAX_FLUSH_ATTEMPTS: int = 3
+    # the LLM usage of a step is summed in memory and written at the step boundary, or after the flush interval
+    STEP_USAGE_WRITE_BEHIND_ENABLED: bool = True
+    STEP_USAGE_FLUSH_INTERVAL_MS: int = 5000
+    # the runs are put in a postgres queue and executed by the run queue workers instead of the API process
+    RUN_QUEUE_ENABLED: bool = False
+    RUN_QUEUE_WORKER_SLOTS: int = 4
+    RUN_QUEUE_MAX_RUNNING_PER_ORGANIZATION: int | None = 10
+    RUN_QUEUE_LEASE_SECONDS: int = 120
+    RUN_QUEUE_HEARTBEAT_INTERVAL_SECONDS: int = 30
+    RUN_QUEUE_POLL_INTERVAL_SECONDS: float = 2
+    RUN_QUEUE_MAX_ATTEMPTS: int = 3
+    # the completed and failed entries of the queue are deleted after this long
+    RUN_QUEUE_FINISHED_RETENTION_HOURS: float = 24
+    # the webhooks are stored in an outbox and delivered by a background dispatcher, with retries
+    WEBHOOK_TIMEOUT_SECONDS: float = 30
+    WEBHOOK_MAX_ATTEMPTS: int = 8
+    WEBHOOK_RETRY_BASE_DELAY_SECONDS: float = 10
+    WEBHOOK_RETRY_MAX_DELAY_SECONDS: float = 3600
+    WEBHOOK_MAX_CONCURRENCY_PER_HOST: int = 5
+    WEBHOOK_MAX_IN_FLIGHT: int = 100
+    WEBHOOK_DISPATCH_POLL_INTERVAL_SECONDS: float = 5
+    WEBHOOK_DELIVERY_LEASE_SECONDS: int = 300
+    # the delivered and failed webhooks are deleted after this long, they can be queried through the api until then
+    WEBHOOK_DELIVERY_RETENTION_HOURS: float = 168
+    # child frames are scraped concurrently, a slow frame is skipped after the timeout
+    MAX_CONCURRENT_FRAME_SCRAPING: int = 5
+    FRAME_SCRAPING_TIMEOUT_MS: int = 15000
     VIDEO_PATH: str | None = "./video"
     HAR_PATH: str | None = "./har"
     LOG_PATH: str = "./log"
@@ -65,11 +123,33 @@ class Settings(BaseSettings):
     # Supported storage types: local, s3
     SKYVERN_STORAGE_TYPE: str = "local"
 
+    # cache of the svg and css shape conversions: "local" (in memory), "disk" (sqlite file) or "redis"
+    CACHE_TYPE: str = "local"
+    # outside of the package, which can be read-only or shared between installs
+    CACHE_DISK_PATH: str = os.path.join(tempfile.gettempdir(), "skyvern", "cache", "cache.db")
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    CACHE_KEY_PREFIX: str = "skyvern:cache:"
+    # the disk and redis caches evict the least recently read values past this size
+    CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+
     # S3 bucket settings
     AWS_REGION: str = "us-east-1"
     AWS_S3_BUCKET_UPLOADS: str = "skyvern-uploads"
+    # eg: http://localhost:5000 for a local S3 stand-in such as moto
+    AWS_ENDPOINT_URL: str | None = None
+    # the AWS clients are shared by the process, they keep up to this many connections open
+    AWS_MAX_POOL_CONNECTIONS: int = 50
+    # the payloads larger than a part are uploaded in parts of this size (at least 5MB), several parts at a time
+    AWS_S3_MULTIPART_CHUNK_SIZE: int = 8 * 1024 * 1024
+    AWS_S3_MULTIPART_CONCURRENCY: int = 4
     MAX_UPLOAD_FILE_SIZE: int = 10 * 1024 * 1024  # 10 MB
     PRESIGNED_URL_EXPIRATION: int = 60 * 60 * 24  # 24 hours
+    # a signed URL is reused for up to an hour
+    PRESIGNED_URL_CACHE_TTL: int = 60 * 60
+    # a URL signed with temporary credentials (eg: an instance or task role) stops working when they expire. botocore
+    # refreshes them 10 to 15 minutes before, so such a URL is only reused for a few minutes
+    PRESIGNED_URL_TEMPORARY_CREDENTIALS_CACHE_TTL: int = 5 * 60
+    PRESIGNED_URL_CACHE_SIZE: int = 100000
 
     SKYVERN_TELEMETRY: bool = True
     ANALYTICS_ID: str = "anonymous"
@@ -80,6 +160,14 @@ class Settings(BaseSettings):
     BROWSER_WIDTH: int = 1920
     BROWSER_HEIGHT: int = 1080
 
+    # stream the working page of a run over a CDP screencast instead of polling the streaming screenshots.
+    # The frames go through app.PUBSUB: only enable it when the API serving the viewers and the process running
+    # the browser share the pubsub, eg: a single process with the local pubsub, or a cross-process pubsub backend.
+    LIVE_VIEW_ENABLED: bool = False
+    LIVE_VIEW_JPEG_QUALITY: int = 60
+    LIVE_VIEW_MAX_FPS: int = 10
+    LIVE_VIEW_REPLAY_INTERVAL_MS: int = 1000
+
     # Add extension folders name here to load extension in your browser
     EXTENSIONS_BASE_PATH: str = "./extensions"
     EXTENSIONS: list[str] = []
@@ -99,6 +187,12 @@ class Settings(BaseSettings):
 
     # task generation settings
     PROMPT_CACHE_WINDOW_HOURS: int = 24
+    # the most recent action plans kept in memory
+    ACTION_PLAN_CACHE_SIZE: int = 1000
+    ACTION_PLAN_CACHE_TTL_SECONDS: int = 300
+    # the runs listing reads the deeper pages with the cursor
+    RUNS_MAX_PAGE_SIZE: int = 100
+    RUNS_MAX_OFFSET: int = 1000
 
     #####################
     # LLM Configuration #
@@ -116,6 +210,9 @@ class Settings(BaseSettings):
     LLM_CONFIG_TEMPERATURE: float = 0
     LLM_CONFIG_SUPPORT_VISION: bool = True  # Whether the model supports vision
     LLM_CONFIG_ADD_ASSISTANT_PREFIX: bool = False  # Whether to add assistant prefix
+    # token counting: counts are cached by content hash, batches are tokenized in a thread pool
+    TOKEN_COUNT_CACHE_SIZE: int = 10000
+    TOKEN_COUNT_MAX_WORKERS: int = 4
     # LLM PROVIDER SPECIFIC
     ENABLE_OPENAI: bool = False
     ENABLE_ANTHROPIC: bool = False
@@ -233,8 +330,14 @@ class Settings(BaseSettings):
 
     # TOTP Settings
     TOTP_LIFESPAN_MINUTES: int = 10
-    VERIFICATION_CODE_INITIAL_WAIT_TIME_SECS: int = 40
     VERIFICATION_CODE_POLLING_TIMEOUT_MINS: int = 15
+    # the codes sent to /totp wake the waiters right away, the database is still checked at this interval
+    # in case the code was stored by another process. The totp_verification_url is polled with a backoff
+    # from the initial interval up to this interval.
+    VERIFICATION_CODE_POLLING_INTERVAL_SECS: float = 10
+    VERIFICATION_CODE_URL_POLLING_INITIAL_INTERVAL_SECS: float = 1
+    # the url may still return the previous code right after the prompt, it's first polled after this wait
+    VERIFICATION_CODE_URL_INITIAL_WAIT_TIME_SECS: float = 5
 
     # Bitwarden Settings
     BITWARDEN_CLIENT_ID: str | None = None
@@ -251,6 +354,8 @@ class Settings(BaseSettings):
     BITWARDEN_SERVER_PORT: int = 8002
 
     SVG_MAX_LENGTH: int = 100000
+    # the svg and css shape conversions of a page run concurrently, bounded by this limit
+    SHAPE_CONVERSION_CONCURRENCY: int = 10
 
     ENABLE_LOG_ARTIFACTS: bool = False
     ENABLE_CODE_BLOCK: bool = False
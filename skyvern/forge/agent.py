@@ -9,7 +9,6 @@ from datetime import UTC, datetime
 from pathlib import Path
 from typing import Any, Tuple, cast
 
-import httpx
 import structlog
 from openai.types.responses.response import Response as OpenAIResponse
 from playwright._impl._errors import TargetClosedError
@@ -59,9 +58,9 @@ from skyvern.forge.sdk.api.files import (
     wait_for_download_finished,
 )
 from skyvern.forge.sdk.api.llm.api_handler_factory import LLMCaller, LLMCallerManager
-from skyvern.forge.sdk.artifact.models import ArtifactType
+from skyvern.forge.sdk.api.llm.usage import LLMUsage
+from skyvern.forge.sdk.artifact.models import Artifact, ArtifactType
 from skyvern.forge.sdk.core import skyvern_context
-from skyvern.forge.sdk.core.security import generate_skyvern_webhook_headers
 from skyvern.forge.sdk.db.enums import TaskType
 from skyvern.forge.sdk.log_artifacts import save_step_logs, save_task_logs
 from skyvern.forge.sdk.models import Step, StepStatus
@@ -87,8 +86,8 @@ from skyvern.webeye.actions.actions import (
     UserDefinedError,
     WebAction,
 )
-from skyvern.webeye.actions.caching import retrieve_action_plan
-from skyvern.webeye.actions.handler import ActionHandler, poll_verification_code
+from skyvern.webeye.actions.caching import cache_action_plan, retrieve_action_plan
+from skyvern.webeye.actions.handler import ActionHandler, get_verification_code_window_start, poll_verification_code
 from skyvern.webeye.actions.models import AgentStepOutput, DetailedAgentStepOutput
 from skyvern.webeye.actions.parse_actions import parse_actions, parse_anthropic_actions, parse_cua_actions
 from skyvern.webeye.actions.responses import ActionResult, ActionSuccess
@@ -1270,15 +1269,15 @@ class ForgeAgent:
             cached_tokens = first_response.usage.input_tokens_details.cached_tokens or 0
             reasoning_tokens = first_response.usage.output_tokens_details.reasoning_tokens or 0
             llm_cost = (3.0 / 1000000) * input_tokens + (12.0 / 1000000) * output_tokens
-            await app.DATABASE.update_step(
-                task_id=task.task_id,
-                step_id=step.step_id,
-                organization_id=task.organization_id,
-                incremental_cost=llm_cost,
-                incremental_input_tokens=input_tokens if input_tokens > 0 else None,
-                incremental_output_tokens=output_tokens if output_tokens > 0 else None,
-                incremental_reasoning_tokens=reasoning_tokens if reasoning_tokens > 0 else None,
-                incremental_cached_tokens=cached_tokens if cached_tokens > 0 else None,
+            await app.STEP_USAGE_ACCUMULATOR.add(
+                step,
+                LLMUsage(
+                    cost=llm_cost,
+                    input_tokens=input_tokens,
+                    output_tokens=output_tokens,
+                    reasoning_tokens=reasoning_tokens,
+                    cached_tokens=cached_tokens,
+                ),
             )
         if not scraped_page.screenshots:
             return [], previous_response
@@ -1309,7 +1308,7 @@ class ForgeAgent:
                 # try address the conversation with the context we have
                 reasoning = reasonings[0].summary[0].text if reasonings and reasonings[0].summary else None
                 assistant_message = assistant_messages[0].content[0].text if assistant_messages else None
-                skyvern_repsonse_prompt = load_prompt_with_elements(
+                skyvern_repsonse_prompt = await load_prompt_with_elements(
                     scraped_page=scraped_page,
                     prompt_engine=prompt_engine,
                     template_name="cua-answer-question",
@@ -1383,15 +1382,15 @@ class ForgeAgent:
         cached_tokens = current_response.usage.input_tokens_details.cached_tokens or 0
         reasoning_tokens = current_response.usage.output_tokens_details.reasoning_tokens or 0
         llm_cost = (3.0 / 1000000) * input_tokens + (12.0 / 1000000) * output_tokens
-        await app.DATABASE.update_step(
-            task_id=task.task_id,
-            step_id=step.step_id,
-            organization_id=task.organization_id,
-            incremental_cost=llm_cost,
-            incremental_input_tokens=input_tokens if input_tokens > 0 else None,
-            incremental_output_tokens=output_tokens if output_tokens > 0 else None,
-            incremental_reasoning_tokens=reasoning_tokens if reasoning_tokens > 0 else None,
-            incremental_cached_tokens=cached_tokens if cached_tokens > 0 else None,
+        await app.STEP_USAGE_ACCUMULATOR.add(
+            step,
+            LLMUsage(
+                cost=llm_cost,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                reasoning_tokens=reasoning_tokens,
+                cached_tokens=cached_tokens,
+            ),
         )
 
         return await parse_cua_actions(task, step, current_response), current_response
@@ -1475,7 +1474,7 @@ class ForgeAgent:
 
         scraped_page_refreshed = await scraped_page.refresh(draw_boxes=False, scroll=scroll)
 
-        verification_prompt = load_prompt_with_elements(
+        verification_prompt = await load_prompt_with_elements(
             scraped_page=scraped_page_refreshed,
             prompt_engine=prompt_engine,
             template_name="check-user-goal",
@@ -1572,14 +1571,12 @@ class ForgeAgent:
             )
 
         try:
-            video_artifacts = await app.BROWSER_MANAGER.get_video_artifacts(
-                task_id=task.task_id, browser_state=browser_state
-            )
-            for video_artifact in video_artifacts:
-                await app.ARTIFACT_MANAGER.update_artifact_data(
+            # only upload what has been recorded since the last action
+            for video_artifact in browser_state.browser_artifacts.video_artifacts:
+                await app.ARTIFACT_MANAGER.append_recording_data(
                     artifact_id=video_artifact.video_artifact_id,
                     organization_id=task.organization_id,
-                    data=video_artifact.video_data,
+                    video_path=video_artifact.video_path,
                 )
         except Exception:
             LOG.error(
@@ -1609,16 +1606,16 @@ class ForgeAgent:
             )
         # Initialize video artifact for the task here, afterwards it'll only get updated
         if browser_state and browser_state.browser_artifacts:
-            video_artifacts = await app.BROWSER_MANAGER.get_video_artifacts(
-                task_id=task.task_id, browser_state=browser_state
-            )
+            video_artifacts = browser_state.browser_artifacts.video_artifacts
             for idx, video_artifact in enumerate(video_artifacts):
                 if video_artifact.video_artifact_id:
                     continue
+                # the video is uploaded in parts after each action, and in full once the browser is closed.
+                # nothing is stored at the uri of the artifact until then, it has no share link
                 video_artifact_id = await app.ARTIFACT_MANAGER.create_artifact(
                     step=step,
                     artifact_type=ArtifactType.RECORDING,
-                    data=video_artifact.video_data,
+                    data=b"",
                 )
                 video_artifacts[idx].video_artifact_id = video_artifact_id
             app.BROWSER_MANAGER.set_video_artifact_for_task(task, video_artifacts)
@@ -1730,6 +1727,7 @@ class ForgeAgent:
             step_order=step.order,
             step_retry=step.retry_index,
             num_elements=len(scraped_page.elements),
+            page_settle_time=scraped_page.page_settle_time,
             url=task.url,
         )
         # TODO: we only use HTML element for now, introduce a way to switch in the future
@@ -1783,7 +1781,7 @@ class ForgeAgent:
         verification_code_check: bool = False,
         expire_verification_code: bool = False,
     ) -> str:
-        actions_and_results_str = await self._get_action_results(task)
+        actions_and_results_str, acted_element_ids = await self._get_action_results(task)
 
         # Generate the extract action prompt
         navigation_goal = task.navigation_goal
@@ -1834,10 +1832,11 @@ class ForgeAgent:
             raise UnsupportedTaskType(task_type=task_type)
 
         context = skyvern_context.ensure_context()
-        return load_prompt_with_elements(
+        return await load_prompt_with_elements(
             scraped_page=scraped_page,
             prompt_engine=prompt_engine,
             template_name=template,
+            priority_element_ids=acted_element_ids,
             navigation_goal=navigation_goal,
             navigation_payload_str=json.dumps(final_navigation_payload),
             starting_url=starting_url,
@@ -1876,7 +1875,10 @@ class ForgeAgent:
                 current_context.totp_codes.pop(task.task_id)
         return final_navigation_payload
 
-    async def _get_action_results(self, task: Task) -> str:
+    async def _get_action_results(self, task: Task) -> tuple[str, set[str]]:
+        """
+        :return: the action history in JSON and the ids of the elements acted on in the history window.
+        """
         # Get action results from the last app.SETTINGS.PROMPT_ACTION_HISTORY_WINDOW steps
         steps = await app.DATABASE.get_task_steps(task_id=task.task_id, organization_id=task.organization_id)
         # the last step is always the newly created one and it should be excluded from the history window
@@ -1908,7 +1910,8 @@ class ForgeAgent:
             for action, results in actions_and_results
             if len(results) > 0
         ]
-        return json.dumps(action_history)
+        acted_element_ids = {action.element_id for action, _ in actions_and_results if action.element_id}
+        return json.dumps(action_history), acted_element_ids
 
     async def get_extracted_information_for_task(self, task: Task) -> dict[str, Any] | list | str | None:
         """
@@ -2090,36 +2093,16 @@ class ForgeAgent:
 
         task_response = await self.build_task_response(task=task, last_step=last_step)
 
-        # send task_response to the webhook callback url
+        # the webhook is delivered by the webhook dispatcher, with retries
         payload = task_response.model_dump_json(exclude={"request"})
-        headers = generate_skyvern_webhook_headers(payload=payload, api_key=api_key)
-        LOG.info(
-            "Sending task response to webhook callback url",
-            task_id=task.task_id,
-            webhook_callback_url=task.webhook_callback_url,
-            payload=payload,
-            headers=headers,
-        )
         try:
-            async with httpx.AsyncClient() as client:
-                resp = await client.post(
-                    task.webhook_callback_url, data=payload, headers=headers, timeout=httpx.Timeout(30.0)
-                )
-            if resp.status_code == 200:
-                LOG.info(
-                    "Webhook sent successfully",
-                    task_id=task.task_id,
-                    resp_code=resp.status_code,
-                    resp_text=resp.text,
-                )
-            else:
-                LOG.info(
-                    "Webhook failed",
-                    task_id=task.task_id,
-                    resp=resp,
-                    resp_code=resp.status_code,
-                    resp_text=resp.text,
-                )
+            await app.WEBHOOK_DISPATCHER.enqueue(
+                organization_id=task.organization_id,
+                run_id=task.task_id,
+                url=task.webhook_callback_url,
+                payload=payload,
+                api_key=api_key,
+            )
         except Exception as e:
             raise FailedToSendWebhook(task_id=task.task_id) from e
 
@@ -2140,72 +2123,84 @@ class ForgeAgent:
         recording_url = None
         browser_console_log_url: str | None = None
         latest_action_screenshot_urls: list[str] | None = None
-        downloaded_files: list[FileInfo] | None = None
-
-        # get the artifact of the screenshot and get the screenshot_url
-        screenshot_artifact = await app.DATABASE.get_artifact(
-            task_id=task.task_id,
-            step_id=last_step.step_id,
-            artifact_type=ArtifactType.SCREENSHOT_FINAL,
-            organization_id=task.organization_id,
-        )
-        if screenshot_artifact:
-            screenshot_url = await app.ARTIFACT_MANAGER.get_share_link(screenshot_artifact)
 
-        first_step = await app.DATABASE.get_first_step(task_id=task.task_id, organization_id=task.organization_id)
-        if first_step:
-            recording_artifact = await app.DATABASE.get_artifact(
+        async def get_recording_artifact() -> Artifact | None:
+            first_step = await app.DATABASE.get_first_step(task_id=task.task_id, organization_id=task.organization_id)
+            if not first_step:
+                return None
+            return await app.DATABASE.get_artifact(
                 task_id=task.task_id,
                 step_id=first_step.step_id,
                 artifact_type=ArtifactType.RECORDING,
                 organization_id=task.organization_id,
             )
-            if recording_artifact:
-                recording_url = await app.ARTIFACT_MANAGER.get_share_link(recording_artifact)
 
-        # get the artifact of the last TASK_RESPONSE_ACTION_SCREENSHOT_COUNT screenshots and get the screenshot_url
-        latest_action_screenshot_artifacts = await app.DATABASE.get_latest_n_artifacts(
-            task_id=task.task_id,
-            organization_id=task.organization_id,
-            artifact_types=[ArtifactType.SCREENSHOT_ACTION],
-            n=settings.TASK_RESPONSE_ACTION_SCREENSHOT_COUNT,
-        )
-        if latest_action_screenshot_artifacts:
-            latest_action_screenshot_urls = await app.ARTIFACT_MANAGER.get_share_links(
-                latest_action_screenshot_artifacts
-            )
-
-        if task.organization_id:
-            try:
-                async with asyncio.timeout(GET_DOWNLOADED_FILES_TIMEOUT):
-                    downloaded_files = await app.STORAGE.get_downloaded_files(
-                        organization_id=task.organization_id, task_id=task.task_id, workflow_run_id=task.workflow_run_id
-                    )
-            except asyncio.TimeoutError:
-                LOG.warning(
-                    "Timeout to get downloaded files",
-                    task_id=task.task_id,
-                    workflow_run_id=task.workflow_run_id,
-                )
-            except Exception:
-                LOG.warning(
-                    "Failed to get downloaded files",
-                    exc_info=True,
-                    task_id=task.task_id,
-                    workflow_run_id=task.workflow_run_id,
-                )
-
-        if need_browser_log:
-            browser_console_log = await app.DATABASE.get_latest_artifact(
+        async def get_browser_console_log() -> Artifact | None:
+            if not need_browser_log:
+                return None
+            return await app.DATABASE.get_latest_artifact(
                 task_id=task.task_id,
                 artifact_types=[ArtifactType.BROWSER_CONSOLE_LOG],
                 organization_id=task.organization_id,
             )
-            if browser_console_log:
-                browser_console_log_url = await app.ARTIFACT_MANAGER.get_share_link(browser_console_log)
 
-        # get the latest task from the db to get the latest status, extracted_information, and failure_reason
-        task_from_db = await app.DATABASE.get_task(task_id=task.task_id, organization_id=task.organization_id)
+        # the lookups don't depend on each other, run them concurrently
+        (
+            screenshot_artifact,
+            recording_artifact,
+            latest_action_screenshot_artifacts,
+            browser_console_log,
+            downloaded_files,
+            task_from_db,
+        ) = await asyncio.gather(
+            app.DATABASE.get_artifact(
+                task_id=task.task_id,
+                step_id=last_step.step_id,
+                artifact_type=ArtifactType.SCREENSHOT_FINAL,
+                organization_id=task.organization_id,
+            ),
+            get_recording_artifact(),
+            # the last TASK_RESPONSE_ACTION_SCREENSHOT_COUNT screenshots
+            app.DATABASE.get_latest_n_artifacts(
+                task_id=task.task_id,
+                organization_id=task.organization_id,
+                artifact_types=[ArtifactType.SCREENSHOT_ACTION],
+                n=settings.TASK_RESPONSE_ACTION_SCREENSHOT_COUNT,
+            ),
+            get_browser_console_log(),
+            self._get_downloaded_files_for_task_response(task),
+            # get the latest task from the db to get the latest status, extracted_information, and failure_reason
+            app.DATABASE.get_task(task_id=task.task_id, organization_id=task.organization_id),
+        )
+
+        # sign all the links in one call
+        share_link_artifacts = [
+            artifact
+            for artifact in [screenshot_artifact, recording_artifact, browser_console_log]
+            + (latest_action_screenshot_artifacts or [])
+            if artifact
+        ]
+        if share_link_artifacts:
+            share_links = await app.ARTIFACT_MANAGER.get_share_links(share_link_artifacts)
+            if share_links:
+                links_by_artifact_id = {
+                    artifact.artifact_id: share_link
+                    for artifact, share_link in zip(share_link_artifacts, share_links)
+                    if share_link
+                }
+                if screenshot_artifact:
+                    screenshot_url = links_by_artifact_id.get(screenshot_artifact.artifact_id)
+                if recording_artifact:
+                    recording_url = links_by_artifact_id.get(recording_artifact.artifact_id)
+                if browser_console_log:
+                    browser_console_log_url = links_by_artifact_id.get(browser_console_log.artifact_id)
+                if latest_action_screenshot_artifacts:
+                    latest_action_screenshot_urls = [
+                        links_by_artifact_id[artifact.artifact_id]
+                        for artifact in latest_action_screenshot_artifacts
+                        if links_by_artifact_id.get(artifact.artifact_id)
+                    ]
+
         if not task_from_db:
             LOG.error("Failed to get task from db when sending task response")
             raise TaskNotFound(task_id=task.task_id)
@@ -2220,6 +2215,29 @@ class ForgeAgent:
             failure_reason=failure_reason,
         )
 
+    async def _get_downloaded_files_for_task_response(self, task: Task) -> list[FileInfo] | None:
+        if not task.organization_id:
+            return None
+        try:
+            async with asyncio.timeout(GET_DOWNLOADED_FILES_TIMEOUT):
+                return await app.STORAGE.get_downloaded_files(
+                    organization_id=task.organization_id, task_id=task.task_id, workflow_run_id=task.workflow_run_id
+                )
+        except asyncio.TimeoutError:
+            LOG.warning(
+                "Timeout to get downloaded files",
+                task_id=task.task_id,
+                workflow_run_id=task.workflow_run_id,
+            )
+        except Exception:
+            LOG.warning(
+                "Failed to get downloaded files",
+                exc_info=True,
+                task_id=task.task_id,
+                workflow_run_id=task.workflow_run_id,
+            )
+        return None
+
     async def cleanup_browser_and_create_artifacts(
         self,
         close_browser_on_completion: bool,
@@ -2323,8 +2341,11 @@ class ForgeAgent:
                 step_status=status,
                 organization_id=step.organization_id,
             )
+            await app.ARTIFACT_MANAGER.flush_artifacts()
 
         await save_step_logs(step.step_id)
+        # write the LLM usage summed during the step before its row is updated
+        await app.STEP_USAGE_ACCUMULATOR.flush(step.step_id)
 
         return await app.DATABASE.update_step(
             task_id=step.task_id,
@@ -2373,11 +2394,14 @@ class ForgeAgent:
 
         await save_task_logs(task.task_id)
         LOG.info("Updating task in db", task_id=task.task_id, diff=update_comparison)
-        return await app.DATABASE.update_task(
+        updated_task = await app.DATABASE.update_task(
             task.task_id,
             organization_id=task.organization_id,
             **updates,
         )
+        if status == TaskStatus.completed:
+            await cache_action_plan(updated_task)
+        return updated_task
 
     async def handle_failed_step(self, organization: Organization, task: Task, step: Step) -> Step | None:
         max_retries_per_step = (
@@ -2617,6 +2641,7 @@ class ForgeAgent:
                 workflow_run_id=task.workflow_run_id,
                 totp_verification_url=task.totp_verification_url,
                 totp_identifier=task.totp_identifier,
+                created_after=await get_verification_code_window_start(task, step),
             )
             current_context = skyvern_context.ensure_context()
             current_context.totp_codes[task.task_id] = verification_code
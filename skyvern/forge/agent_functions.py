@@ -1,8 +1,9 @@
 import asyncio
-import copy
 import hashlib
+from collections import defaultdict, deque
+from contextlib import nullcontext
 from datetime import timedelta
-from typing import Dict, List
+from typing import Any, Awaitable, Dict, List
 
 import structlog
 from playwright.async_api import Frame, Page
@@ -70,6 +71,11 @@ def _should_css_shape_convert(element: Dict) -> bool:
     return False
 
 
+def _get_shape_hash(element: Dict) -> str:
+    shape_html = json_to_html(_remove_skyvern_attributes(element))
+    return hashlib.sha256(shape_html.encode("utf-8")).hexdigest()
+
+
 def _get_svg_cache_key(hash: str) -> str:
     return f"skyvern:svg:{hash}"
 
@@ -82,16 +88,14 @@ def _remove_skyvern_attributes(element: Dict) -> Dict:
     """
     To get the original HTML element without skyvern attributes
     """
-    element_copied = copy.deepcopy(element)
-    for attr in ELEMENT_NODE_ATTRIBUTES:
-        if element_copied.get(attr):
-            del element_copied[attr]
+    element_copied = {key: value for key, value in element.items() if not (key in ELEMENT_NODE_ATTRIBUTES and value)}
 
     if "attributes" in element_copied:
-        attributes: dict = copy.deepcopy(element_copied.get("attributes", {}))
-        for key in attributes.keys():
-            if key in USELESS_SHAPE_ATTRIBUTE:
-                del element_copied["attributes"][key]
+        element_copied["attributes"] = {
+            key: value
+            for key, value in element_copied.get("attributes", {}).items()
+            if key not in USELESS_SHAPE_ATTRIBUTE
+        }
 
     children: List[Dict] | None = element_copied.get("children", None)
     if children is None:
@@ -166,22 +170,24 @@ async def _convert_svg_to_string(
     element: Dict,
     task: Task | None = None,
     step: Step | None = None,
+    cached_shapes: dict[str, Any] | None = None,
 ) -> None:
-    """Convert an SVG element to a string description. Assumes element has already passed eligibility checks."""
+    """
+    Convert an SVG element to a string description. Assumes element has already passed eligibility checks.
+    :param cached_shapes: the shapes prefetched from the cache, the cache is read if not given.
+    """
     task_id = task.task_id if task else None
     step_id = step.step_id if step else None
     element_id = element.get("id", "")
 
-    svg_element = _remove_skyvern_attributes(element)
-    svg_html = json_to_html(svg_element)
-    hash_object = hashlib.sha256()
-    hash_object.update(svg_html.encode("utf-8"))
-    svg_hash = hash_object.hexdigest()
-    svg_key = _get_svg_cache_key(svg_hash)
+    svg_key = _get_svg_cache_key(_get_shape_hash(element))
 
     svg_shape: str | None = None
     try:
-        svg_shape = await app.CACHE.get(svg_key)
+        if cached_shapes is not None:
+            svg_shape = cached_shapes.get(svg_key)
+        else:
+            svg_shape = await app.CACHE.get(svg_key)
     except Exception:
         LOG.warning(
             "Failed to loaded SVG cache",
@@ -194,6 +200,7 @@ async def _convert_svg_to_string(
     if svg_shape:
         LOG.debug("SVG loaded from cache", element_id=element_id, key=svg_key, shape=svg_shape)
     else:
+        svg_html = json_to_html(_remove_skyvern_attributes(element))
         if len(svg_html) > settings.SVG_MAX_LENGTH:
             # TODO: implement a fallback solution for "too large" case, maybe convert by screenshot
             LOG.warning(
@@ -276,21 +283,27 @@ async def _convert_css_shape_to_string(
     element: Dict,
     task: Task | None = None,
     step: Step | None = None,
+    cached_shapes: dict[str, Any] | None = None,
+    prechecked: bool = False,
+    screenshot_lock: asyncio.Lock | None = None,
 ) -> None:
+    """
+    :param cached_shapes: the shapes prefetched from the cache, the cache is read if not given.
+    :param prechecked: the element is already known to be on the page and not blocked.
+    :param screenshot_lock: serializes the scrolling and the screenshots of the conversions running concurrently.
+    """
     element_id: str = element.get("id", "")
 
     task_id = task.task_id if task else None
     step_id = step.step_id if step else None
-    shape_element = _remove_skyvern_attributes(element)
-    svg_html = json_to_html(shape_element)
-    hash_object = hashlib.sha256()
-    hash_object.update(svg_html.encode("utf-8"))
-    shape_hash = hash_object.hexdigest()
-    shape_key = _get_shape_cache_key(shape_hash)
+    shape_key = _get_shape_cache_key(_get_shape_hash(element))
 
     css_shape: str | None = None
     try:
-        css_shape = await app.CACHE.get(shape_key)
+        if cached_shapes is not None:
+            css_shape = cached_shapes.get(shape_key)
+        else:
+            css_shape = await app.CACHE.get(shape_key)
     except Exception:
         LOG.warning(
             "Failed to loaded CSS shape cache",
@@ -305,54 +318,58 @@ async def _convert_css_shape_to_string(
     else:
         try:
             locater = skyvern_frame.get_frame().locator(f'[{SKYVERN_ID_ATTR}="{element_id}"]')
-            if await locater.count() == 0:
-                LOG.info(
-                    "No locater found to convert css shape",
-                    task_id=task_id,
-                    step_id=step_id,
-                    element_id=element_id,
-                    key=shape_key,
-                )
-                return None
-
-            if not await locater.is_visible(timeout=settings.BROWSER_ACTION_TIMEOUT_MS):
-                LOG.info(
-                    "element is not visible on the page, going to abort conversion",
-                    task_id=task_id,
-                    step_id=step_id,
-                    element_id=element_id,
-                    key=shape_key,
-                )
+            if not prechecked:
+                if await locater.count() == 0:
+                    LOG.info(
+                        "No locater found to convert css shape",
+                        task_id=task_id,
+                        step_id=step_id,
+                        element_id=element_id,
+                        key=shape_key,
+                    )
+                    return None
 
-            skyvern_element = SkyvernElement(locator=locater, frame=skyvern_frame.get_frame(), static_element=element)
+                if not await locater.is_visible(timeout=settings.BROWSER_ACTION_TIMEOUT_MS):
+                    LOG.info(
+                        "element is not visible on the page, going to abort conversion",
+                        task_id=task_id,
+                        step_id=step_id,
+                        element_id=element_id,
+                        key=shape_key,
+                    )
 
-            _, blocked = await skyvern_frame.get_blocking_element_id(await skyvern_element.get_element_handler())
-            if blocked:
-                LOG.debug(
-                    "element is blocked by another element, going to abort conversion",
-                    task_id=task_id,
-                    step_id=step_id,
-                    element_id=element_id,
-                    key=shape_key,
+                skyvern_element = SkyvernElement(
+                    locator=locater, frame=skyvern_frame.get_frame(), static_element=element
                 )
-                return None
 
-            try:
-                await locater.scroll_into_view_if_needed(timeout=settings.BROWSER_ACTION_TIMEOUT_MS)
-                await locater.wait_for(state="visible", timeout=settings.BROWSER_ACTION_TIMEOUT_MS)
-            except Exception:
-                LOG.info(
-                    "Failed to make the element visible, going to abort conversion",
-                    exc_info=True,
-                    task_id=task_id,
-                    step_id=step_id,
-                    element_id=element_id,
-                    key=shape_key,
-                )
-                return None
+                _, blocked = await skyvern_frame.get_blocking_element_id(await skyvern_element.get_element_handler())
+                if blocked:
+                    LOG.debug(
+                        "element is blocked by another element, going to abort conversion",
+                        task_id=task_id,
+                        step_id=step_id,
+                        element_id=element_id,
+                        key=shape_key,
+                    )
+                    return None
+
+            async with screenshot_lock or nullcontext():
+                try:
+                    await locater.scroll_into_view_if_needed(timeout=settings.BROWSER_ACTION_TIMEOUT_MS)
+                    await locater.wait_for(state="visible", timeout=settings.BROWSER_ACTION_TIMEOUT_MS)
+                except Exception:
+                    LOG.info(
+                        "Failed to make the element visible, going to abort conversion",
+                        exc_info=True,
+                        task_id=task_id,
+                        step_id=step_id,
+                        element_id=element_id,
+                        key=shape_key,
+                    )
+                    return None
 
-            LOG.debug("call LLM to convert css shape to string shape", element_id=element_id)
-            screenshot = await locater.screenshot(timeout=settings.BROWSER_ACTION_TIMEOUT_MS, animations="disabled")
+                LOG.debug("call LLM to convert css shape to string shape", element_id=element_id)
+                screenshot = await locater.screenshot(timeout=settings.BROWSER_ACTION_TIMEOUT_MS, animations="disabled")
             prompt = prompt_engine.load_prompt("css-shape-convert")
 
             # TODO: we don't retry the css shape conversion today
@@ -425,6 +442,88 @@ async def _convert_css_shape_to_string(
     return None
 
 
+async def _convert_shapes(
+    shape_frames: dict[int, SkyvernFrame],
+    svg_candidates: dict[int, list[dict]],
+    css_candidates: dict[int, list[dict]],
+    task: Task | None = None,
+    step: Step | None = None,
+) -> None:
+    """
+    Convert the svg and css shapes of the element tree:
+    - the cached shapes are read in one batch
+    - the visibility and the blocking of the candidates are checked in one JS call per frame
+    - the conversions run concurrently, bounded by SHAPE_CONVERSION_CONCURRENCY
+    """
+    cache_keys = [
+        _get_svg_cache_key(_get_shape_hash(element)) for elements in svg_candidates.values() for element in elements
+    ]
+    css_cache_keys = {
+        element["id"]: _get_shape_cache_key(_get_shape_hash(element))
+        for elements in css_candidates.values()
+        for element in elements
+    }
+    cached_shapes: dict[str, Any] | None = None
+    try:
+        cached_shapes = await app.CACHE.get_many(cache_keys + list(css_cache_keys.values()))
+    except Exception:
+        LOG.warning("Failed to load the shape cache in batch", exc_info=True)
+
+    conversions: list[Awaitable[None]] = []
+    for frame_index, skyvern_frame in shape_frames.items():
+        svg_elements = svg_candidates.get(frame_index, [])
+        # the cached css shapes don't need the page
+        css_elements = [
+            element
+            for element in css_candidates.get(frame_index, [])
+            if cached_shapes is None or css_cache_keys[element["id"]] not in cached_shapes
+        ]
+        states: dict[str, dict[str, bool] | None] = {}
+        if svg_elements or css_elements:
+            try:
+                states = await skyvern_frame.get_shape_elements_state(
+                    [element.get("id", "") for element in svg_elements + css_elements]
+                )
+            except Exception:
+                LOG.warning("Failed to check the shape elements in batch", frame_index=frame_index, exc_info=True)
+
+        for element in svg_elements:
+            state = states.get(element.get("id", ""))
+            if state is None:
+                # not found in the light DOM, eg: in a shadow root, check it with its locator
+                if not await _check_svg_eligibility(skyvern_frame, element, task, step):
+                    continue
+            elif not state["visible"] or (state["blocked"] and not element.get("interactable", False)):
+                _mark_element_as_dropped(element)
+                continue
+            conversions.append(_convert_svg_to_string(element, task, step, cached_shapes=cached_shapes))
+
+        screenshot_lock = asyncio.Lock()
+        for element in css_candidates.get(frame_index, []):
+            state = states.get(element["id"])
+            if state is not None and state["blocked"]:
+                continue
+            conversions.append(
+                _convert_css_shape_to_string(
+                    skyvern_frame=skyvern_frame,
+                    element=element,
+                    task=task,
+                    step=step,
+                    cached_shapes=cached_shapes,
+                    prechecked=state is not None,
+                    screenshot_lock=screenshot_lock,
+                )
+            )
+
+    semaphore = asyncio.Semaphore(settings.SHAPE_CONVERSION_CONCURRENCY)
+
+    async def _convert(conversion: Awaitable[None]) -> None:
+        async with semaphore:
+            await conversion
+
+    await asyncio.gather(*[_convert(conversion) for conversion in conversions])
+
+
 class AgentFunction:
     async def validate_step_execution(
         self,
@@ -511,15 +610,15 @@ class AgentFunction:
             skyvern_frame = await SkyvernFrame.create_instance(frame=frame)
             current_frame_index = context.frame_index_map.get(frame, 0)
 
-            queue = []
+            queue: deque[dict] = deque(element_tree)
             element_cnt = 0
-            eligible_svgs = []  # List to store eligible SVGs and their frames
-
-            for element in element_tree:
-                queue.append(element)
+            # the svg and css shape candidates by frame index, checked in one batch per frame
+            shape_frames: dict[int, SkyvernFrame] = {current_frame_index: skyvern_frame}
+            svg_candidates: dict[int, list[dict]] = defaultdict(list)
+            css_candidates: dict[int, list[dict]] = defaultdict(list)
 
             while queue:
-                queue_ele = queue.pop(0)
+                queue_ele = queue.popleft()
 
                 element_cnt += 1
                 if element_cnt == MAX_ELEMENT_CNT:
@@ -534,20 +633,18 @@ class AgentFunction:
                     )
                     skyvern_frame = await SkyvernFrame.create_instance(frame=new_frame)
                     current_frame_index = queue_ele.get("frame_index", 0)
+                    shape_frames[current_frame_index] = skyvern_frame
 
                 _remove_rect(queue_ele)
 
-                # Check SVG eligibility and store for later conversion
-                if await _check_svg_eligibility(skyvern_frame, queue_ele, task, step, always_drop=element_exceeded):
-                    eligible_svgs.append((queue_ele, skyvern_frame))
+                if queue_ele.get("tagName") == "svg" and not queue_ele.get("isDropped", False):
+                    if element_exceeded:
+                        _mark_element_as_dropped(queue_ele)
+                    else:
+                        svg_candidates[current_frame_index].append(queue_ele)
 
                 if not element_exceeded and _should_css_shape_convert(element=queue_ele):
-                    await _convert_css_shape_to_string(
-                        skyvern_frame=skyvern_frame,
-                        element=queue_ele,
-                        task=task,
-                        step=step,
-                    )
+                    css_candidates[current_frame_index].append(queue_ele)
 
                 # TODO: we can come back to test removing the unique_id
                 # from element attributes to make sure this won't increase hallucination
@@ -555,10 +652,16 @@ class AgentFunction:
                 if "children" in queue_ele:
                     queue.extend(queue_ele["children"])
 
-            # Convert all eligible SVGs in parallel
-            if eligible_svgs:
-                await asyncio.gather(*[_convert_svg_to_string(element, task, step) for element, frame in eligible_svgs])
+            await _convert_shapes(shape_frames, svg_candidates, css_candidates, task, step)
 
+            cache_stats = app.CACHE.get_stats()
+            LOG.debug(
+                "Shape conversion cache stats",
+                hits=cache_stats.hits,
+                misses=cache_stats.misses,
+                evictions=cache_stats.evictions,
+                hit_rate=cache_stats.hit_rate,
+            )
             return element_tree
 
         return cleanup_element_tree_func
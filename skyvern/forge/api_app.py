@@ -1,8 +1,11 @@
 import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Awaitable, Callable
+from typing import AsyncIterator, Awaitable, Callable
 
 import structlog
+from ddtrace import tracer
+from ddtrace.filters import FilterRequestsOnUrl
 from fastapi import FastAPI, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
@@ -15,6 +18,7 @@ from starlette_context.plugins.base import Plugin
 from skyvern.config import settings
 from skyvern.exceptions import SkyvernHTTPException
 from skyvern.forge import app as forge_app
+from skyvern.forge.sdk.api.aws import AsyncAWSClient
 from skyvern.forge.sdk.core import skyvern_context
 from skyvern.forge.sdk.core.skyvern_context import SkyvernContext
 from skyvern.forge.sdk.db.exceptions import NotFoundError
@@ -48,12 +52,29 @@ def custom_openapi() -> dict:
     return app.openapi_schema
 
 
+@asynccontextmanager
+async def lifespan(fastapi_app: FastAPI) -> AsyncIterator[None]:
+    # deliver the webhooks left pending by the previous processes
+    forge_app.WEBHOOK_DISPATCHER.start()
+    yield
+    await forge_app.STEP_USAGE_ACCUMULATOR.close()
+    await forge_app.WEBHOOK_DISPATCHER.close()
+    await AsyncAWSClient.close_clients()
+
+
 def get_agent_app() -> FastAPI:
     """
     Start the agent server.
     """
 
-    app = FastAPI()
+    tracer.configure(
+        settings={
+            "FILTERS": [
+                FilterRequestsOnUrl(r"http://.*/heartbeat$"),
+            ],
+        },
+    )
+    app = FastAPI(lifespan=lifespan)
 
     # Add CORS middleware
     app.add_middleware(
@@ -62,6 +83,8 @@ def get_agent_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        # the runs listing returns the cursor of the next page in a header
+        expose_headers=["X-Next-Cursor"],
     )
 
     app.include_router(base_router, prefix="/v1")
@@ -1,70 +1,247 @@
-from typing import Awaitable, Callable
-
-from anthropic import AsyncAnthropic, AsyncAnthropicBedrock
-from fastapi import FastAPI
-from openai import AsyncAzureOpenAI, AsyncOpenAI
-
-from skyvern.forge.agent import ForgeAgent
-from skyvern.forge.agent_functions import AgentFunction
-from skyvern.forge.sdk.api.llm.api_handler_factory import LLMAPIHandlerFactory
-from skyvern.forge.sdk.artifact.manager import ArtifactManager
-from skyvern.forge.sdk.artifact.storage.factory import StorageFactory
-from skyvern.forge.sdk.artifact.storage.s3 import S3Storage
-from skyvern.forge.sdk.cache.factory import CacheFactory
-from skyvern.forge.sdk.db.client import AgentDB
-from skyvern.forge.sdk.experimentation.providers import BaseExperimentationProvider, NoOpExperimentationProvider
-from skyvern.forge.sdk.schemas.organizations import Organization
+"""
+The services of the skyvern app. They are built on first access, so importing skyvern (eg: for the CLI or the
+MCP server) doesn't pay for the database engine, the LLM clients or the agent until they are used.
+A service can be replaced by assigning it, eg: `app.DATABASE = AgentDB(...)`, before or after it was built.
+"""
+
+from typing import TYPE_CHECKING, Any, Awaitable, Callable
+
 from skyvern.forge.sdk.settings_manager import SettingsManager
-from skyvern.forge.sdk.workflow.context_manager import WorkflowContextManager
-from skyvern.forge.sdk.workflow.service import WorkflowService
-from skyvern.webeye.browser_manager import BrowserManager
-from skyvern.webeye.persistent_sessions_manager import PersistentSessionsManager
-from skyvern.webeye.scraper.scraper import ScrapeExcludeFunc
+
+if TYPE_CHECKING:
+    from anthropic import AsyncAnthropic, AsyncAnthropicBedrock
+    from fastapi import FastAPI
+    from openai import AsyncOpenAI
+
+    from skyvern.forge.agent import ForgeAgent
+    from skyvern.forge.agent_functions import AgentFunction
+    from skyvern.forge.sdk.api.llm.models import LLMAPIHandler
+    from skyvern.forge.sdk.api.llm.usage import StepUsageAccumulator
+    from skyvern.forge.sdk.artifact.manager import ArtifactManager
+    from skyvern.forge.sdk.artifact.storage.base import BaseStorage
+    from skyvern.forge.sdk.cache.base import BaseCache
+    from skyvern.forge.sdk.db.client import AgentDB
+    from skyvern.forge.sdk.experimentation.providers import BaseExperimentationProvider
+    from skyvern.forge.sdk.pubsub.base import BasePubSub
+    from skyvern.forge.sdk.schemas.organizations import Organization
+    from skyvern.forge.sdk.services.webhook_dispatcher import WebhookDispatcher
+    from skyvern.forge.sdk.workflow.context_manager import WorkflowContextManager
+    from skyvern.forge.sdk.workflow.service import WorkflowService
+    from skyvern.webeye.browser_manager import BrowserManager
+    from skyvern.webeye.persistent_sessions_manager import PersistentSessionsManager
+    from skyvern.webeye.scraper.scraper import ScrapeExcludeFunc
+
+    DATABASE: AgentDB
+    STORAGE: BaseStorage
+    CACHE: BaseCache
+    PUBSUB: BasePubSub
+    ARTIFACT_MANAGER: ArtifactManager
+    STEP_USAGE_ACCUMULATOR: StepUsageAccumulator
+    BROWSER_MANAGER: BrowserManager
+    EXPERIMENTATION_PROVIDER: BaseExperimentationProvider
+    LLM_API_HANDLER: LLMAPIHandler
+    OPENAI_CLIENT: AsyncOpenAI
+    ANTHROPIC_CLIENT: AsyncAnthropic | AsyncAnthropicBedrock
+    SECONDARY_LLM_API_HANDLER: LLMAPIHandler
+    SELECT_AGENT_LLM_API_HANDLER: LLMAPIHandler
+    SINGLE_CLICK_AGENT_LLM_API_HANDLER: LLMAPIHandler
+    WORKFLOW_CONTEXT_MANAGER: WorkflowContextManager
+    WORKFLOW_SERVICE: WorkflowService
+    AGENT_FUNCTION: AgentFunction
+    PERSISTENT_SESSIONS_MANAGER: PersistentSessionsManager
+    WEBHOOK_DISPATCHER: WebhookDispatcher
+    agent: ForgeAgent
 
 SETTINGS_MANAGER = SettingsManager.get_settings()
-DATABASE = AgentDB(
-    SettingsManager.get_settings().DATABASE_STRING,
-    debug_enabled=SettingsManager.get_settings().DEBUG_MODE,
-)
-if SettingsManager.get_settings().SKYVERN_STORAGE_TYPE == "s3":
-    StorageFactory.set_storage(S3Storage())
-STORAGE = StorageFactory.get_storage()
-CACHE = CacheFactory.get_cache()
-ARTIFACT_MANAGER = ArtifactManager()
-BROWSER_MANAGER = BrowserManager()
-EXPERIMENTATION_PROVIDER: BaseExperimentationProvider = NoOpExperimentationProvider()
-LLM_API_HANDLER = LLMAPIHandlerFactory.get_llm_api_handler(SettingsManager.get_settings().LLM_KEY)
-OPENAI_CLIENT = AsyncOpenAI(api_key=SettingsManager.get_settings().OPENAI_API_KEY or "")
-if SettingsManager.get_settings().ENABLE_AZURE_CUA:
-    OPENAI_CLIENT = AsyncAzureOpenAI(
-        api_key=SettingsManager.get_settings().AZURE_CUA_API_KEY,
-        api_version=SettingsManager.get_settings().AZURE_CUA_API_VERSION,
-        azure_endpoint=SettingsManager.get_settings().AZURE_CUA_ENDPOINT,
-        azure_deployment=SettingsManager.get_settings().AZURE_CUA_DEPLOYMENT,
+scrape_exclude: "ScrapeExcludeFunc | None" = None
+authentication_function: "Callable[[str], Awaitable[Organization]] | None" = None
+setup_api_app: "Callable[[FastAPI], None] | None" = None
+
+
+def _build_database() -> "AgentDB":
+    from skyvern.forge.sdk.db.client import AgentDB
+
+    return AgentDB(SETTINGS_MANAGER.DATABASE_STRING, debug_enabled=SETTINGS_MANAGER.DEBUG_MODE)
+
+
+def _build_storage() -> "BaseStorage":
+    from skyvern.forge.sdk.artifact.storage.factory import StorageFactory
+
+    if SETTINGS_MANAGER.SKYVERN_STORAGE_TYPE == "s3":
+        from skyvern.forge.sdk.artifact.storage.s3 import S3Storage
+
+        StorageFactory.set_storage(S3Storage())
+    return StorageFactory.get_storage()
+
+
+def _build_cache() -> "BaseCache":
+    from skyvern.forge.sdk.cache.factory import CacheFactory
+
+    if SETTINGS_MANAGER.CACHE_TYPE == "disk":
+        from skyvern.forge.sdk.cache.disk import DiskCache
+
+        CacheFactory.set_cache(DiskCache())
+    elif SETTINGS_MANAGER.CACHE_TYPE == "redis":
+        from skyvern.forge.sdk.cache.redis_cache import RedisCache
+
+        CacheFactory.set_cache(RedisCache())
+    return CacheFactory.get_cache()
+
+
+def _build_pubsub() -> "BasePubSub":
+    from skyvern.forge.sdk.pubsub.factory import PubSubFactory
+
+    return PubSubFactory.get_pubsub()
+
+
+def _build_artifact_manager() -> "ArtifactManager":
+    from skyvern.forge.sdk.artifact.manager import ArtifactManager
+
+    return ArtifactManager()
+
+
+def _build_step_usage_accumulator() -> "StepUsageAccumulator":
+    from skyvern.forge.sdk.api.llm.usage import StepUsageAccumulator
+
+    return StepUsageAccumulator()
+
+
+def _build_browser_manager() -> "BrowserManager":
+    from skyvern.webeye.browser_manager import BrowserManager
+
+    return BrowserManager()
+
+
+def _build_experimentation_provider() -> "BaseExperimentationProvider":
+    from skyvern.forge.sdk.experimentation.providers import NoOpExperimentationProvider
+
+    return NoOpExperimentationProvider()
+
+
+def _get_llm_api_handler(llm_key: str) -> "LLMAPIHandler":
+    from skyvern.forge.sdk.api.llm.api_handler_factory import LLMAPIHandlerFactory
+
+    return LLMAPIHandlerFactory.get_llm_api_handler(llm_key)
+
+
+def _build_llm_api_handler() -> "LLMAPIHandler":
+    return _get_llm_api_handler(SETTINGS_MANAGER.LLM_KEY)
+
+
+def _build_openai_client() -> "AsyncOpenAI":
+    if SETTINGS_MANAGER.ENABLE_AZURE_CUA:
+        from openai import AsyncAzureOpenAI
+
+        return AsyncAzureOpenAI(
+            api_key=SETTINGS_MANAGER.AZURE_CUA_API_KEY,
+            api_version=SETTINGS_MANAGER.AZURE_CUA_API_VERSION,
+            azure_endpoint=SETTINGS_MANAGER.AZURE_CUA_ENDPOINT,
+            azure_deployment=SETTINGS_MANAGER.AZURE_CUA_DEPLOYMENT,
+        )
+    from openai import AsyncOpenAI
+
+    return AsyncOpenAI(api_key=SETTINGS_MANAGER.OPENAI_API_KEY or "")
+
+
+def _build_anthropic_client() -> "AsyncAnthropic | AsyncAnthropicBedrock":
+    if SETTINGS_MANAGER.ENABLE_BEDROCK_ANTHROPIC:
+        from anthropic import AsyncAnthropicBedrock
+
+        return AsyncAnthropicBedrock()
+    from anthropic import AsyncAnthropic
+
+    return AsyncAnthropic(api_key=SETTINGS_MANAGER.ANTHROPIC_API_KEY)
+
+
+def _build_secondary_llm_api_handler() -> "LLMAPIHandler":
+    return _get_llm_api_handler(
+        SETTINGS_MANAGER.SECONDARY_LLM_KEY if SETTINGS_MANAGER.SECONDARY_LLM_KEY else SETTINGS_MANAGER.LLM_KEY
     )
-ANTHROPIC_CLIENT = AsyncAnthropic(api_key=SettingsManager.get_settings().ANTHROPIC_API_KEY)
-if SettingsManager.get_settings().ENABLE_BEDROCK_ANTHROPIC:
-    ANTHROPIC_CLIENT = AsyncAnthropicBedrock()
-
-SECONDARY_LLM_API_HANDLER = LLMAPIHandlerFactory.get_llm_api_handler(
-    SETTINGS_MANAGER.SECONDARY_LLM_KEY if SETTINGS_MANAGER.SECONDARY_LLM_KEY else SETTINGS_MANAGER.LLM_KEY
-)
-SELECT_AGENT_LLM_API_HANDLER = (
-    LLMAPIHandlerFactory.get_llm_api_handler(SETTINGS_MANAGER.SELECT_AGENT_LLM_KEY)
-    if SETTINGS_MANAGER.SELECT_AGENT_LLM_KEY
-    else SECONDARY_LLM_API_HANDLER
-)
-SINGLE_CLICK_AGENT_LLM_API_HANDLER = (
-    LLMAPIHandlerFactory.get_llm_api_handler(SETTINGS_MANAGER.SINGLE_CLICK_AGENT_LLM_KEY)
-    if SETTINGS_MANAGER.SINGLE_CLICK_AGENT_LLM_KEY
-    else SECONDARY_LLM_API_HANDLER
-)
-WORKFLOW_CONTEXT_MANAGER = WorkflowContextManager()
-WORKFLOW_SERVICE = WorkflowService()
-AGENT_FUNCTION = AgentFunction()
-PERSISTENT_SESSIONS_MANAGER = PersistentSessionsManager(database=DATABASE)
-scrape_exclude: ScrapeExcludeFunc | None = None
-authentication_function: Callable[[str], Awaitable[Organization]] | None = None
-setup_api_app: Callable[[FastAPI], None] | None = None
-
-agent = ForgeAgent()
+
+
+def _build_select_agent_llm_api_handler() -> "LLMAPIHandler":
+    if SETTINGS_MANAGER.SELECT_AGENT_LLM_KEY:
+        return _get_llm_api_handler(SETTINGS_MANAGER.SELECT_AGENT_LLM_KEY)
+    return _get_service("SECONDARY_LLM_API_HANDLER")
+
+
+def _build_single_click_agent_llm_api_handler() -> "LLMAPIHandler":
+    if SETTINGS_MANAGER.SINGLE_CLICK_AGENT_LLM_KEY:
+        return _get_llm_api_handler(SETTINGS_MANAGER.SINGLE_CLICK_AGENT_LLM_KEY)
+    return _get_service("SECONDARY_LLM_API_HANDLER")
+
+
+def _build_workflow_context_manager() -> "WorkflowContextManager":
+    from skyvern.forge.sdk.workflow.context_manager import WorkflowContextManager
+
+    return WorkflowContextManager()
+
+
+def _build_workflow_service() -> "WorkflowService":
+    from skyvern.forge.sdk.workflow.service import WorkflowService
+
+    return WorkflowService()
+
+
+def _build_agent_function() -> "AgentFunction":
+    from skyvern.forge.agent_functions import AgentFunction
+
+    return AgentFunction()
+
+
+def _build_persistent_sessions_manager() -> "PersistentSessionsManager":
+    from skyvern.webeye.persistent_sessions_manager import PersistentSessionsManager
+
+    return PersistentSessionsManager(database=_get_service("DATABASE"))
+
+
+def _build_webhook_dispatcher() -> "WebhookDispatcher":
+    from skyvern.forge.sdk.services.webhook_dispatcher import WebhookDispatcher
+
+    return WebhookDispatcher()
+
+
+def _build_agent() -> "ForgeAgent":
+    from skyvern.forge.agent import ForgeAgent
+
+    return ForgeAgent()
+
+
+_SERVICE_BUILDERS: dict[str, Callable[[], Any]] = {
+    "DATABASE": _build_database,
+    "STORAGE": _build_storage,
+    "CACHE": _build_cache,
+    "PUBSUB": _build_pubsub,
+    "ARTIFACT_MANAGER": _build_artifact_manager,
+    "STEP_USAGE_ACCUMULATOR": _build_step_usage_accumulator,
+    "BROWSER_MANAGER": _build_browser_manager,
+    "EXPERIMENTATION_PROVIDER": _build_experimentation_provider,
+    "LLM_API_HANDLER": _build_llm_api_handler,
+    "OPENAI_CLIENT": _build_openai_client,
+    "ANTHROPIC_CLIENT": _build_anthropic_client,
+    "SECONDARY_LLM_API_HANDLER": _build_secondary_llm_api_handler,
+    "SELECT_AGENT_LLM_API_HANDLER": _build_select_agent_llm_api_handler,
+    "SINGLE_CLICK_AGENT_LLM_API_HANDLER": _build_single_click_agent_llm_api_handler,
+    "WORKFLOW_CONTEXT_MANAGER": _build_workflow_context_manager,
+    "WORKFLOW_SERVICE": _build_workflow_service,
+    "AGENT_FUNCTION": _build_agent_function,
+    "PERSISTENT_SESSIONS_MANAGER": _build_persistent_sessions_manager,
+    "WEBHOOK_DISPATCHER": _build_webhook_dispatcher,
+    "agent": _build_agent,
+}
+
+
+def _get_service(name: str) -> Any:
+    if name in globals():
+        return globals()[name]
+    builder = _SERVICE_BUILDERS.get(name)
+    if builder is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # the module attribute is set once built, later lookups don't come back here
+    service = builder()
+    globals()[name] = service
+    return service
+
+
+def __getattr__(name: str) -> Any:
+    return _get_service(name)
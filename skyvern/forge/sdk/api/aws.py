@@ -1,14 +1,25 @@
+import asyncio
+import io
+import threading
+import time
+from contextlib import AsyncExitStack
 from enum import StrEnum
 from typing import IO, Any
 from urllib.parse import urlparse
 
 import aioboto3
+import botocore.session
 import structlog
+from aiobotocore.config import AioConfig
+from cachetools import LRUCache
 
 from skyvern.config import settings
 
 LOG = structlog.get_logger()
 
+# (client type, region, access key id, secret access key, event loop)
+AWSClientKey = tuple[str, str | None, str | None, str | None, asyncio.AbstractEventLoop]
+
 
 class AWSClientType(StrEnum):
     S3 = "s3"
@@ -17,6 +28,24 @@ class AWSClientType(StrEnum):
 
 
 class AsyncAWSClient:
+    """
+    The AWS clients are created on first use and shared by all the instances with the same credentials and region,
+    so the calls reuse the pooled connections instead of resolving the credentials and opening new TLS connections.
+    The clients are bound to the event loop they are created in.
+    """
+
+    _clients: dict[AWSClientKey, Any] = {}
+    _client_stacks: dict[AWSClientKey, AsyncExitStack] = {}
+    _client_locks: dict[AWSClientKey, asyncio.Lock] = {}
+    # the URLs are signed by a sync client in a thread: (region, access key id, secret access key) -> client
+    # the botocore session of a client resolves its credentials when they're not given explicitly
+    _presign_clients: dict[tuple[str | None, str | None, str | None], tuple[Any, botocore.session.Session]] = {}
+    _presign_clients_lock = threading.Lock()
+    # (access key id, uri) -> (presigned url, monotonic time until which it's reused)
+    _presigned_urls: LRUCache[tuple[str | None, str], tuple[str, float]] = LRUCache(
+        maxsize=settings.PRESIGNED_URL_CACHE_SIZE
+    )
+
     def __init__(
         self,
         aws_access_key_id: str | None = None,
@@ -31,11 +60,61 @@ class AsyncAWSClient:
             aws_secret_access_key=self.aws_secret_access_key,
         )
 
+    async def _get_client(self, client_type: AWSClientType) -> Any:
+        key: AWSClientKey = (
+            client_type,
+            self.region_name,
+            self.aws_access_key_id,
+            self.aws_secret_access_key,
+            asyncio.get_running_loop(),
+        )
+        if client := self._clients.get(key):
+            return client
+        self._prune_closed_loops()
+        async with self._client_locks.setdefault(key, asyncio.Lock()):
+            if client := self._clients.get(key):
+                return client
+            exit_stack = AsyncExitStack()
+            client = await exit_stack.enter_async_context(
+                self.session.client(
+                    client_type,
+                    region_name=self.region_name,
+                    endpoint_url=settings.AWS_ENDPOINT_URL if client_type == AWSClientType.S3 else None,
+                    config=AioConfig(max_pool_connections=settings.AWS_MAX_POOL_CONNECTIONS, tcp_keepalive=True),
+                )
+            )
+            self._clients[key] = client
+            self._client_stacks[key] = exit_stack
+            return client
+
+    @classmethod
+    def _prune_closed_loops(cls) -> None:
+        # the clients of a closed loop can't be closed anymore, only drop them so the loop can be collected
+        for key in [key for key in cls._clients if key[-1].is_closed()]:
+            cls._clients.pop(key)
+            cls._client_stacks.pop(key, None)
+        for key in [key for key in cls._client_locks if key[-1].is_closed()]:
+            cls._client_locks.pop(key)
+
+    @classmethod
+    async def close_clients(cls) -> None:
+        """
+        Close the clients created in the running event loop.
+        """
+        loop = asyncio.get_running_loop()
+        for key in [key for key in cls._clients if key[-1] is loop]:
+            cls._clients.pop(key)
+            cls._client_locks.pop(key, None)
+            try:
+                await cls._client_stacks.pop(key).aclose()
+            except Exception:
+                LOG.warning("Failed to close the AWS client", client_type=key[0], exc_info=True)
+
     async def get_secret(self, secret_name: str) -> str | None:
         try:
-            async with self.session.client(AWSClientType.SECRETS_MANAGER, region_name=self.region_name) as client:
-                response = await client.get_secret_value(SecretId=secret_name)
-                return response["SecretString"]
+            client = await self._get_client(AWSClientType.SECRETS_MANAGER)
+            response = await client.get_secret_value(SecretId=secret_name)
+            return response["SecretString"]
         except Exception as e:
             try:
                 error_code = e.response["Error"]["Code"]  # type: ignore
@@ -46,45 +125,46 @@ class AsyncAWSClient:
 
     async def create_secret(self, secret_name: str, secret_value: str) -> None:
         try:
-            async with self.session.client(AWSClientType.SECRETS_MANAGER, region_name=self.region_name) as client:
-                await client.create_secret(Name=secret_name, SecretString=secret_value)
+            client = await self._get_client(AWSClientType.SECRETS_MANAGER)
+            await client.create_secret(Name=secret_name, SecretString=secret_value)
         except Exception as e:
             LOG.exception("Failed to create secret.", secret_name=secret_name)
             raise e
 
     async def set_secret(self, secret_name: str, secret_value: str) -> None:
         try:
-            async with self.session.client(AWSClientType.SECRETS_MANAGER, region_name=self.region_name) as client:
-                await client.put_secret_value(SecretId=secret_name, SecretString=secret_value)
+            client = await self._get_client(AWSClientType.SECRETS_MANAGER)
+            await client.put_secret_value(SecretId=secret_name, SecretString=secret_value)
         except Exception as e:
             LOG.exception("Failed to set secret.", secret_name=secret_name)
             raise e
 
     async def delete_secret(self, secret_name: str) -> None:
         try:
-            async with self.session.client(AWSClientType.SECRETS_MANAGER, region_name=self.region_name) as client:
-                await client.delete_secret(SecretId=secret_name)
+            client = await self._get_client(AWSClientType.SECRETS_MANAGER)
+            await client.delete_secret(SecretId=secret_name)
         except Exception as e:
             LOG.exception("Failed to delete secret.", secret_name=secret_name)
             raise e
 
     async def upload_file(self, uri: str, data: bytes) -> str | None:
         try:
-            async with self.session.client(AWSClientType.S3, region_name=self.region_name) as client:
-                parsed_uri = S3Uri(uri)
+            parsed_uri = S3Uri(uri)
+            if len(data) > settings.AWS_S3_MULTIPART_CHUNK_SIZE:
+                await self._upload_stream(parsed_uri, io.BytesIO(data))
+            else:
+                client = await self._get_client(AWSClientType.S3)
                 await client.put_object(Body=data, Bucket=parsed_uri.bucket, Key=parsed_uri.key)
-                return uri
+            return uri
         except Exception:
             LOG.exception("S3 upload failed.", uri=uri)
             return None
 
     async def upload_file_stream(self, uri: str, file_obj: IO[bytes]) -> str | None:
         try:
-            async with self.session.client(AWSClientType.S3, region_name=self.region_name) as client:
-                parsed_uri = S3Uri(uri)
-                await client.upload_fileobj(file_obj, parsed_uri.bucket, parsed_uri.key)
-                LOG.debug("Upload file stream success", uri=uri)
-                return uri
+            await self._upload_stream(S3Uri(uri), file_obj)
+            LOG.debug("Upload file stream success", uri=uri)
+            return uri
         except Exception:
             LOG.exception("S3 upload stream failed.", uri=uri)
             return None
@@ -97,36 +177,101 @@ class AsyncAWSClient:
         raise_exception: bool = False,
     ) -> None:
         try:
-            async with self.session.client(AWSClientType.S3, region_name=self.region_name) as client:
-                parsed_uri = S3Uri(uri)
-                params: dict[str, Any] = {
-                    "Filename": file_path,
-                    "Bucket": parsed_uri.bucket,
-                    "Key": parsed_uri.key,
-                }
-
-                if metadata:
-                    params["ExtraArgs"] = {"Metadata": metadata}
-
-                await client.upload_file(**params)
+            with open(file_path, "rb") as file_obj:
+                await self._upload_stream(S3Uri(uri), file_obj, metadata=metadata)
         except Exception as e:
             LOG.exception("S3 upload failed.", uri=uri)
             if raise_exception:
                 raise e
 
+    async def _upload_stream(self, parsed_uri: "S3Uri", file_obj: IO[bytes], metadata: dict | None = None) -> None:
+        """
+        Upload the stream in one request if it fits in a part, otherwise as a multipart upload.
+        The parts are read one at a time and uploaded in parallel, at most AWS_S3_MULTIPART_CONCURRENCY parts
+        are held in memory.
+        """
+        client = await self._get_client(AWSClientType.S3)
+        chunk_size = settings.AWS_S3_MULTIPART_CHUNK_SIZE
+        extra_args: dict[str, Any] = {"Metadata": metadata} if metadata else {}
+        first_part = await asyncio.to_thread(file_obj.read, chunk_size)
+        if len(first_part) < chunk_size:
+            await client.put_object(Body=first_part, Bucket=parsed_uri.bucket, Key=parsed_uri.key, **extra_args)
+            return
+
+        upload_id = (await client.create_multipart_upload(Bucket=parsed_uri.bucket, Key=parsed_uri.key, **extra_args))[
+            "UploadId"
+        ]
+        semaphore = asyncio.Semaphore(settings.AWS_S3_MULTIPART_CONCURRENCY)
+
+        async def upload_part(part_number: int, body: bytes) -> dict[str, Any]:
+            try:
+                response = await client.upload_part(
+                    Body=body,
+                    Bucket=parsed_uri.bucket,
+                    Key=parsed_uri.key,
+                    PartNumber=part_number,
+                    UploadId=upload_id,
+                )
+                return {"ETag": response["ETag"], "PartNumber": part_number}
+            finally:
+                semaphore.release()
+
+        part_uploads: list[asyncio.Task[dict[str, Any]]] = []
+        failed_part_uploads: list[asyncio.Task[dict[str, Any]]] = []
+
+        def on_part_upload_done(part_upload: asyncio.Task[dict[str, Any]]) -> None:
+            if not part_upload.cancelled() and part_upload.exception() is not None:
+                failed_part_uploads.append(part_upload)
+
+        try:
+            part = first_part
+            while part:
+                await semaphore.acquire()
+                # stop reading the file as soon as a part failed, the upload is aborted
+                if failed_part_uploads:
+                    failed_part_uploads[0].result()
+                part_upload = asyncio.create_task(upload_part(len(part_uploads) + 1, part))
+                part_upload.add_done_callback(on_part_upload_done)
+                part_uploads.append(part_upload)
+                part = await asyncio.to_thread(file_obj.read, chunk_size)
+            parts = await asyncio.gather(*part_uploads)
+            await client.complete_multipart_upload(
+                Bucket=parsed_uri.bucket,
+                Key=parsed_uri.key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+        except BaseException:
+            for part_upload in part_uploads:
+                part_upload.cancel()
+            await asyncio.gather(*part_uploads, return_exceptions=True)
+            try:
+                await client.abort_multipart_upload(Bucket=parsed_uri.bucket, Key=parsed_uri.key, UploadId=upload_id)
+            except Exception:
+                LOG.warning("Failed to abort the multipart upload", uri=parsed_uri.uri, exc_info=True)
+            raise
+
     async def download_file(self, uri: str, log_exception: bool = True) -> bytes | None:
         try:
-            async with self.session.client(AWSClientType.S3, region_name=self.region_name) as client:
-                parsed_uri = S3Uri(uri)
+            client = await self._get_client(AWSClientType.S3)
+            parsed_uri = S3Uri(uri)
 
-                # Get full object including body
-                response = await client.get_object(Bucket=parsed_uri.bucket, Key=parsed_uri.key)
-                return await response["Body"].read()
+            # Get full object including body
+            response = await client.get_object(Bucket=parsed_uri.bucket, Key=parsed_uri.key)
+            return await response["Body"].read()
         except Exception:
             if log_exception:
                 LOG.exception("S3 download failed", uri=uri)
             return None
 
+    async def delete_file(self, uri: str) -> None:
+        try:
+            client = await self._get_client(AWSClientType.S3)
+            parsed_uri = S3Uri(uri)
+            await client.delete_object(Bucket=parsed_uri.bucket, Key=parsed_uri.key)
+        except Exception:
+            LOG.exception("S3 delete failed", uri=uri)
+
     async def get_file_metadata(
         self,
         uri: str,
@@ -144,46 +289,92 @@ class AsyncAWSClient:
             The metadata dictionary or None if the request fails
         """
         try:
-            async with self.session.client(AWSClientType.S3, region_name=self.region_name) as client:
-                parsed_uri = S3Uri(uri)
+            client = await self._get_client(AWSClientType.S3)
+            parsed_uri = S3Uri(uri)
 
-                # Only get object metadata without the body
-                response = await client.head_object(Bucket=parsed_uri.bucket, Key=parsed_uri.key)
-                return response.get("Metadata", {})
+            # Only get object metadata without the body
+            response = await client.head_object(Bucket=parsed_uri.bucket, Key=parsed_uri.key)
+            return response.get("Metadata", {})
         except Exception:
             if log_exception:
                 LOG.exception("S3 metadata retrieval failed", uri=uri)
             return None
 
-    async def create_presigned_urls(self, uris: list[str]) -> list[str] | None:
+    def _get_presign_client(self) -> tuple[Any, botocore.session.Session]:
+        key = (self.region_name, self.aws_access_key_id, self.aws_secret_access_key)
+        with self._presign_clients_lock:
+            if key not in self._presign_clients:
+                session = botocore.session.get_session()
+                client = session.create_client(
+                    AWSClientType.S3,
+                    region_name=self.region_name,
+                    endpoint_url=settings.AWS_ENDPOINT_URL,
+                    aws_access_key_id=self.aws_access_key_id,
+                    aws_secret_access_key=self.aws_secret_access_key,
+                )
+                self._presign_clients[key] = (client, session)
+            return self._presign_clients[key]
+
+    def _sign_urls(self, uris: list[str]) -> tuple[list[str], bool]:
+        """
+        :return: the presigned urls, and whether they're signed with temporary credentials.
+        """
+        client, session = self._get_presign_client()
+        temporary_credentials = False
+        if self.aws_access_key_id is None:
+            credentials = session.get_credentials()
+            temporary_credentials = credentials is not None and credentials.get_frozen_credentials().token is not None
         presigned_urls = []
-        try:
-            async with self.session.client(AWSClientType.S3, region_name=self.region_name) as client:
-                for uri in uris:
-                    parsed_uri = S3Uri(uri)
-                    url = await client.generate_presigned_url(
-                        "get_object",
-                        Params={"Bucket": parsed_uri.bucket, "Key": parsed_uri.key},
-                        ExpiresIn=settings.PRESIGNED_URL_EXPIRATION,
-                    )
-                    presigned_urls.append(url)
-
-                return presigned_urls
-        except Exception:
-            LOG.exception("Failed to create presigned url for S3 objects.", uris=uris)
-            return None
+        for uri in uris:
+            parsed_uri = S3Uri(uri)
+            presigned_urls.append(
+                client.generate_presigned_url(
+                    "get_object",
+                    Params={"Bucket": parsed_uri.bucket, "Key": parsed_uri.key},
+                    ExpiresIn=settings.PRESIGNED_URL_EXPIRATION,
+                )
+            )
+        return presigned_urls, temporary_credentials
+
+    async def create_presigned_urls(self, uris: list[str]) -> list[str] | None:
+        """
+        The URLs signed recently are reused. The others are signed together in a thread: the signing is local,
+        it doesn't call S3, but it's CPU work that shouldn't block the event loop.
+        """
+        now = time.monotonic()
+        presigned_urls: dict[str, str] = {}
+        for uri in uris:
+            cached = self._presigned_urls.get((self.aws_access_key_id, uri))
+            if cached and cached[1] > now:
+                presigned_urls[uri] = cached[0]
+        uris_to_sign = list(dict.fromkeys(uri for uri in uris if uri not in presigned_urls))
+        if uris_to_sign:
+            try:
+                signed_urls, temporary_credentials = await asyncio.to_thread(self._sign_urls, uris_to_sign)
+            except Exception:
+                LOG.exception("Failed to create presigned url for S3 objects.", uris=uris)
+                return None
+            # reuse a URL for half its validity at most, so the clients always get a URL valid for a while
+            reuse_seconds = min(settings.PRESIGNED_URL_CACHE_TTL, settings.PRESIGNED_URL_EXPIRATION / 2)
+            if temporary_credentials:
+                reuse_seconds = min(reuse_seconds, settings.PRESIGNED_URL_TEMPORARY_CREDENTIALS_CACHE_TTL)
+            reuse_until = now + reuse_seconds
+            for uri, signed_url in zip(uris_to_sign, signed_urls):
+                presigned_urls[uri] = signed_url
+                self._presigned_urls[(self.aws_access_key_id, uri)] = (signed_url, reuse_until)
+        return [presigned_urls[uri] for uri in uris]
 
     async def list_files(self, uri: str) -> list[str]:
         object_keys: list[str] = []
         parsed_uri = S3Uri(uri)
-        async with self.session.client(AWSClientType.S3, region_name=self.region_name) as client:
-            async for page in client.get_paginator("list_objects_v2").paginate(
-                Bucket=parsed_uri.bucket, Prefix=parsed_uri.key
-            ):
-                if "Contents" in page:
-                    for obj in page["Contents"]:
-                        object_keys.append(obj["Key"])
-            return object_keys
+        client = await self._get_client(AWSClientType.S3)
+        async for page in client.get_paginator("list_objects_v2").paginate(
+            Bucket=parsed_uri.bucket, Prefix=parsed_uri.key
+        ):
+            if "Contents" in page:
+                for obj in page["Contents"]:
+                    object_keys.append(obj["Key"])
+        return object_keys
 
     async def run_task(
         self,
@@ -193,39 +384,39 @@ class AsyncAWSClient:
         subnets: list[str],
         security_groups: list[str],
     ) -> dict:
-        async with self.session.client(AWSClientType.ECS, region_name=self.region_name) as client:
-            return await client.run_task(
-                cluster=cluster,
-                launchType=launch_type,
-                taskDefinition=task_definition,
-                networkConfiguration={
-                    "awsvpcConfiguration": {
-                        "subnets": subnets,
-                        "securityGroups": security_groups,
-                        "assignPublicIp": "DISABLED",
-                    }
-                },
-            )
+        client = await self._get_client(AWSClientType.ECS)
+        return await client.run_task(
+            cluster=cluster,
+            launchType=launch_type,
+            taskDefinition=task_definition,
+            networkConfiguration={
+                "awsvpcConfiguration": {
+                    "subnets": subnets,
+                    "securityGroups": security_groups,
+                    "assignPublicIp": "DISABLED",
+                }
+            },
+        )
 
     async def stop_task(self, cluster: str, task: str, reason: str | None = None) -> dict:
-        async with self.session.client(AWSClientType.ECS, region_name=self.region_name) as client:
-            return await client.stop_task(cluster=cluster, task=task, reason=reason)
+        client = await self._get_client(AWSClientType.ECS)
+        return await client.stop_task(cluster=cluster, task=task, reason=reason)
 
     async def describe_tasks(self, cluster: str, tasks: list[str]) -> dict:
-        async with self.session.client(AWSClientType.ECS, region_name=self.region_name) as client:
-            return await client.describe_tasks(cluster=cluster, tasks=tasks)
+        client = await self._get_client(AWSClientType.ECS)
+        return await client.describe_tasks(cluster=cluster, tasks=tasks)
 
     async def list_tasks(self, cluster: str) -> dict:
-        async with self.session.client(AWSClientType.ECS, region_name=self.region_name) as client:
-            return await client.list_tasks(cluster=cluster)
+        client = await self._get_client(AWSClientType.ECS)
+        return await client.list_tasks(cluster=cluster)
 
     async def describe_task_definition(self, task_definition: str) -> dict:
-        async with self.session.client(AWSClientType.ECS, region_name=self.region_name) as client:
-            return await client.describe_task_definition(taskDefinition=task_definition)
+        client = await self._get_client(AWSClientType.ECS)
+        return await client.describe_task_definition(taskDefinition=task_definition)
 
     async def deregister_task_definition(self, task_definition: str) -> dict:
-        async with self.session.client(AWSClientType.ECS, region_name=self.region_name) as client:
-            return await client.deregister_task_definition(taskDefinition=task_definition)
+        client = await self._get_client(AWSClientType.ECS)
+        return await client.deregister_task_definition(taskDefinition=task_definition)
 
 
 class S3Uri(object):
@@ -22,6 +22,7 @@ from skyvern.forge.sdk.api.llm.exceptions import (
     LLMProviderErrorRetryableTask,
 )
 from skyvern.forge.sdk.api.llm.models import LLMAPIHandler, LLMConfig, LLMRouterConfig, dummy_llm_api_handler
+from skyvern.forge.sdk.api.llm.usage import LLMUsage
 from skyvern.forge.sdk.api.llm.utils import llm_messages_builder, llm_messages_builder_with_history, parse_api_response
 from skyvern.forge.sdk.artifact.models import ArtifactType
 from skyvern.forge.sdk.core import skyvern_context
@@ -112,15 +113,12 @@ class LLMAPIHandlerFactory:
             )
             messages = await llm_messages_builder(prompt, screenshots, llm_config.add_assistant_prefix)
 
-            await app.ARTIFACT_MANAGER.create_llm_artifact(
-                data=json.dumps(
-                    {
-                        "model": llm_key,
-                        "messages": messages,
-                        **parameters,
-                    }
-                ).encode("utf-8"),
-                artifact_type=ArtifactType.LLM_REQUEST,
+            await app.ARTIFACT_MANAGER.create_llm_request_artifact(
+                request={
+                    "model": llm_key,
+                    "messages": messages,
+                    **parameters,
+                },
                 step=step,
                 task_v2=task_v2,
                 thought=thought,
@@ -177,26 +175,26 @@ class LLMAPIHandlerFactory:
                 if cached_token_detail:
                     cached_tokens = cached_token_detail.cached_tokens or 0
                 if step:
-                    await app.DATABASE.update_step(
-                        task_id=step.task_id,
-                        step_id=step.step_id,
-                        organization_id=step.organization_id,
+                    await app.STEP_USAGE_ACCUMULATOR.add(
+                        step,
+                        LLMUsage(
+                            cost=llm_cost,
+                            input_tokens=prompt_tokens,
+                            output_tokens=completion_tokens,
+                            reasoning_tokens=reasoning_tokens,
+                            cached_tokens=cached_tokens,
+                        ),
+                    )
+                if thought:
+                    await app.DATABASE.increment_thought_usage(
+                        thought_id=thought.observer_thought_id,
+                        organization_id=thought.organization_id,
                         incremental_cost=llm_cost,
                         incremental_input_tokens=prompt_tokens if prompt_tokens > 0 else None,
                         incremental_output_tokens=completion_tokens if completion_tokens > 0 else None,
                         incremental_reasoning_tokens=reasoning_tokens if reasoning_tokens > 0 else None,
                         incremental_cached_tokens=cached_tokens if cached_tokens > 0 else None,
                     )
-                if thought:
-                    await app.DATABASE.update_thought(
-                        thought_id=thought.observer_thought_id,
-                        organization_id=thought.organization_id,
-                        input_token_count=prompt_tokens if prompt_tokens > 0 else None,
-                        output_token_count=completion_tokens if completion_tokens > 0 else None,
-                        thought_cost=llm_cost,
-                        reasoning_token_count=reasoning_tokens if reasoning_tokens > 0 else None,
-                        cached_token_count=cached_tokens if cached_tokens > 0 else None,
-                    )
             parsed_response = parse_api_response(response, llm_config.add_assistant_prefix)
             await app.ARTIFACT_MANAGER.create_llm_artifact(
                 data=json.dumps(parsed_response, indent=2).encode("utf-8"),
@@ -293,16 +291,13 @@ class LLMAPIHandlerFactory:
                 screenshots = None
 
             messages = await llm_messages_builder(prompt, screenshots, llm_config.add_assistant_prefix)
-            await app.ARTIFACT_MANAGER.create_llm_artifact(
-                data=json.dumps(
-                    {
-                        "model": llm_config.model_name,
-                        "messages": messages,
-                        # we're not using active_parameters here because it may contain sensitive information
-                        **parameters,
-                    }
-                ).encode("utf-8"),
-                artifact_type=ArtifactType.LLM_REQUEST,
+            await app.ARTIFACT_MANAGER.create_llm_request_artifact(
+                request={
+                    "model": llm_config.model_name,
+                    "messages": messages,
+                    # we're not using active_parameters here because it may contain sensitive information
+                    **parameters,
+                },
                 step=step,
                 task_v2=task_v2,
                 thought=thought,
@@ -367,26 +362,26 @@ class LLMAPIHandlerFactory:
                 if cached_token_detail:
                     cached_tokens = cached_token_detail.cached_tokens or 0
                 if step:
-                    await app.DATABASE.update_step(
-                        task_id=step.task_id,
-                        step_id=step.step_id,
-                        organization_id=step.organization_id,
+                    await app.STEP_USAGE_ACCUMULATOR.add(
+                        step,
+                        LLMUsage(
+                            cost=llm_cost,
+                            input_tokens=prompt_tokens,
+                            output_tokens=completion_tokens,
+                            reasoning_tokens=reasoning_tokens,
+                            cached_tokens=cached_tokens,
+                        ),
+                    )
+                if thought:
+                    await app.DATABASE.increment_thought_usage(
+                        thought_id=thought.observer_thought_id,
+                        organization_id=thought.organization_id,
                         incremental_cost=llm_cost,
                         incremental_input_tokens=prompt_tokens if prompt_tokens > 0 else None,
                         incremental_output_tokens=completion_tokens if completion_tokens > 0 else None,
                         incremental_reasoning_tokens=reasoning_tokens if reasoning_tokens > 0 else None,
                         incremental_cached_tokens=cached_tokens if cached_tokens > 0 else None,
                     )
-                if thought:
-                    await app.DATABASE.update_thought(
-                        thought_id=thought.observer_thought_id,
-                        organization_id=thought.organization_id,
-                        input_token_count=prompt_tokens if prompt_tokens > 0 else None,
-                        output_token_count=completion_tokens if completion_tokens > 0 else None,
-                        reasoning_token_count=reasoning_tokens if reasoning_tokens > 0 else None,
-                        cached_token_count=cached_tokens if cached_tokens > 0 else None,
-                        thought_cost=llm_cost,
-                    )
             parsed_response = parse_api_response(response, llm_config.add_assistant_prefix)
             await app.ARTIFACT_MANAGER.create_llm_artifact(
                 data=json.dumps(parsed_response, indent=2).encode("utf-8"),
@@ -564,16 +559,13 @@ class LLMCaller:
                 screenshots,
                 message_pattern=message_pattern,
             )
-        await app.ARTIFACT_MANAGER.create_llm_artifact(
-            data=json.dumps(
-                {
-                    "model": self.llm_config.model_name,
-                    "messages": messages,
-                    # we're not using active_parameters here because it may contain sensitive information
-                    **parameters,
-                }
-            ).encode("utf-8"),
-            artifact_type=ArtifactType.LLM_REQUEST,
+        await app.ARTIFACT_MANAGER.create_llm_request_artifact(
+            request={
+                "model": self.llm_config.model_name,
+                "messages": messages,
+                # we're not using active_parameters here because it may contain sensitive information
+                **parameters,
+            },
             step=step,
             task_v2=task_v2,
             thought=thought,
@@ -638,26 +630,26 @@ class LLMCaller:
             if cached_token_detail:
                 cached_tokens = cached_token_detail.cached_tokens or 0
             if step:
-                await app.DATABASE.update_step(
-                    task_id=step.task_id,
-                    step_id=step.step_id,
-                    organization_id=step.organization_id,
+                await app.STEP_USAGE_ACCUMULATOR.add(
+                    step,
+                    LLMUsage(
+                        cost=llm_cost,
+                        input_tokens=prompt_tokens,
+                        output_tokens=completion_tokens,
+                        reasoning_tokens=reasoning_tokens,
+                        cached_tokens=cached_tokens,
+                    ),
+                )
+            if thought:
+                await app.DATABASE.increment_thought_usage(
+                    thought_id=thought.observer_thought_id,
+                    organization_id=thought.organization_id,
                     incremental_cost=llm_cost,
                     incremental_input_tokens=prompt_tokens if prompt_tokens > 0 else None,
                     incremental_output_tokens=completion_tokens if completion_tokens > 0 else None,
                     incremental_reasoning_tokens=reasoning_tokens if reasoning_tokens > 0 else None,
                     incremental_cached_tokens=cached_tokens if cached_tokens > 0 else None,
                 )
-            if thought:
-                await app.DATABASE.update_thought(
-                    thought_id=thought.observer_thought_id,
-                    organization_id=thought.organization_id,
-                    input_token_count=prompt_tokens if prompt_tokens > 0 else None,
-                    output_token_count=completion_tokens if completion_tokens > 0 else None,
-                    reasoning_token_count=reasoning_tokens if reasoning_tokens > 0 else None,
-                    cached_token_count=cached_tokens if cached_tokens > 0 else None,
-                    thought_cost=llm_cost,
-                )
         # Track LLM API handler duration
         duration_seconds = time.perf_counter() - start_time
         LOG.info(
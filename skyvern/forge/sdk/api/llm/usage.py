@@ -0,0 +1,103 @@
+import asyncio
+from dataclasses import dataclass
+
+import structlog
+
+from skyvern.config import settings
+from skyvern.forge import app
+from skyvern.forge.sdk.models import Step
+
+LOG = structlog.get_logger(__name__)
+
+
+@dataclass
+class LLMUsage:
+    cost: float = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    reasoning_tokens: int = 0
+    cached_tokens: int = 0
+
+    def add(self, other: "LLMUsage") -> None:
+        self.cost += other.cost
+        self.input_tokens += other.input_tokens
+        self.output_tokens += other.output_tokens
+        self.reasoning_tokens += other.reasoning_tokens
+        self.cached_tokens += other.cached_tokens
+
+
+@dataclass
+class _PendingStepUsage:
+    task_id: str
+    organization_id: str | None
+    usage: LLMUsage
+
+
+class StepUsageAccumulator:
+    """
+    Sum the LLM usage of every step in memory and write it with one atomic increment per step:
+    at the step boundary (see ForgeAgent.update_step), or after the flush interval.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = settings.STEP_USAGE_WRITE_BEHIND_ENABLED,
+        flush_interval_seconds: float = settings.STEP_USAGE_FLUSH_INTERVAL_MS / 1000,
+    ) -> None:
+        self.enabled = enabled
+        self.flush_interval_seconds = flush_interval_seconds
+        # step_id -> the usage not written yet
+        self._pending: dict[str, _PendingStepUsage] = {}
+        self._flush_timer: asyncio.Task[None] | None = None
+
+    async def add(self, step: Step, usage: LLMUsage) -> None:
+        if not self.enabled:
+            await self._write(step.step_id, _PendingStepUsage(step.task_id, step.organization_id, usage))
+            return
+        pending = self._pending.get(step.step_id)
+        if pending is None:
+            self._pending[step.step_id] = _PendingStepUsage(step.task_id, step.organization_id, LLMUsage())
+            pending = self._pending[step.step_id]
+        pending.usage.add(usage)
+        if self._flush_timer is None or self._flush_timer.done():
+            self._flush_timer = asyncio.create_task(self._flush_after_interval())
+
+    async def flush(self, step_id: str | None = None) -> None:
+        """
+        Write the pending usage of the step, or of all the steps if step_id is None.
+        """
+        step_ids = [step_id] if step_id is not None else list(self._pending)
+        for pending_step_id in step_ids:
+            # pop before writing, the usage added during the write is kept for the next flush
+            pending = self._pending.pop(pending_step_id, None)
+            if pending is not None:
+                await self._write(pending_step_id, pending)
+
+    async def close(self) -> None:
+        """
+        Write the pending usage of all the steps, eg: when the process stops before the steps are finished.
+        """
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        await self.flush()
+
+    async def _write(self, step_id: str, pending: _PendingStepUsage) -> None:
+        usage = pending.usage
+        try:
+            await app.DATABASE.update_step(
+                task_id=pending.task_id,
+                step_id=step_id,
+                organization_id=pending.organization_id,
+                incremental_cost=usage.cost,
+                incremental_input_tokens=usage.input_tokens if usage.input_tokens > 0 else None,
+                incremental_output_tokens=usage.output_tokens if usage.output_tokens > 0 else None,
+                incremental_reasoning_tokens=usage.reasoning_tokens if usage.reasoning_tokens > 0 else None,
+                incremental_cached_tokens=usage.cached_tokens if usage.cached_tokens > 0 else None,
+            )
+        except Exception:
+            LOG.exception("Failed to write the LLM usage of the step", task_id=pending.task_id, step_id=step_id)
+
+    async def _flush_after_interval(self) -> None:
+        await asyncio.sleep(self.flush_interval_seconds)
+        await self.flush()
@@ -1,11 +1,27 @@
 import asyncio
+import base64
+import hashlib
+import json
+import os
 import time
 from collections import defaultdict
+from datetime import datetime
+from typing import Any
 
 import structlog
+from cachetools import LRUCache
 
 from skyvern.forge import app
-from skyvern.forge.sdk.artifact.models import Artifact, ArtifactType, LogEntityType
+from skyvern.forge.sdk.artifact.models import (
+    Artifact,
+    ArtifactType,
+    LogEntityType,
+    RecordingManifest,
+    RecordingPart,
+    build_recording_manifest_uri,
+    build_recording_part_uri,
+)
+from skyvern.forge.sdk.artifact.writer import ArtifactWriter
 from skyvern.forge.sdk.db.id import generate_artifact_id
 from skyvern.forge.sdk.models import Step
 from skyvern.forge.sdk.schemas.ai_suggestions import AISuggestion
@@ -14,10 +30,20 @@ from skyvern.forge.sdk.schemas.workflow_runs import WorkflowRunBlock
 
 LOG = structlog.get_logger(__name__)
 
+# stored once per content: the same screenshots are sent again across retries and secondary LLM calls
+CONTENT_ADDRESSED_ARTIFACT_TYPES = {ArtifactType.SCREENSHOT_LLM}
+
 
 class ArtifactManager:
-    # task_id -> list of aio_tasks for uploading artifacts
-    upload_aiotasks_map: dict[str, list[asyncio.Task[None]]] = defaultdict(list)
+    # task_id -> list of futures of the artifact uploads
+    upload_aiotasks_map: dict[str, list[asyncio.Future[None]]] = defaultdict(list)
+    artifact_writer = ArtifactWriter()
+    # recording artifact_id -> the parts uploaded so far
+    recording_manifests: dict[str, RecordingManifest] = {}
+    # recording artifact_id -> the latest manifest upload, the manifest uploads of a recording are chained
+    recording_manifest_uploads: dict[str, asyncio.Task[None]] = {}
+    # blob uri -> the upload of the blob, so the same content is only enqueued once
+    blob_uploads: LRUCache[str, asyncio.Future[None]] = LRUCache(maxsize=10000)
 
     async def _create_artifact(
         self,
@@ -40,30 +66,51 @@ class ArtifactManager:
             raise ValueError("Either data or path must be provided to create an artifact.")
         if data and path:
             raise ValueError("Both data and path cannot be provided to create an artifact.")
-        artifact = await app.DATABASE.create_artifact(
-            artifact_id,
-            artifact_type,
-            uri,
+        content_addressed = bool(data) and artifact_type in CONTENT_ADDRESSED_ARTIFACT_TYPES
+        if data and content_addressed:
+            uri = app.STORAGE.build_blob_uri(organization_id, hashlib.sha256(data).hexdigest(), artifact_type)
+        now = datetime.utcnow()
+        artifact = Artifact(
+            artifact_id=artifact_id,
+            artifact_type=artifact_type,
+            uri=uri,
             step_id=step_id,
             task_id=task_id,
             workflow_run_id=workflow_run_id,
             workflow_run_block_id=workflow_run_block_id,
-            thought_id=thought_id,
-            task_v2_id=task_v2_id,
-            organization_id=organization_id,
+            observer_thought_id=thought_id,
+            observer_cruise_id=task_v2_id,
             ai_suggestion_id=ai_suggestion_id,
+            organization_id=organization_id,
+            created_at=now,
+            modified_at=now,
         )
-        if data:
-            # Fire and forget
-            aio_task = asyncio.create_task(app.STORAGE.store_artifact(artifact, data))
-            self.upload_aiotasks_map[aio_task_primary_key].append(aio_task)
+        # the row is inserted with the next batch, the payload is uploaded in the background
+        await self.artifact_writer.add_artifact(artifact)
+        if data and content_addressed:
+            upload = await self._store_blob(artifact, data)
+            self.upload_aiotasks_map[aio_task_primary_key].append(upload)
+        elif data:
+            upload = await self.artifact_writer.upload(artifact, data=data)
+            self.upload_aiotasks_map[aio_task_primary_key].append(upload)
         elif path:
-            # Fire and forget
-            aio_task = asyncio.create_task(app.STORAGE.store_artifact_from_path(artifact, path))
-            self.upload_aiotasks_map[aio_task_primary_key].append(aio_task)
+            upload = await self.artifact_writer.upload(artifact, path=path)
+            self.upload_aiotasks_map[aio_task_primary_key].append(upload)
 
         return artifact_id
 
+    async def _store_blob(self, artifact: Artifact, data: bytes) -> asyncio.Future[None]:
+        upload = self.blob_uploads.get(artifact.uri)
+        # an upload of another event loop can't be awaited, eg: it was enqueued by a previous asyncio.run
+        if (
+            upload is None
+            or upload.get_loop() is not asyncio.get_running_loop()
+            or (upload.done() and (upload.cancelled() or upload.exception() is not None))
+        ):
+            upload = await self.artifact_writer.upload(artifact, data=data, skip_if_exists=True)
+            self.blob_uploads[artifact.uri] = upload
+        return upload
+
     async def create_artifact(
         self,
         step: Step,
@@ -255,6 +302,80 @@ class ArtifactManager:
                     data=screenshot,
                 )
 
+    async def create_llm_request_artifact(
+        self,
+        request: dict[str, Any],
+        step: Step | None = None,
+        thought: Thought | None = None,
+        task_v2: TaskV2 | None = None,
+        ai_suggestion: AISuggestion | None = None,
+    ) -> None:
+        """
+        Store the LLM request with its inline base64 images replaced by the uris of the content-addressed blobs.
+        """
+        if step:
+            organization_id, primary_key = step.organization_id, step.task_id
+        elif task_v2:
+            organization_id, primary_key = task_v2.organization_id, task_v2.observer_cruise_id
+        elif thought:
+            organization_id, primary_key = thought.organization_id, thought.observer_cruise_id
+        elif ai_suggestion:
+            organization_id, primary_key = ai_suggestion.organization_id, ai_suggestion.ai_suggestion_id
+        else:
+            return
+
+        request = await self._replace_inline_images(request, organization_id, primary_key)
+        await self.create_llm_artifact(
+            data=json.dumps(request).encode("utf-8"),
+            artifact_type=ArtifactType.LLM_REQUEST,
+            step=step,
+            thought=thought,
+            task_v2=task_v2,
+            ai_suggestion=ai_suggestion,
+        )
+
+    async def _replace_inline_images(self, value: Any, organization_id: str | None, primary_key: str) -> Any:
+        if isinstance(value, list):
+            return [await self._replace_inline_images(item, organization_id, primary_key) for item in value]
+        if not isinstance(value, dict):
+            return value
+
+        # openai format: {"type": "image_url", "image_url": {"url": "data:image/png;base64,..."}}
+        image_url = value.get("image_url")
+        if value.get("type") == "image_url" and isinstance(image_url, dict):
+            url = image_url.get("url", "")
+            if url.startswith("data:") and "," in url:
+                blob_uri = await self._store_inline_image(url.split(",", 1)[1], organization_id, primary_key)
+                return {**value, "image_url": {**image_url, "url": blob_uri}}
+        # anthropic format: {"type": "image", "source": {"type": "base64", "data": "..."}}
+        source = value.get("source")
+        if value.get("type") == "image" and isinstance(source, dict) and source.get("type") == "base64":
+            blob_uri = await self._store_inline_image(source.get("data", ""), organization_id, primary_key)
+            return {**value, "source": {"type": "url", "url": blob_uri}}
+
+        return {
+            key: await self._replace_inline_images(item, organization_id, primary_key) for key, item in value.items()
+        }
+
+    async def _store_inline_image(self, encoded_image: str, organization_id: str | None, primary_key: str) -> str:
+        data = base64.b64decode(encoded_image)
+        artifact_type = ArtifactType.SCREENSHOT_LLM
+        blob_uri = app.STORAGE.build_blob_uri(organization_id, hashlib.sha256(data).hexdigest(), artifact_type)
+        # the image has most likely been stored as a SCREENSHOT_LLM artifact already
+        if blob_uri not in self.blob_uploads:
+            now = datetime.utcnow()
+            blob_artifact = Artifact(
+                artifact_id=generate_artifact_id(),
+                artifact_type=artifact_type,
+                uri=blob_uri,
+                organization_id=organization_id,
+                created_at=now,
+                modified_at=now,
+            )
+            upload = await self._store_blob(blob_artifact, data)
+            self.upload_aiotasks_map[primary_key].append(upload)
+        return blob_uri
+
     async def update_artifact_data(
         self,
         artifact_id: str | None,
@@ -264,26 +385,144 @@ class ArtifactManager:
     ) -> None:
         if not artifact_id or not organization_id:
             return None
-        artifact = await app.DATABASE.get_artifact_by_id(artifact_id, organization_id)
+        # the full recording is uploaded at the end, the parts are no longer updated
+        manifest = self.recording_manifests.get(artifact_id)
+        manifest_upload = self.recording_manifest_uploads.get(artifact_id)
+        try:
+            artifact = await self._get_artifact(artifact_id, organization_id)
+            if not artifact:
+                return
+
+            if not artifact[primary_key]:
+                raise ValueError(f"{primary_key} is required to update artifact data.")
+            upload = await self.artifact_writer.upload(artifact, data=data)
+            self.upload_aiotasks_map[artifact[primary_key]].append(upload)
+            if manifest:
+                parts_deletion = asyncio.create_task(
+                    self._delete_recording_parts(artifact, manifest, upload, manifest_upload)
+                )
+                self.upload_aiotasks_map[artifact[primary_key]].append(parts_deletion)
+        finally:
+            self.recording_manifests.pop(artifact_id, None)
+            self.recording_manifest_uploads.pop(artifact_id, None)
+
+    async def append_recording_data(
+        self,
+        artifact_id: str | None,
+        organization_id: str | None,
+        video_path: str | None,
+        primary_key: str = "task_id",
+    ) -> None:
+        """
+        Upload the bytes appended to the video file since the last call as a new part of the recording artifact,
+        instead of uploading the whole video again.
+        """
+        if not artifact_id or not organization_id or not video_path or not os.path.exists(video_path):
+            return None
+        artifact = await self._get_artifact(artifact_id, organization_id)
         if not artifact:
             return
-        # Fire and forget
-        aio_task = asyncio.create_task(app.STORAGE.store_artifact(artifact, data))
-
         if not artifact[primary_key]:
             raise ValueError(f"{primary_key} is required to update artifact data.")
-        self.upload_aiotasks_map[artifact[primary_key]].append(aio_task)
+
+        manifest = self.recording_manifests.setdefault(artifact_id, RecordingManifest())
+        offset = manifest.size
+        with open(video_path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        if not data:
+            return
+
+        part_artifact = artifact.model_copy(update={"uri": build_recording_part_uri(artifact.uri, len(manifest.parts))})
+        manifest.parts.append(RecordingPart(uri=part_artifact.uri, offset=offset, size=len(data)))
+        part_upload = await self.artifact_writer.upload(part_artifact, data=data)
+
+        manifest_artifact = artifact.model_copy(update={"uri": build_recording_manifest_uri(artifact.uri)})
+        manifest_upload = asyncio.create_task(
+            self._upload_recording_manifest(
+                manifest_artifact,
+                manifest.model_dump_json().encode(),
+                part_upload,
+                self.recording_manifest_uploads.get(artifact_id),
+            )
+        )
+        self.recording_manifest_uploads[artifact_id] = manifest_upload
+        self.upload_aiotasks_map[artifact[primary_key]].extend([part_upload, manifest_upload])
+
+    @staticmethod
+    async def _upload_recording_manifest(
+        manifest_artifact: Artifact,
+        manifest_data: bytes,
+        part_upload: asyncio.Future[None],
+        previous_manifest_upload: asyncio.Task[None] | None,
+    ) -> None:
+        # the manifest only lists the parts that are uploaded, and an older manifest never overwrites a newer one
+        if previous_manifest_upload:
+            await asyncio.gather(previous_manifest_upload, return_exceptions=True)
+        await part_upload
+        await app.STORAGE.store_artifact(manifest_artifact, manifest_data)
+
+    @staticmethod
+    async def _delete_recording_parts(
+        artifact: Artifact,
+        manifest: RecordingManifest,
+        upload: asyncio.Future[None],
+        manifest_upload: asyncio.Task[None] | None,
+    ) -> None:
+        # a manifest upload still in flight would bring the manifest back after it's deleted
+        if manifest_upload:
+            await asyncio.gather(manifest_upload, return_exceptions=True)
+        await upload
+        # the parts are the only copy of the recording until the full video is stored
+        if not await app.STORAGE.blob_exists(artifact.uri):
+            LOG.warning("The full recording is not stored, keeping its parts", artifact_id=artifact.artifact_id)
+            return
+        part_uris = [part.uri for part in manifest.parts] + [build_recording_manifest_uri(artifact.uri)]
+        await asyncio.gather(
+            *[app.STORAGE.delete_artifact(artifact.model_copy(update={"uri": part_uri})) for part_uri in part_uris]
+        )
+
+    async def _get_artifact(self, artifact_id: str, organization_id: str) -> Artifact | None:
+        return self.artifact_writer.get_pending_artifact(artifact_id) or await app.DATABASE.get_artifact_by_id(
+            artifact_id, organization_id
+        )
 
     async def retrieve_artifact(self, artifact: Artifact) -> bytes | None:
-        return await app.STORAGE.retrieve_artifact(artifact)
+        data = await app.STORAGE.retrieve_artifact(artifact)
+        if data is None and artifact.artifact_type == ArtifactType.RECORDING:
+            # the run is still in progress, assemble the recording from its parts
+            return await self._retrieve_recording_parts(artifact)
+        return data
+
+    @staticmethod
+    async def _retrieve_recording_parts(artifact: Artifact) -> bytes | None:
+        manifest_artifact = artifact.model_copy(update={"uri": build_recording_manifest_uri(artifact.uri)})
+        manifest_data = await app.STORAGE.retrieve_artifact(manifest_artifact)
+        if not manifest_data:
+            return None
+        manifest = RecordingManifest.model_validate_json(manifest_data)
+        parts = await asyncio.gather(
+            *[app.STORAGE.retrieve_artifact(artifact.model_copy(update={"uri": part.uri})) for part in manifest.parts]
+        )
+        if any(part is None for part in parts):
+            LOG.warning("Missing parts of the recording", artifact_id=artifact.artifact_id)
+            return None
+        return b"".join(part for part in parts if part is not None)
 
     async def get_share_link(self, artifact: Artifact) -> str | None:
         return await app.STORAGE.get_share_link(artifact)
 
-    async def get_share_links(self, artifacts: list[Artifact]) -> list[str] | None:
+    async def get_share_links(self, artifacts: list[Artifact]) -> list[str | None] | None:
         return await app.STORAGE.get_share_links(artifacts)
 
+    async def flush_artifacts(self) -> None:
+        """
+        Insert the buffered artifact rows, eg: at the end of a step before its artifacts are queried.
+        """
+        await self.artifact_writer.flush()
+
     async def wait_for_upload_aiotasks(self, primary_keys: list[str]) -> None:
+        await self.flush_artifacts()
         try:
             st = time.time()
             async with asyncio.timeout(30):
@@ -292,7 +531,8 @@ class ArtifactManager:
                         aio_task
                         for primary_key in primary_keys
                         for aio_task in self.upload_aiotasks_map[primary_key]
-                        if not aio_task.done()
+                        # the uploads of a previous event loop can't be awaited, they never finish
+                        if not aio_task.done() and aio_task.get_loop() is asyncio.get_running_loop()
                     ]
                 )
             LOG.info(
@@ -89,3 +89,30 @@ class LogEntityType(StrEnum):
     WORKFLOW_RUN = "workflow_run"
     WORKFLOW_RUN_BLOCK = "workflow_run_block"
     TASK_V2 = "task_v2"
+
+
+def build_recording_part_uri(recording_uri: str, index: int) -> str:
+    return f"{recording_uri}.parts/{index:05d}"
+
+
+def build_recording_manifest_uri(recording_uri: str) -> str:
+    return f"{recording_uri}.parts/manifest.json"
+
+
+class RecordingPart(BaseModel):
+    uri: str
+    offset: int
+    size: int
+
+
+class RecordingManifest(BaseModel):
+    """
+    The recording is uploaded as the bytes appended to the video file since the last upload.
+    Concatenating the parts in order gives the video recorded so far.
+    """
+
+    parts: list[RecordingPart] = []
+
+    @property
+    def size(self) -> int:
+        return sum(part.size for part in self.parts)
@@ -69,6 +69,17 @@ class BaseStorage(ABC):
     ) -> str:
         pass
 
+    @abstractmethod
+    def build_blob_uri(self, organization_id: str | None, sha256: str, artifact_type: ArtifactType) -> str:
+        """
+        The uri of a content-addressed blob: the same content of an organization is stored once.
+        """
+        pass
+
+    @abstractmethod
+    async def blob_exists(self, uri: str) -> bool:
+        pass
+
     @abstractmethod
     async def store_artifact(self, artifact: Artifact, data: bytes) -> None:
         pass
@@ -77,12 +88,16 @@ class BaseStorage(ABC):
     async def retrieve_artifact(self, artifact: Artifact) -> bytes | None:
         pass
 
+    @abstractmethod
+    async def delete_artifact(self, artifact: Artifact) -> None:
+        pass
+
     @abstractmethod
     async def get_share_link(self, artifact: Artifact) -> str | None:
         pass
 
     @abstractmethod
-    async def get_share_links(self, artifacts: list[Artifact]) -> list[str] | None:
+    async def get_share_links(self, artifacts: list[Artifact]) -> list[str | None] | None:
         pass
 
     @abstractmethod
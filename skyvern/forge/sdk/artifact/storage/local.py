@@ -66,6 +66,13 @@ class LocalStorage(BaseStorage):
         file_ext = FILE_EXTENTSION_MAP[artifact_type]
         return f"file://{self.artifact_path}/{settings.ENV}/ai_suggestions/{ai_suggestion.ai_suggestion_id}/{datetime.utcnow().isoformat()}_{artifact_id}_{artifact_type}.{file_ext}"
 
+    def build_blob_uri(self, organization_id: str | None, sha256: str, artifact_type: ArtifactType) -> str:
+        file_ext = FILE_EXTENTSION_MAP[artifact_type]
+        return f"file://{self.artifact_path}/{settings.ENV}/blobs/{organization_id}/{sha256[:2]}/{sha256}.{file_ext}"
+
+    async def blob_exists(self, uri: str) -> bool:
+        return os.path.exists(parse_uri_to_path(uri))
+
     async def store_artifact(self, artifact: Artifact, data: bytes) -> None:
         file_path = None
         try:
@@ -107,10 +114,22 @@ class LocalStorage(BaseStorage):
             )
             return None
 
+    async def delete_artifact(self, artifact: Artifact) -> None:
+        file_path = None
+        try:
+            file_path = Path(parse_uri_to_path(artifact.uri))
+            file_path.unlink(missing_ok=True)
+        except Exception:
+            LOG.exception(
+                "Failed to delete local artifact.",
+                file_path=file_path,
+                artifact=artifact,
+            )
+
     async def get_share_link(self, artifact: Artifact) -> str:
         return artifact.uri
 
-    async def get_share_links(self, artifacts: list[Artifact]) -> list[str]:
+    async def get_share_links(self, artifacts: list[Artifact]) -> list[str | None]:
         return [artifact.uri for artifact in artifacts]
 
     async def save_streaming_file(self, organization_id: str, file_name: str) -> None:
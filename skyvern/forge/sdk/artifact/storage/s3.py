@@ -1,8 +1,10 @@
+import asyncio
 import os
 import shutil
 from datetime import datetime
 
 import structlog
+from cachetools import LRUCache, TTLCache
 
 from skyvern.config import settings
 from skyvern.constants import DOWNLOAD_FILE_PREFIX
@@ -15,7 +17,7 @@ from skyvern.forge.sdk.api.files import (
     make_temp_directory,
     unzip_files,
 )
-from skyvern.forge.sdk.artifact.models import Artifact, ArtifactType, LogEntityType
+from skyvern.forge.sdk.artifact.models import Artifact, ArtifactType, LogEntityType, build_recording_manifest_uri
 from skyvern.forge.sdk.artifact.storage.base import FILE_EXTENTSION_MAP, BaseStorage
 from skyvern.forge.sdk.models import Step
 from skyvern.forge.sdk.schemas.ai_suggestions import AISuggestion
@@ -25,11 +27,17 @@ from skyvern.forge.sdk.schemas.workflow_runs import WorkflowRunBlock
 
 LOG = structlog.get_logger()
 
+# a recording that isn't stored yet is checked again after this, the full video is uploaded when the run ends
+RECORDING_NOT_STORED_TTL_SECONDS = 30
+
 
 class S3Storage(BaseStorage):
     def __init__(self, bucket: str | None = None) -> None:
         self.async_client = AsyncAWSClient()
         self.bucket = bucket or settings.AWS_S3_BUCKET_ARTIFACTS
+        # recording uri -> whether the full video is stored. a stored video stays stored, it's cached for good
+        self._stored_recordings: LRUCache[str, bool] = LRUCache(maxsize=10000)
+        self._not_stored_recordings: TTLCache[str, bool] = TTLCache(maxsize=10000, ttl=RECORDING_NOT_STORED_TTL_SECONDS)
 
     def build_uri(self, artifact_id: str, step: Step, artifact_type: ArtifactType) -> str:
         file_ext = FILE_EXTENTSION_MAP[artifact_type]
@@ -66,18 +74,53 @@ class S3Storage(BaseStorage):
         file_ext = FILE_EXTENTSION_MAP[artifact_type]
         return f"s3://{self.bucket}/{settings.ENV}/ai_suggestions/{ai_suggestion.ai_suggestion_id}/{datetime.utcnow().isoformat()}_{artifact_id}_{artifact_type}.{file_ext}"
 
+    def build_blob_uri(self, organization_id: str | None, sha256: str, artifact_type: ArtifactType) -> str:
+        file_ext = FILE_EXTENTSION_MAP[artifact_type]
+        return f"s3://{self.bucket}/{settings.ENV}/blobs/{organization_id}/{sha256[:2]}/{sha256}.{file_ext}"
+
+    async def blob_exists(self, uri: str) -> bool:
+        return await self.async_client.get_file_metadata(uri, log_exception=False) is not None
+
     async def store_artifact(self, artifact: Artifact, data: bytes) -> None:
         await self.async_client.upload_file(artifact.uri, data)
 
     async def retrieve_artifact(self, artifact: Artifact) -> bytes | None:
         return await self.async_client.download_file(artifact.uri)
 
+    async def delete_artifact(self, artifact: Artifact) -> None:
+        await self.async_client.delete_file(artifact.uri)
+
     async def get_share_link(self, artifact: Artifact) -> str | None:
-        share_urls = await self.async_client.create_presigned_urls([artifact.uri])
+        share_urls = await self.get_share_links([artifact])
         return share_urls[0] if share_urls else None
 
-    async def get_share_links(self, artifacts: list[Artifact]) -> list[str] | None:
-        return await self.async_client.create_presigned_urls([artifact.uri for artifact in artifacts])
+    async def get_share_links(self, artifacts: list[Artifact]) -> list[str | None] | None:
+        """
+        :return: the presigned urls in the order of the artifacts. For a recording whose run is still in progress,
+            the url of the manifest listing the parts uploaded so far.
+        """
+        stored = await asyncio.gather(*[self._is_stored(artifact) for artifact in artifacts])
+        share_uris = [
+            artifact.uri if is_stored else build_recording_manifest_uri(artifact.uri)
+            for artifact, is_stored in zip(artifacts, stored)
+        ]
+        share_urls = await self.async_client.create_presigned_urls(share_uris)
+        if share_urls is None:
+            return None
+        return list(share_urls)
+
+    async def _is_stored(self, artifact: Artifact) -> bool:
+        # the recording is uploaded in parts while the run is in progress, the full video is only stored at the end
+        if artifact.artifact_type != ArtifactType.RECORDING or artifact.uri in self._stored_recordings:
+            return True
+        if artifact.uri in self._not_stored_recordings:
+            return False
+        is_stored = await self.blob_exists(artifact.uri)
+        if is_stored:
+            self._stored_recordings[artifact.uri] = True
+        else:
+            self._not_stored_recordings[artifact.uri] = True
+        return is_stored
 
     async def store_artifact_from_path(self, artifact: Artifact, path: str) -> None:
         await self.async_client.upload_file_from_path(artifact.uri, path)
@@ -0,0 +1,164 @@
+import asyncio
+from dataclasses import dataclass, field
+
+import structlog
+
+from skyvern.config import settings
+from skyvern.forge import app
+from skyvern.forge.sdk.artifact.models import Artifact
+
+LOG = structlog.get_logger(__name__)
+
+
+@dataclass
+class ArtifactUpload:
+    artifact: Artifact
+    data: bytes | None = None
+    path: str | None = None
+    # content-addressed blobs are not uploaded again if they are already stored
+    skip_if_exists: bool = False
+    done: asyncio.Future[None] = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+
+
+@dataclass
+class LoopState:
+    upload_queue: asyncio.Queue[ArtifactUpload]
+    upload_workers: list[asyncio.Task[None]] = field(default_factory=list)
+    flush_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class ArtifactWriter:
+    """
+    Take the artifact writes off the critical path of a step:
+    - the artifact rows are buffered and inserted in bulk, when the batch is full or after the flush interval.
+      A failed insert keeps the rows for the next flush, they're dropped (and the error raised) after
+      max_flush_attempts failed flushes in a row.
+    - the payloads are uploaded by a bounded pool of workers. Enqueueing waits when too many uploads are pending.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = settings.ARTIFACT_BATCH_SIZE,
+        flush_interval_seconds: float = settings.ARTIFACT_FLUSH_INTERVAL_MS / 1000,
+        upload_concurrency: int = settings.ARTIFACT_UPLOAD_CONCURRENCY,
+        max_pending_uploads: int = settings.ARTIFACT_MAX_PENDING_UPLOADS,
+        max_flush_attempts: int = settings.ARTIFACT_MAX_FLUSH_ATTEMPTS,
+    ) -> None:
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.upload_concurrency = upload_concurrency
+        self.max_pending_uploads = max_pending_uploads
+        self.max_flush_attempts = max_flush_attempts
+        self._pending_artifacts: list[Artifact] = []
+        self._failed_flushes = 0
+        self._flush_timer: asyncio.Task[None] | None = None
+        # the asyncio objects are bound to the event loop using them, eg: every asyncio.run of a script gets its own
+        self._loop_states: dict[asyncio.AbstractEventLoop, LoopState] = {}
+
+    def _get_loop_state(self) -> LoopState:
+        loop = asyncio.get_running_loop()
+        loop_state = self._loop_states.get(loop)
+        if loop_state is None:
+            for closed_loop in [other_loop for other_loop in self._loop_states if other_loop.is_closed()]:
+                del self._loop_states[closed_loop]
+            loop_state = LoopState(upload_queue=asyncio.Queue(maxsize=self.max_pending_uploads))
+            self._loop_states[loop] = loop_state
+        return loop_state
+
+    async def add_artifact(self, artifact: Artifact) -> None:
+        self._pending_artifacts.append(artifact)
+        if len(self._pending_artifacts) >= self.batch_size:
+            await self.flush()
+        else:
+            self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        if (
+            self._flush_timer is None
+            or self._flush_timer.done()
+            or self._flush_timer.get_loop() is not asyncio.get_running_loop()
+        ):
+            self._flush_timer = asyncio.create_task(self._flush_after_interval())
+
+    def get_pending_artifact(self, artifact_id: str) -> Artifact | None:
+        for artifact in self._pending_artifacts:
+            if artifact.artifact_id == artifact_id:
+                return artifact
+        return None
+
+    async def flush(self) -> None:
+        """
+        Insert the buffered artifact rows. Call it before reading the artifacts of the current step or task.
+        """
+        async with self._get_loop_state().flush_lock:
+            if not self._pending_artifacts:
+                return
+            artifacts, self._pending_artifacts = self._pending_artifacts, []
+            try:
+                await app.DATABASE.bulk_create_artifacts(artifacts)
+            except Exception:
+                self._failed_flushes += 1
+                if self._failed_flushes >= self.max_flush_attempts:
+                    self._failed_flushes = 0
+                    LOG.exception(
+                        "Failed to insert the artifact rows, giving up",
+                        artifact_ids=[artifact.artifact_id for artifact in artifacts],
+                    )
+                    raise
+                LOG.warning(
+                    "Failed to insert the artifact rows, retrying with the next flush",
+                    artifact_ids=[artifact.artifact_id for artifact in artifacts],
+                    exc_info=True,
+                )
+                self._pending_artifacts = artifacts + self._pending_artifacts
+                self._schedule_flush()
+                return
+            self._failed_flushes = 0
+
+    async def _flush_after_interval(self) -> None:
+        await asyncio.sleep(self.flush_interval_seconds)
+        # a failed flush schedules the next one
+        self._flush_timer = None
+        try:
+            await self.flush()
+        except Exception:
+            # already logged, there is no caller to raise to
+            pass
+
+    async def upload(
+        self,
+        artifact: Artifact,
+        data: bytes | None = None,
+        path: str | None = None,
+        skip_if_exists: bool = False,
+    ) -> asyncio.Future[None]:
+        """
+        Enqueue the payload of the artifact. The returned future is resolved once the payload is stored.
+        """
+        upload = ArtifactUpload(artifact=artifact, data=data, path=path, skip_if_exists=skip_if_exists)
+        await self._ensure_upload_workers().put(upload)
+        return upload.done
+
+    def _ensure_upload_workers(self) -> asyncio.Queue[ArtifactUpload]:
+        loop_state = self._get_loop_state()
+        loop_state.upload_workers = [worker for worker in loop_state.upload_workers if not worker.done()]
+        while len(loop_state.upload_workers) < self.upload_concurrency:
+            loop_state.upload_workers.append(asyncio.create_task(self._upload_worker(loop_state.upload_queue)))
+        return loop_state.upload_queue
+
+    @staticmethod
+    async def _upload_worker(upload_queue: asyncio.Queue[ArtifactUpload]) -> None:
+        while True:
+            upload = await upload_queue.get()
+            try:
+                if upload.skip_if_exists and await app.STORAGE.blob_exists(upload.artifact.uri):
+                    pass
+                elif upload.data is not None:
+                    await app.STORAGE.store_artifact(upload.artifact, upload.data)
+                elif upload.path is not None:
+                    await app.STORAGE.store_artifact_from_path(upload.artifact, upload.path)
+                upload.done.set_result(None)
+            except Exception as e:
+                upload.done.set_exception(e)
+            finally:
+                upload_queue.task_done()
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
 from datetime import timedelta
 from typing import Any, Union
 
@@ -6,7 +7,29 @@ CACHE_EXPIRE_TIME = timedelta(weeks=4)
 MAX_CACHE_ITEM = 1000
 
 
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def get_expire_seconds(ex: Union[int, timedelta, None]) -> float | None:
+    if ex is None:
+        return None
+    if isinstance(ex, timedelta):
+        return ex.total_seconds()
+    return float(ex)
+
+
 class BaseCache(ABC):
+    stats: CacheStats
+
     @abstractmethod
     async def set(self, key: str, value: Any, ex: Union[int, timedelta, None] = CACHE_EXPIRE_TIME) -> None:
         pass
@@ -14,3 +37,21 @@ class BaseCache(ABC):
     @abstractmethod
     async def get(self, key: str) -> Any:
         pass
+
+    async def get_many(self, keys: list[str]) -> dict[str, Any]:
+        """
+        :return: the cached values by key, the missing keys are left out.
+        """
+        values = {}
+        for key in keys:
+            value = await self.get(key)
+            if value is not None:
+                values[key] = value
+        return values
+
+    async def set_many(self, values: dict[str, Any], ex: Union[int, timedelta, None] = CACHE_EXPIRE_TIME) -> None:
+        for key, value in values.items():
+            await self.set(key, value, ex=ex)
+
+    def get_stats(self) -> CacheStats:
+        return self.stats
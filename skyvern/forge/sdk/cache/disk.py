@@ -0,0 +1,144 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any, Callable, TypeVar, Union
+
+from skyvern.config import settings
+from skyvern.forge.sdk.cache.base import CACHE_EXPIRE_TIME, BaseCache, CacheStats, get_expire_seconds
+
+T = TypeVar("T")
+
+# sqlite caps the number of variables of a statement
+MAX_KEYS_PER_QUERY = 500
+
+
+class DiskCache(BaseCache):
+    """
+    A cache persisted in a SQLite file, read through a memory map. The values are stored as JSON.
+    When the stored values exceed max_bytes, the least recently read ones are evicted. The file can be shared by
+    several processes, the size of the stored values is read from the database in the write transaction.
+    All the database calls run in one thread, so they don't block the event loop and don't need a lock.
+    """
+
+    def __init__(
+        self,
+        path: str = settings.CACHE_DISK_PATH,
+        max_bytes: int = settings.CACHE_MAX_BYTES,
+    ) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="disk-cache")
+        self._connection: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(f"PRAGMA mmap_size={self.max_bytes * 2}")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "expires_at REAL, accessed_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS cache_accessed_at_index ON cache (accessed_at)")
+            # the total size is summed from the index instead of the rows
+            connection.execute("CREATE INDEX IF NOT EXISTS cache_size_index ON cache (size)")
+            connection.commit()
+            self._connection = connection
+        return self._connection
+
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _get_many(self, keys: list[str]) -> dict[str, Any]:
+        connection = self._connect()
+        now = time.time()
+        values: dict[str, Any] = {}
+        for i in range(0, len(keys), MAX_KEYS_PER_QUERY):
+            chunk = keys[i : i + MAX_KEYS_PER_QUERY]
+            placeholders = ",".join("?" * len(chunk))
+            rows = connection.execute(
+                f"SELECT key, value FROM cache WHERE key IN ({placeholders}) "
+                "AND (expires_at IS NULL OR expires_at > ?)",
+                [*chunk, now],
+            ).fetchall()
+            for key, value in rows:
+                values[key] = json.loads(value)
+        if values:
+            found_keys = list(values)
+            for i in range(0, len(found_keys), MAX_KEYS_PER_QUERY):
+                chunk = found_keys[i : i + MAX_KEYS_PER_QUERY]
+                placeholders = ",".join("?" * len(chunk))
+                connection.execute(f"UPDATE cache SET accessed_at = ? WHERE key IN ({placeholders})", [now, *chunk])
+            connection.commit()
+        return values
+
+    def _set_many(self, values: dict[str, Any], expire_seconds: float | None) -> None:
+        connection = self._connect()
+        now = time.time()
+        expires_at = now + expire_seconds if expire_seconds is not None else None
+        rows = []
+        for key, value in values.items():
+            serialized_value = json.dumps(value)
+            rows.append((key, serialized_value, len(serialized_value.encode("utf-8")), expires_at, now))
+
+        connection.executemany(
+            "INSERT OR REPLACE INTO cache (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)", rows
+        )
+        self._evict(connection, now)
+        connection.commit()
+
+    def _evict(self, connection: sqlite3.Connection, now: float) -> None:
+        # the insert holds the write lock, the other processes can't change the total until the commit
+        total_bytes = connection.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        if total_bytes <= self.max_bytes:
+            return
+        expired_bytes, expired_count = connection.execute(
+            "SELECT COALESCE(SUM(size), 0), COUNT(*) FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", [now]
+        ).fetchone()
+        connection.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", [now])
+        total_bytes -= expired_bytes
+        self.stats.evictions += expired_count
+        # evict the least recently read values down to 90% of the budget, so a full cache doesn't evict on every set
+        target_bytes = int(self.max_bytes * 0.9)
+        while total_bytes > target_bytes:
+            rows = connection.execute(
+                f"SELECT key, size FROM cache ORDER BY accessed_at LIMIT {MAX_KEYS_PER_QUERY}"
+            ).fetchall()
+            if not rows:
+                break
+            evicted_keys = []
+            for key, size in rows:
+                evicted_keys.append(key)
+                total_bytes -= size
+                if total_bytes <= target_bytes:
+                    break
+            placeholders = ",".join("?" * len(evicted_keys))
+            connection.execute(f"DELETE FROM cache WHERE key IN ({placeholders})", evicted_keys)
+            self.stats.evictions += len(evicted_keys)
+
+    async def get(self, key: str) -> Any:
+        return (await self.get_many([key])).get(key)
+
+    async def get_many(self, keys: list[str]) -> dict[str, Any]:
+        if not keys:
+            return {}
+        values = await self._run(self._get_many, keys)
+        self.stats.hits += len(values)
+        self.stats.misses += len(keys) - len(values)
+        return values
+
+    async def set(self, key: str, value: Any, ex: Union[int, timedelta, None] = CACHE_EXPIRE_TIME) -> None:
+        await self.set_many({key: value}, ex=ex)
+
+    async def set_many(self, values: dict[str, Any], ex: Union[int, timedelta, None] = CACHE_EXPIRE_TIME) -> None:
+        if not values:
+            return
+        await self._run(self._set_many, values, get_expire_seconds(ex))
@@ -3,16 +3,19 @@ from typing import Any, Union
 
 from cachetools import TTLCache
 
-from skyvern.forge.sdk.cache.base import CACHE_EXPIRE_TIME, MAX_CACHE_ITEM, BaseCache
+from skyvern.forge.sdk.cache.base import CACHE_EXPIRE_TIME, MAX_CACHE_ITEM, BaseCache, CacheStats
 
 
 class LocalCache(BaseCache):
     def __init__(self) -> None:
         self.cache: TTLCache = TTLCache(maxsize=MAX_CACHE_ITEM, ttl=CACHE_EXPIRE_TIME.total_seconds())
+        self.stats = CacheStats()
 
     async def get(self, key: str) -> Any:
         if key not in self.cache:
+            self.stats.misses += 1
             return None
+        self.stats.hits += 1
         value = self.cache[key]
         return value
 
@@ -0,0 +1,144 @@
+import json
+import time
+from datetime import timedelta
+from typing import Any, Union
+
+from redis.asyncio import Redis
+
+from skyvern.config import settings
+from skyvern.forge.sdk.cache.base import CACHE_EXPIRE_TIME, BaseCache, CacheStats, get_expire_seconds
+
+# the accounting is updated in scripts, so the workers setting and evicting the same keys don't skew the total.
+# KEYS: sizes, accessed at, total bytes, then the value keys. ARGV: now, expiration in ms (0 for none), then the key,
+# serialized value and size of every value. returns the total bytes
+SET_MANY_SCRIPT = """
+local px = tonumber(ARGV[2])
+local added_bytes = 0
+for i = 1, #KEYS - 3 do
+    local key, value, size = ARGV[3 * i], ARGV[3 * i + 1], tonumber(ARGV[3 * i + 2])
+    if px > 0 then
+        redis.call('SET', KEYS[3 + i], value, 'PX', px)
+    else
+        redis.call('SET', KEYS[3 + i], value)
+    end
+    local previous_size = redis.call('HGET', KEYS[1], key)
+    if previous_size then
+        added_bytes = added_bytes - tonumber(previous_size)
+    end
+    added_bytes = added_bytes + size
+    redis.call('HSET', KEYS[1], key, size)
+    redis.call('ZADD', KEYS[2], ARGV[1], key)
+end
+return redis.call('INCRBY', KEYS[3], added_bytes)
+"""
+
+# KEYS: sizes, accessed at, total bytes. ARGV: target bytes, key prefix, max keys to evict.
+# returns the number of evicted keys and the total bytes
+EVICT_SCRIPT = """
+local target_bytes = tonumber(ARGV[1])
+local total_bytes = tonumber(redis.call('GET', KEYS[3]) or '0')
+local evicted = 0
+while total_bytes > target_bytes and evicted < tonumber(ARGV[3]) do
+    local oldest_keys = redis.call('ZRANGE', KEYS[2], 0, 0)
+    if #oldest_keys == 0 then
+        break
+    end
+    local key = oldest_keys[1]
+    local size = tonumber(redis.call('HGET', KEYS[1], key) or '0')
+    redis.call('DEL', ARGV[2] .. key)
+    redis.call('HDEL', KEYS[1], key)
+    redis.call('ZREM', KEYS[2], key)
+    total_bytes = redis.call('DECRBY', KEYS[3], size)
+    evicted = evicted + 1
+end
+return {evicted, total_bytes}
+"""
+# a script blocks the server, so the keys are evicted in batches
+EVICT_BATCH_SIZE = 100
+
+
+class RedisCache(BaseCache):
+    """
+    A cache shared by all the workers, in Redis or any server speaking its protocol. The values are stored as JSON.
+    The maxmemory policy of the server applies to all its keys, so the size of the cache is tracked here: the size of
+    every value is kept in a hash and its last read time in a sorted set. When the values exceed max_bytes, the least
+    recently read ones are evicted. The values expired by the server are only dropped from the accounting when they
+    are evicted.
+    """
+
+    def __init__(
+        self,
+        url: str = settings.CACHE_REDIS_URL,
+        max_bytes: int = settings.CACHE_MAX_BYTES,
+        key_prefix: str = settings.CACHE_KEY_PREFIX,
+    ) -> None:
+        self.client: Redis = Redis.from_url(url)
+        self.max_bytes = max_bytes
+        self.key_prefix = key_prefix
+        self.stats = CacheStats()
+        self._sizes_key = f"{key_prefix}__sizes__"
+        self._accessed_at_key = f"{key_prefix}__accessed_at__"
+        self._total_bytes_key = f"{key_prefix}__total_bytes__"
+        self._set_many_script = self.client.register_script(SET_MANY_SCRIPT)
+        self._evict_script = self.client.register_script(EVICT_SCRIPT)
+
+    def _get_value_key(self, key: str) -> str:
+        return f"{self.key_prefix}{key}"
+
+    async def get(self, key: str) -> Any:
+        return (await self.get_many([key])).get(key)
+
+    async def get_many(self, keys: list[str]) -> dict[str, Any]:
+        if not keys:
+            return {}
+        serialized_values = await self.client.mget([self._get_value_key(key) for key in keys])
+        values = {
+            key: json.loads(serialized_value)
+            for key, serialized_value in zip(keys, serialized_values)
+            if serialized_value is not None
+        }
+        if values:
+            now = time.time()
+            # xx: a key evicted meanwhile isn't tracked again
+            await self.client.zadd(self._accessed_at_key, {key: now for key in values}, xx=True)
+        self.stats.hits += len(values)
+        self.stats.misses += len(keys) - len(values)
+        return values
+
+    async def set(self, key: str, value: Any, ex: Union[int, timedelta, None] = CACHE_EXPIRE_TIME) -> None:
+        await self.set_many({key: value}, ex=ex)
+
+    async def set_many(self, values: dict[str, Any], ex: Union[int, timedelta, None] = CACHE_EXPIRE_TIME) -> None:
+        if not values:
+            return
+        expire_seconds = get_expire_seconds(ex)
+        px = max(1, int(expire_seconds * 1000)) if expire_seconds is not None else 0
+        args: list[Any] = [time.time(), px]
+        for key, value in values.items():
+            serialized_value = json.dumps(value)
+            args += [key, serialized_value, len(serialized_value.encode("utf-8"))]
+        total_bytes = int(
+            await self._set_many_script(
+                keys=[
+                    self._sizes_key,
+                    self._accessed_at_key,
+                    self._total_bytes_key,
+                    *[self._get_value_key(key) for key in values],
+                ],
+                args=args,
+            )
+        )
+        if total_bytes > self.max_bytes:
+            await self._evict()
+
+    async def _evict(self) -> None:
+        # evict down to 90% of the budget, so a full cache doesn't evict on every set
+        target_bytes = int(self.max_bytes * 0.9)
+        while True:
+            evicted, total_bytes = await self._evict_script(
+                keys=[self._sizes_key, self._accessed_at_key, self._total_bytes_key],
+                args=[target_bytes, self.key_prefix, EVICT_BATCH_SIZE],
+            )
+            self.stats.evictions += int(evicted)
+            if int(evicted) < EVICT_BATCH_SIZE or int(total_bytes) <= target_bytes:
+                return
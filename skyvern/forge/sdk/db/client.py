@@ -3,17 +3,20 @@ from datetime import datetime, timedelta
 from typing import Any, List, Optional, Sequence
 
 import structlog
-from sqlalchemy import and_, delete, distinct, func, pool, select, tuple_, update
+from sqlalchemy import and_, delete, distinct, func, pool, select, tuple_, union_all, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
 from skyvern.config import settings
 from skyvern.exceptions import WorkflowParameterNotFound
+from skyvern.forge import app
 from skyvern.forge.sdk.artifact.models import Artifact, ArtifactType
 from skyvern.forge.sdk.db.enums import OrganizationAuthTokenType, TaskType
 from skyvern.forge.sdk.db.exceptions import NotFoundError
 from skyvern.forge.sdk.db.models import (
     ActionModel,
+    ActionPlanCacheModel,
     AISuggestionModel,
     ArtifactModel,
     AWSSecretParameterModel,
@@ -27,6 +30,7 @@ from skyvern.forge.sdk.db.models import (
     OrganizationModel,
     OutputParameterModel,
     PersistentBrowserSessionModel,
+    QueuedRunModel,
     StepModel,
     TaskGenerationModel,
     TaskModel,
@@ -34,6 +38,7 @@ from skyvern.forge.sdk.db.models import (
     TaskV2Model,
     ThoughtModel,
     TOTPCodeModel,
+    WebhookDeliveryModel,
     WorkflowModel,
     WorkflowParameterModel,
     WorkflowRunBlockModel,
@@ -58,19 +63,23 @@ from skyvern.forge.sdk.db.utils import (
     convert_to_workflow_run_block,
     convert_to_workflow_run_output_parameter,
     convert_to_workflow_run_parameter,
+    decode_run_cursor,
 )
 from skyvern.forge.sdk.log_artifacts import save_workflow_run_logs
 from skyvern.forge.sdk.models import Step, StepStatus
+from skyvern.forge.sdk.pubsub.channels import get_task_channel, get_workflow_run_channel
 from skyvern.forge.sdk.schemas.ai_suggestions import AISuggestion
 from skyvern.forge.sdk.schemas.credentials import Credential, CredentialType
 from skyvern.forge.sdk.schemas.organization_bitwarden_collections import OrganizationBitwardenCollection
 from skyvern.forge.sdk.schemas.organizations import Organization, OrganizationAuthToken
 from skyvern.forge.sdk.schemas.persistent_browser_sessions import PersistentBrowserSession
+from skyvern.forge.sdk.schemas.run_queue import QueuedRun, QueuedRunStatus, QueuedRunType
 from skyvern.forge.sdk.schemas.runs import Run
 from skyvern.forge.sdk.schemas.task_generations import TaskGeneration
 from skyvern.forge.sdk.schemas.task_v2 import TaskV2, TaskV2Status, Thought, ThoughtType
 from skyvern.forge.sdk.schemas.tasks import OrderBy, SortDirection, Task, TaskStatus
 from skyvern.forge.sdk.schemas.totp_codes import TOTPCode
+from skyvern.forge.sdk.schemas.webhook_deliveries import WebhookDelivery, WebhookDeliveryRequest, WebhookDeliveryStatus
 from skyvern.forge.sdk.schemas.workflow_runs import WorkflowRunBlock
 from skyvern.forge.sdk.workflow.models.block import BlockStatus, BlockType
 from skyvern.forge.sdk.workflow.models.parameter import (
@@ -117,6 +126,14 @@ class AgentDB:
         )
         self.Session = async_sessionmaker(bind=self.engine)
 
+    @staticmethod
+    async def _publish_status(channel: str, status: str) -> None:
+        # the streaming sockets subscribe to the status changes instead of polling the run
+        try:
+            await app.PUBSUB.publish(channel, {"status": status})
+        except Exception:
+            LOG.warning("Failed to publish the status change", channel=channel, status=status, exc_info=True)
+
     async def create_task(
         self,
         url: str,
@@ -243,6 +260,38 @@ class AgentDB:
             LOG.exception("UnexpectedError")
             raise
 
+    async def bulk_create_artifacts(self, artifacts: list[Artifact]) -> None:
+        """Insert the artifact rows in one round trip. The timestamps are taken from the artifacts."""
+        try:
+            async with self.Session() as session:
+                session.add_all(
+                    [
+                        ArtifactModel(
+                            artifact_id=artifact.artifact_id,
+                            artifact_type=artifact.artifact_type,
+                            uri=artifact.uri,
+                            task_id=artifact.task_id,
+                            step_id=artifact.step_id,
+                            workflow_run_id=artifact.workflow_run_id,
+                            workflow_run_block_id=artifact.workflow_run_block_id,
+                            observer_cruise_id=artifact.observer_cruise_id,
+                            observer_thought_id=artifact.observer_thought_id,
+                            ai_suggestion_id=artifact.ai_suggestion_id,
+                            organization_id=artifact.organization_id,
+                            created_at=artifact.created_at,
+                            modified_at=artifact.modified_at,
+                        )
+                        for artifact in artifacts
+                    ]
+                )
+                await session.commit()
+        except SQLAlchemyError:
+            LOG.exception("SQLAlchemyError")
+            raise
+        except Exception:
+            LOG.exception("UnexpectedError")
+            raise
+
     async def get_task(self, task_id: str, organization_id: str | None = None) -> Task | None:
         """Get a task by its id"""
         try:
@@ -497,42 +546,54 @@ class AgentDB:
         incremental_reasoning_tokens: int | None = None,
         incremental_cached_tokens: int | None = None,
     ) -> Step:
+        """
+        Update the step in one statement. The incremental usage is added by the database,
+        so concurrent LLM calls billing the same step don't overwrite each other.
+        """
+        values: dict[str, Any] = {}
+        if status is not None:
+            values["status"] = status
+        if output is not None:
+            values["output"] = output.model_dump(exclude_none=True)
+        if is_last is not None:
+            values["is_last"] = is_last
+        if retry_index is not None:
+            values["retry_index"] = retry_index
+        if incremental_cost is not None:
+            values["step_cost"] = func.coalesce(StepModel.step_cost, 0) + incremental_cost
+        if incremental_input_tokens is not None:
+            values["input_token_count"] = func.coalesce(StepModel.input_token_count, 0) + incremental_input_tokens
+        if incremental_output_tokens is not None:
+            values["output_token_count"] = func.coalesce(StepModel.output_token_count, 0) + incremental_output_tokens
+        if incremental_reasoning_tokens is not None:
+            values["reasoning_token_count"] = (
+                func.coalesce(StepModel.reasoning_token_count, 0) + incremental_reasoning_tokens
+            )
+        if incremental_cached_tokens is not None:
+            values["cached_token_count"] = func.coalesce(StepModel.cached_token_count, 0) + incremental_cached_tokens
+
         try:
+            if not values:
+                existing_step = await self.get_step(task_id, step_id, organization_id)
+                if not existing_step:
+                    raise NotFoundError("Step not found")
+                return existing_step
             async with self.Session() as session:
-                if step := (
+                step = (
                     await session.scalars(
-                        select(StepModel)
+                        update(StepModel)
                         .filter_by(task_id=task_id)
                         .filter_by(step_id=step_id)
                         .filter_by(organization_id=organization_id)
+                        .values(**values)
+                        .returning(StepModel)
+                        .execution_options(synchronize_session=False)
                     )
-                ).first():
-                    if status is not None:
-                        step.status = status
-                    if output is not None:
-                        step.output = output.model_dump(exclude_none=True)
-                    if is_last is not None:
-                        step.is_last = is_last
-                    if retry_index is not None:
-                        step.retry_index = retry_index
-                    if incremental_cost is not None:
-                        step.step_cost = incremental_cost + float(step.step_cost or 0)
-                    if incremental_input_tokens is not None:
-                        step.input_token_count = incremental_input_tokens + (step.input_token_count or 0)
-                    if incremental_output_tokens is not None:
-                        step.output_token_count = incremental_output_tokens + (step.output_token_count or 0)
-                    if incremental_reasoning_tokens is not None:
-                        step.reasoning_token_count = incremental_reasoning_tokens + (step.reasoning_token_count or 0)
-                    if incremental_cached_tokens is not None:
-                        step.cached_token_count = incremental_cached_tokens + (step.cached_token_count or 0)
-
-                    await session.commit()
-                    updated_step = await self.get_step(task_id, step_id, organization_id)
-                    if not updated_step:
-                        raise NotFoundError("Step not found")
-                    return updated_step
-                else:
+                ).first()
+                if not step:
                     raise NotFoundError("Step not found")
+                await session.commit()
+                return convert_to_step(step, debug_enabled=self.debug_enabled)
         except SQLAlchemyError:
             LOG.error("SQLAlchemyError", exc_info=True)
             raise
@@ -608,6 +669,8 @@ class AgentDB:
                     updated_task = await self.get_task(task_id, organization_id=organization_id)
                     if not updated_task:
                         raise NotFoundError("Task not found")
+                    if status is not None:
+                        await self._publish_status(get_task_channel(task_id), updated_task.status)
                     return updated_task
                 else:
                     raise NotFoundError("Task not found")
@@ -1433,6 +1496,7 @@ class AgentDB:
                 await session.commit()
                 await session.refresh(workflow_run)
                 await save_workflow_run_logs(workflow_run_id)
+                await self._publish_status(get_workflow_run_channel(workflow_run_id), status)
                 return convert_to_workflow_run(workflow_run)
             LOG.error(
                 "WorkflowRun not found, nothing to update",
@@ -1441,50 +1505,89 @@ class AgentDB:
             return None
 
     async def get_all_runs(
-        self, organization_id: str, page: int = 1, page_size: int = 10, status: list[WorkflowRunStatus] | None = None
+        self,
+        organization_id: str,
+        page: int = 1,
+        page_size: int = 10,
+        status: list[WorkflowRunStatus] | None = None,
+        cursor: str | None = None,
     ) -> list[WorkflowRun | Task]:
+        """
+        List the workflow runs and the standalone tasks of the organization, newest first.
+        The page is picked by the database over the (created_at, run_id) keys of both tables. With a cursor
+        (see encode_run_cursor), the runs after the cursor are returned and the page is ignored.
+
+        :raises ValueError: if the cursor is malformed, or the page is deeper than RUNS_MAX_OFFSET without a cursor.
+        """
+        keyset = decode_run_cursor(cursor) if cursor else None
+        offset = 0 if keyset else (page - 1) * page_size
+        # each side of the union reads offset + page_size rows, the deep pages are read with the cursor
+        if offset > settings.RUNS_MAX_OFFSET:
+            raise ValueError(
+                f"Pages past the first {settings.RUNS_MAX_OFFSET} runs can't be read by page number, "
+                "page with the cursor from the X-Next-Cursor header instead"
+            )
         try:
             async with self.Session() as session:
-                # temporary limit to 10 pages
-                if page > 10:
-                    return []
-
-                limit = page * page_size
-
-                workflow_run_query = (
-                    select(WorkflowRunModel, WorkflowModel.title)
-                    .join(WorkflowModel, WorkflowModel.workflow_id == WorkflowRunModel.workflow_id)
+                workflow_run_keys = (
+                    select(
+                        WorkflowRunModel.created_at.label("created_at"),
+                        WorkflowRunModel.workflow_run_id.label("run_id"),
+                    )
                     .filter(WorkflowRunModel.organization_id == organization_id)
                     .filter(WorkflowRunModel.parent_workflow_run_id.is_(None))
                 )
-                if status:
-                    workflow_run_query = workflow_run_query.filter(WorkflowRunModel.status.in_(status))
-                workflow_run_query = workflow_run_query.order_by(WorkflowRunModel.created_at.desc()).limit(limit)
-                workflow_run_query_result = (await session.execute(workflow_run_query)).all()
-                workflow_runs = [
-                    convert_to_workflow_run(run, workflow_title=title, debug_enabled=self.debug_enabled)
-                    for run, title in workflow_run_query_result
-                ]
-
-                task_query = (
-                    select(TaskModel)
+                task_keys = (
+                    select(TaskModel.created_at.label("created_at"), TaskModel.task_id.label("run_id"))
                     .filter(TaskModel.organization_id == organization_id)
                     .filter(TaskModel.workflow_run_id.is_(None))
                 )
                 if status:
-                    task_query = task_query.filter(TaskModel.status.in_(status))
-                task_query = task_query.order_by(TaskModel.created_at.desc()).limit(limit)
-                task_query_result = (await session.scalars(task_query)).all()
-                tasks = [convert_to_task(task, debug_enabled=self.debug_enabled) for task in task_query_result]
-
-                runs = workflow_runs + tasks
-
-                runs.sort(key=lambda x: x.created_at, reverse=True)
+                    workflow_run_keys = workflow_run_keys.filter(WorkflowRunModel.status.in_(status))
+                    task_keys = task_keys.filter(TaskModel.status.in_(status))
+                if keyset:
+                    workflow_run_keys = workflow_run_keys.filter(
+                        tuple_(WorkflowRunModel.created_at, WorkflowRunModel.workflow_run_id) < tuple_(*keyset)
+                    )
+                    task_keys = task_keys.filter(tuple_(TaskModel.created_at, TaskModel.task_id) < tuple_(*keyset))
+                # each side walks its (organization_id, created_at) index and stops after the rows the page can need
+                workflow_run_keys = workflow_run_keys.order_by(
+                    WorkflowRunModel.created_at.desc(), WorkflowRunModel.workflow_run_id.desc()
+                ).limit(offset + page_size)
+                task_keys = task_keys.order_by(TaskModel.created_at.desc(), TaskModel.task_id.desc()).limit(
+                    offset + page_size
+                )
+                run_keys = union_all(workflow_run_keys, task_keys).subquery()
+                run_ids = (
+                    await session.scalars(
+                        select(run_keys.c.run_id)
+                        .order_by(run_keys.c.created_at.desc(), run_keys.c.run_id.desc())
+                        .offset(offset)
+                        .limit(page_size)
+                    )
+                ).all()
+                if not run_ids:
+                    return []
 
-                lower = (page - 1) * page_size
-                upper = page * page_size
+                runs_by_id: dict[str, WorkflowRun | Task] = {}
+                workflow_run_query_result = (
+                    await session.execute(
+                        select(WorkflowRunModel, WorkflowModel.title)
+                        .join(WorkflowModel, WorkflowModel.workflow_id == WorkflowRunModel.workflow_id)
+                        .filter(WorkflowRunModel.workflow_run_id.in_(run_ids))
+                    )
+                ).all()
+                for run, title in workflow_run_query_result:
+                    runs_by_id[run.workflow_run_id] = convert_to_workflow_run(
+                        run, workflow_title=title, debug_enabled=self.debug_enabled
+                    )
+                task_query_result = (
+                    await session.scalars(select(TaskModel).filter(TaskModel.task_id.in_(run_ids)))
+                ).all()
+                for task in task_query_result:
+                    runs_by_id[task.task_id] = convert_to_task(task, debug_enabled=self.debug_enabled)
 
-                return runs[lower:upper]
+                return [runs_by_id[run_id] for run_id in run_ids if run_id in runs_by_id]
 
         except SQLAlchemyError:
             LOG.error("SQLAlchemyError", exc_info=True)
@@ -2149,27 +2252,74 @@ class AgentDB:
             await session.refresh(new_action)
             return Action.model_validate(new_action)
 
-    async def retrieve_action_plan(self, task: Task) -> list[Action]:
+    async def retrieve_action_plan(self, plan_key: str) -> list[Action]:
         async with self.Session() as session:
-            subquery = (
-                select(TaskModel.task_id)
-                .filter(TaskModel.url == task.url)
-                .filter(TaskModel.navigation_goal == task.navigation_goal)
-                .filter(TaskModel.status == TaskStatus.completed)
-                .order_by(TaskModel.created_at.desc())
-                .limit(1)
-                .subquery()
-            )
+            action_plan_cache = await session.get(ActionPlanCacheModel, plan_key)
+            if not action_plan_cache:
+                return []
 
             query = (
                 select(ActionModel)
-                .filter(ActionModel.task_id == subquery.c.task_id)
+                .filter(ActionModel.task_id == action_plan_cache.task_id)
                 .order_by(ActionModel.step_order, ActionModel.action_order, ActionModel.created_at)
             )
 
             actions = (await session.scalars(query)).all()
             return [Action.model_validate(action) for action in actions]
 
+    async def upsert_action_plan_cache(
+        self,
+        plan_key: str,
+        task_id: str,
+        url: str | None = None,
+        navigation_goal: str | None = None,
+        keep_existing: bool = False,
+    ) -> None:
+        """
+        :param keep_existing: don't replace the plan already cached for the plan key, eg: when backfilling from the
+            newest task to the oldest.
+        """
+        async with self.Session() as session:
+            # tasks with the same plan key can complete at the same time, the latest one wins
+            insert_stmt = pg_insert(ActionPlanCacheModel).values(
+                plan_key=plan_key,
+                task_id=task_id,
+                url=url,
+                navigation_goal=navigation_goal,
+            )
+            if keep_existing:
+                upsert_stmt = insert_stmt.on_conflict_do_nothing(index_elements=[ActionPlanCacheModel.plan_key])
+            else:
+                upsert_stmt = insert_stmt.on_conflict_do_update(
+                    index_elements=[ActionPlanCacheModel.plan_key],
+                    set_={"task_id": insert_stmt.excluded.task_id, "modified_at": datetime.utcnow()},
+                )
+            await session.execute(upsert_stmt)
+            await session.commit()
+
+    async def get_completed_tasks_with_navigation_goal(
+        self,
+        limit: int,
+        before: tuple[datetime, str] | None = None,
+    ) -> list[Task]:
+        """
+        The completed tasks with a url and a navigation goal, newest first.
+
+        :param before: the (created_at, task_id) of the last task of the previous page.
+        """
+        async with self.Session() as session:
+            query = (
+                select(TaskModel)
+                .filter(TaskModel.status == TaskStatus.completed)
+                .filter(TaskModel.url.is_not(None))
+                .filter(TaskModel.navigation_goal.is_not(None))
+            )
+            if before:
+                query = query.filter(tuple_(TaskModel.created_at, TaskModel.task_id) < tuple_(*before))
+            query = query.order_by(TaskModel.created_at.desc(), TaskModel.task_id.desc()).limit(limit)
+            tasks = (await session.scalars(query)).all()
+            return [convert_to_task(task, debug_enabled=self.debug_enabled) for task in tasks]
+
     async def get_previous_actions_for_task(self, task_id: str) -> list[Action]:
         async with self.Session() as session:
             query = (
@@ -2401,6 +2551,54 @@ class AgentDB:
                 return Thought.model_validate(thought_obj)
             raise NotFoundError(f"Thought {thought_id}")
 
+    async def increment_thought_usage(
+        self,
+        thought_id: str,
+        organization_id: str | None = None,
+        incremental_cost: float | None = None,
+        incremental_input_tokens: int | None = None,
+        incremental_output_tokens: int | None = None,
+        incremental_reasoning_tokens: int | None = None,
+        incremental_cached_tokens: int | None = None,
+    ) -> Thought:
+        """
+        Add the usage of an LLM call to the thought in one statement.
+        """
+        values: dict[str, Any] = {}
+        if incremental_cost is not None:
+            values["thought_cost"] = func.coalesce(ThoughtModel.thought_cost, 0) + incremental_cost
+        if incremental_input_tokens is not None:
+            values["input_token_count"] = func.coalesce(ThoughtModel.input_token_count, 0) + incremental_input_tokens
+        if incremental_output_tokens is not None:
+            values["output_token_count"] = func.coalesce(ThoughtModel.output_token_count, 0) + incremental_output_tokens
+        if incremental_reasoning_tokens is not None:
+            values["reasoning_token_count"] = (
+                func.coalesce(ThoughtModel.reasoning_token_count, 0) + incremental_reasoning_tokens
+            )
+        if incremental_cached_tokens is not None:
+            values["cached_token_count"] = func.coalesce(ThoughtModel.cached_token_count, 0) + incremental_cached_tokens
+        if not values:
+            thought = await self.get_thought(thought_id, organization_id=organization_id)
+            if not thought:
+                raise NotFoundError(f"Thought {thought_id}")
+            return thought
+
+        async with self.Session() as session:
+            thought_obj = (
+                await session.scalars(
+                    update(ThoughtModel)
+                    .filter_by(observer_thought_id=thought_id)
+                    .filter_by(organization_id=organization_id)
+                    .values(**values)
+                    .returning(ThoughtModel)
+                    .execution_options(synchronize_session=False)
+                )
+            ).first()
+            if not thought_obj:
+                raise NotFoundError(f"Thought {thought_id}")
+            await session.commit()
+            return Thought.model_validate(thought_obj)
+
     async def update_task_v2(
         self,
         task_v2_id: str,
@@ -2971,3 +3169,363 @@ class AgentDB:
                 query = query.filter_by(organization_id=organization_id)
             task_run = (await session.scalars(query)).first()
             return Run.model_validate(task_run) if task_run else None
+
+    async def enqueue_run(
+        self,
+        organization_id: str,
+        run_type: QueuedRunType,
+        run_id: str,
+        parameters: dict[str, Any],
+    ) -> QueuedRun:
+        """
+        Mark the run as queued and put it in the run queue in one transaction, so a run is never left queued
+        without a queue row (or queued twice) when one of the writes fails.
+        For a task v2, the workflow run of the task v2 is marked as queued as well.
+        """
+        async with self.Session() as session:
+            workflow_run_id: str | None = None
+            if run_type == QueuedRunType.task:
+                task = (
+                    await session.scalars(
+                        select(TaskModel).filter_by(task_id=run_id).filter_by(organization_id=organization_id)
+                    )
+                ).first()
+                if not task:
+                    raise NotFoundError(f"Task {run_id} not found")
+                task.status = TaskStatus.queued
+            else:
+                workflow_run_id = run_id
+                if run_type == QueuedRunType.task_v2:
+                    task_v2 = (
+                        await session.scalars(
+                            select(TaskV2Model)
+                            .filter_by(observer_cruise_id=run_id)
+                            .filter_by(organization_id=organization_id)
+                        )
+                    ).first()
+                    if not task_v2 or not task_v2.workflow_run_id:
+                        raise NotFoundError(f"TaskV2 {run_id} not found or has no workflow run")
+                    task_v2.status = TaskV2Status.queued
+                    workflow_run_id = task_v2.workflow_run_id
+                workflow_run = (
+                    await session.scalars(select(WorkflowRunModel).filter_by(workflow_run_id=workflow_run_id))
+                ).first()
+                if not workflow_run:
+                    raise NotFoundError(f"WorkflowRun {workflow_run_id} not found")
+                workflow_run.status = WorkflowRunStatus.queued
+                workflow_run.failure_reason = None
+
+            queued_run = QueuedRunModel(
+                organization_id=organization_id,
+                run_type=run_type,
+                run_id=run_id,
+                parameters=parameters,
+                status=QueuedRunStatus.queued,
+            )
+            session.add(queued_run)
+            await session.commit()
+            await session.refresh(queued_run)
+
+        if workflow_run_id:
+            await save_workflow_run_logs(workflow_run_id)
+            await self._publish_status(get_workflow_run_channel(workflow_run_id), WorkflowRunStatus.queued)
+        else:
+            await self._publish_status(get_task_channel(run_id), TaskStatus.queued)
+        return QueuedRun.model_validate(queued_run)
+
+    async def claim_queued_runs(
+        self,
+        worker_id: str,
+        limit: int,
+        lease_seconds: int,
+        max_running_per_organization: int | None = None,
+    ) -> list[QueuedRun]:
+        """
+        Claim up to `limit` queued runs for the worker. The organizations take turns: the oldest queued run of every
+        organization comes first, then the second oldest, and so on. An organization is skipped once it has
+        max_running_per_organization runs running. The rows are locked with SKIP LOCKED, so the workers claiming
+        at the same time don't wait for each other and never claim the same run. Two workers claiming at the same
+        time can both see an organization below its cap, so the cap can be exceeded by the runs claimed concurrently.
+        """
+        if limit <= 0:
+            return []
+        now = datetime.utcnow()
+        async with self.Session() as session:
+            organization_rank = (
+                func.row_number()
+                .over(partition_by=QueuedRunModel.organization_id, order_by=QueuedRunModel.created_at)
+                .label("organization_rank")
+            )
+            ranked_runs_query = select(
+                QueuedRunModel.queued_run_id, QueuedRunModel.created_at, organization_rank
+            ).filter(QueuedRunModel.status == QueuedRunStatus.queued)
+            if max_running_per_organization:
+                # the capped organizations are left out before the limit, their runs can't fill the candidates
+                capped_organization_ids = (
+                    select(QueuedRunModel.organization_id)
+                    .filter(QueuedRunModel.status == QueuedRunStatus.running)
+                    .group_by(QueuedRunModel.organization_id)
+                    .having(func.count() >= max_running_per_organization)
+                )
+                ranked_runs_query = ranked_runs_query.filter(
+                    QueuedRunModel.organization_id.not_in(capped_organization_ids)
+                )
+            ranked_runs = ranked_runs_query.subquery()
+            # more candidates than needed, some are locked by the other workers or reach the cap of their organization
+            candidate_ids = (
+                await session.scalars(
+                    select(ranked_runs.c.queued_run_id)
+                    .filter(ranked_runs.c.organization_rank <= limit)
+                    .order_by(ranked_runs.c.organization_rank, ranked_runs.c.created_at)
+                    .limit(limit * 4)
+                )
+            ).all()
+            if not candidate_ids:
+                return []
+
+            running_counts: dict[str, int] = {}
+            if max_running_per_organization:
+                running_counts = dict(
+                    (
+                        await session.execute(
+                            select(QueuedRunModel.organization_id, func.count())
+                            .filter(QueuedRunModel.status == QueuedRunStatus.running)
+                            .group_by(QueuedRunModel.organization_id)
+                        )
+                    ).all()
+                )
+
+            locked_runs = {
+                queued_run.queued_run_id: queued_run
+                for queued_run in (
+                    await session.scalars(
+                        select(QueuedRunModel)
+                        .filter(QueuedRunModel.queued_run_id.in_(candidate_ids))
+                        .filter(QueuedRunModel.status == QueuedRunStatus.queued)
+                        .with_for_update(skip_locked=True)
+                    )
+                ).all()
+            }
+            claimed_runs: list[QueuedRun] = []
+            for queued_run_id in candidate_ids:
+                queued_run = locked_runs.get(queued_run_id)
+                if queued_run is None:
+                    continue
+                running_count = running_counts.get(queued_run.organization_id, 0)
+                if max_running_per_organization and running_count >= max_running_per_organization:
+                    continue
+                running_counts[queued_run.organization_id] = running_count + 1
+                queued_run.status = QueuedRunStatus.running
+                queued_run.worker_id = worker_id
+                queued_run.attempts += 1
+                queued_run.lease_expires_at = now + timedelta(seconds=lease_seconds)
+                queued_run.started_at = now
+                await session.flush()
+                claimed_runs.append(QueuedRun.model_validate(queued_run))
+                if len(claimed_runs) >= limit:
+                    break
+            await session.commit()
+            return claimed_runs
+
+    async def renew_queued_run_leases(self, worker_id: str, queued_run_ids: list[str], lease_seconds: int) -> None:
+        if not queued_run_ids:
+            return
+        async with self.Session() as session:
+            await session.execute(
+                update(QueuedRunModel)
+                .filter(QueuedRunModel.queued_run_id.in_(queued_run_ids))
+                .filter(QueuedRunModel.worker_id == worker_id)
+                .filter(QueuedRunModel.status == QueuedRunStatus.running)
+                .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=lease_seconds))
+            )
+            await session.commit()
+
+    async def release_expired_queued_runs(self, max_attempts: int) -> list[QueuedRun]:
+        """
+        Put the running runs whose lease expired (their worker stopped) back in the queue.
+
+        :return: the expired runs out of attempts, they are marked as failed.
+        """
+        now = datetime.utcnow()
+        expired = and_(
+            QueuedRunModel.status == QueuedRunStatus.running,
+            QueuedRunModel.lease_expires_at < now,
+        )
+        async with self.Session() as session:
+            await session.execute(
+                update(QueuedRunModel)
+                .where(expired, QueuedRunModel.attempts < max_attempts)
+                .values(status=QueuedRunStatus.queued, worker_id=None, lease_expires_at=None)
+            )
+            failed_runs = (
+                await session.scalars(
+                    update(QueuedRunModel)
+                    .where(expired, QueuedRunModel.attempts >= max_attempts)
+                    .values(status=QueuedRunStatus.failed, finished_at=now)
+                    .returning(QueuedRunModel)
+                    .execution_options(synchronize_session=False)
+                )
+            ).all()
+            queued_runs = [QueuedRun.model_validate(queued_run) for queued_run in failed_runs]
+            await session.commit()
+            return queued_runs
+
+    async def finish_queued_run(self, queued_run_id: str, worker_id: str, status: QueuedRunStatus) -> None:
+        async with self.Session() as session:
+            await session.execute(
+                update(QueuedRunModel)
+                .filter(QueuedRunModel.queued_run_id == queued_run_id)
+                .filter(QueuedRunModel.worker_id == worker_id)
+                .values(status=status, lease_expires_at=None, finished_at=datetime.utcnow())
+            )
+            await session.commit()
+
+    async def delete_finished_queued_runs(self, finished_before: datetime) -> None:
+        async with self.Session() as session:
+            await session.execute(
+                delete(QueuedRunModel)
+                .filter(QueuedRunModel.status.in_([QueuedRunStatus.completed, QueuedRunStatus.failed]))
+                .filter(QueuedRunModel.finished_at < finished_before)
+            )
+            await session.commit()
+
+    async def get_queued_run_counts(self) -> dict[QueuedRunStatus, int]:
+        """
+        :return: the number of queued and running runs.
+        """
+        async with self.Session() as session:
+            rows = (
+                await session.execute(
+                    select(QueuedRunModel.status, func.count())
+                    .filter(QueuedRunModel.status.in_([QueuedRunStatus.queued, QueuedRunStatus.running]))
+                    .group_by(QueuedRunModel.status)
+                )
+            ).all()
+            counts = {QueuedRunStatus.queued: 0, QueuedRunStatus.running: 0}
+            counts.update({QueuedRunStatus(status): count for status, count in rows})
+            return counts
+
+    async def get_oldest_queued_run_created_at(self) -> datetime | None:
+        async with self.Session() as session:
+            return (
+                await session.scalars(
+                    select(func.min(QueuedRunModel.created_at)).filter(QueuedRunModel.status == QueuedRunStatus.queued)
+                )
+            ).first()
+
+    async def create_webhook_delivery(
+        self,
+        organization_id: str,
+        run_id: str,
+        url: str,
+        payload: str,
+        headers: dict[str, str],
+    ) -> WebhookDelivery:
+        async with self.Session() as session:
+            webhook_delivery = WebhookDeliveryModel(
+                organization_id=organization_id,
+                run_id=run_id,
+                url=url,
+                payload=payload,
+                headers=headers,
+                status=WebhookDeliveryStatus.pending,
+                next_attempt_at=datetime.utcnow(),
+            )
+            session.add(webhook_delivery)
+            await session.commit()
+            await session.refresh(webhook_delivery)
+            return WebhookDelivery.model_validate(webhook_delivery)
+
+    async def claim_webhook_deliveries(self, limit: int, lease_seconds: int) -> list[WebhookDeliveryRequest]:
+        """
+        Claim up to `limit` pending deliveries whose next attempt is due. Their next attempt is pushed back by the
+        lease, so a delivery claimed by a dispatcher that stopped before finishing it is claimed again afterwards.
+        """
+        now = datetime.utcnow()
+        async with self.Session() as session:
+            webhook_deliveries = (
+                await session.scalars(
+                    select(WebhookDeliveryModel)
+                    .filter(WebhookDeliveryModel.status == WebhookDeliveryStatus.pending)
+                    .filter(WebhookDeliveryModel.next_attempt_at <= now)
+                    .order_by(WebhookDeliveryModel.next_attempt_at)
+                    .limit(limit)
+                    .with_for_update(skip_locked=True)
+                )
+            ).all()
+            for webhook_delivery in webhook_deliveries:
+                webhook_delivery.attempts += 1
+                webhook_delivery.next_attempt_at = now + timedelta(seconds=lease_seconds)
+            await session.flush()
+            claimed_deliveries = [
+                WebhookDeliveryRequest.model_validate(webhook_delivery) for webhook_delivery in webhook_deliveries
+            ]
+            await session.commit()
+            return claimed_deliveries
+
+    async def update_webhook_delivery(
+        self,
+        webhook_delivery_id: str,
+        status: WebhookDeliveryStatus,
+        next_attempt_at: datetime | None = None,
+        last_status_code: int | None = None,
+        last_error: str | None = None,
+    ) -> None:
+        values: dict[str, Any] = {
+            "status": status,
+            "last_status_code": last_status_code,
+            "last_error": last_error,
+        }
+        if next_attempt_at:
+            values["next_attempt_at"] = next_attempt_at
+        if status == WebhookDeliveryStatus.delivered:
+            values["delivered_at"] = datetime.utcnow()
+        async with self.Session() as session:
+            await session.execute(
+                update(WebhookDeliveryModel)
+                .filter_by(webhook_delivery_id=webhook_delivery_id)
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+
+    async def renew_webhook_delivery_lease(self, webhook_delivery_id: str, attempts: int, lease_seconds: int) -> bool:
+        """
+        Push back the next attempt of a claimed delivery by the lease, right before it's sent.
+
+        :return: False if the delivery was finished, or claimed again after its lease expired, since `attempts`.
+        """
+        async with self.Session() as session:
+            result = await session.execute(
+                update(WebhookDeliveryModel)
+                .filter_by(webhook_delivery_id=webhook_delivery_id)
+                .filter_by(status=WebhookDeliveryStatus.pending)
+                .filter_by(attempts=attempts)
+                .values(next_attempt_at=datetime.utcnow() + timedelta(seconds=lease_seconds))
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+            return result.rowcount > 0
+
+    async def delete_finished_webhook_deliveries(self, finished_before: datetime) -> None:
+        async with self.Session() as session:
+            await session.execute(
+                delete(WebhookDeliveryModel)
+                .filter(
+                    WebhookDeliveryModel.status.in_([WebhookDeliveryStatus.delivered, WebhookDeliveryStatus.failed])
+                )
+                .filter(WebhookDeliveryModel.modified_at < finished_before)
+            )
+            await session.commit()
+
+    async def get_webhook_deliveries(self, run_id: str, organization_id: str) -> list[WebhookDelivery]:
+        async with self.Session() as session:
+            webhook_deliveries = (
+                await session.scalars(
+                    select(WebhookDeliveryModel)
+                    .filter_by(run_id=run_id)
+                    .filter_by(organization_id=organization_id)
+                    .order_by(WebhookDeliveryModel.created_at.desc())
+                )
+            ).all()
+            return [WebhookDelivery.model_validate(webhook_delivery) for webhook_delivery in webhook_deliveries]
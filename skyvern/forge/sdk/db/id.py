@@ -43,12 +43,14 @@ ORGANIZATION_AUTH_TOKEN_PREFIX = "oat"
 ORG_PREFIX = "o"
 OUTPUT_PARAMETER_PREFIX = "op"
 PERSISTENT_BROWSER_SESSION_ID = "pbs"
+QUEUED_RUN_PREFIX = "qr"
 STEP_PREFIX = "stp"
 TASK_GENERATION_PREFIX = "tg"
 TASK_PREFIX = "tsk"
 TASK_RUN_PREFIX = "tr"
 TOTP_CODE_PREFIX = "totp"
 USER_PREFIX = "u"
+WEBHOOK_DELIVERY_PREFIX = "wd"
 WORKFLOW_PARAMETER_PREFIX = "wp"
 WORKFLOW_PERMANENT_ID_PREFIX = "wpid"
 WORKFLOW_PREFIX = "w"
@@ -171,6 +173,16 @@ def generate_persistent_browser_session_id() -> str:
     return f"{PERSISTENT_BROWSER_SESSION_ID}_{int_id}"
 
 
+def generate_queued_run_id() -> str:
+    int_id = generate_id()
+    return f"{QUEUED_RUN_PREFIX}_{int_id}"
+
+
+def generate_webhook_delivery_id() -> str:
+    int_id = generate_id()
+    return f"{WEBHOOK_DELIVERY_PREFIX}_{int_id}"
+
+
 def generate_task_run_id() -> str:
     int_id = generate_id()
     return f"{TASK_RUN_PREFIX}_{int_id}"
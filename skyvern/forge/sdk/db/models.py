@@ -34,6 +34,7 @@ from skyvern.forge.sdk.db.id import (
     generate_organization_bitwarden_collection_id,
     generate_output_parameter_id,
     generate_persistent_browser_session_id,
+    generate_queued_run_id,
     generate_step_id,
     generate_task_generation_id,
     generate_task_id,
@@ -41,6 +42,7 @@ from skyvern.forge.sdk.db.id import (
     generate_task_v2_id,
     generate_thought_id,
     generate_totp_code_id,
+    generate_webhook_delivery_id,
     generate_workflow_id,
     generate_workflow_parameter_id,
     generate_workflow_permanent_id,
@@ -526,6 +528,22 @@ class ActionModel(Base):
     modified_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow, nullable=False)
 
 
+class ActionPlanCacheModel(Base):
+    """
+    The latest completed task for a normalized (url, navigation goal), its actions are reused as the action plan
+    """
+
+    __tablename__ = "action_plan_caches"
+
+    plan_key = Column(String, primary_key=True)
+    task_id = Column(String, nullable=False)
+    url = Column(String)
+    navigation_goal = Column(String)
+
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+    modified_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow, nullable=False)
+
+
 class WorkflowRunBlockModel(Base):
     __tablename__ = "workflow_run_blocks"
     __table_args__ = (Index("wfrb_org_wfr_index", "organization_id", "workflow_run_id"),)
@@ -655,6 +673,56 @@ class TaskRunModel(Base):
     modified_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow, nullable=False)
 
 
+class QueuedRunModel(Base):
+    """
+    A task, workflow run or task v2 waiting for a worker, or being executed by one until its lease expires
+    """
+
+    __tablename__ = "queued_runs"
+    __table_args__ = (
+        Index("queued_run_status_org_created_index", "status", "organization_id", "created_at"),
+        Index("queued_run_status_lease_index", "status", "lease_expires_at"),
+    )
+
+    queued_run_id = Column(String, primary_key=True, default=generate_queued_run_id)
+    organization_id = Column(String, nullable=False)
+    run_type = Column(String, nullable=False)
+    run_id = Column(String, nullable=False, index=True)
+    parameters = Column(JSON, nullable=False)
+    status = Column(String, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    worker_id = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+    modified_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow, nullable=False)
+
+
+class WebhookDeliveryModel(Base):
+    """
+    A webhook of a run waiting to be delivered, retried until it's delivered or out of attempts
+    """
+
+    __tablename__ = "webhook_deliveries"
+    __table_args__ = (Index("webhook_delivery_status_next_attempt_index", "status", "next_attempt_at"),)
+
+    webhook_delivery_id = Column(String, primary_key=True, default=generate_webhook_delivery_id)
+    organization_id = Column(String, nullable=False)
+    run_id = Column(String, nullable=False, index=True)
+    url = Column(String, nullable=False)
+    payload = Column(UnicodeText, nullable=False)
+    headers = Column(JSON, nullable=False)
+    status = Column(String, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False)
+    last_status_code = Column(Integer, nullable=True)
+    last_error = Column(String, nullable=True)
+    delivered_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+    modified_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow, nullable=False)
+
+
 class OrganizationBitwardenCollectionModel(Base):
     __tablename__ = "organization_bitwarden_collections"
 
@@ -1,5 +1,8 @@
+import base64
+import binascii
 import json
 import typing
+from datetime import datetime
 
 import pydantic.json
 import structlog
@@ -421,3 +424,22 @@ def convert_to_workflow_run_block(
         block.complete_criterion = task.complete_criterion
 
     return block
+
+
+def encode_run_cursor(created_at: datetime, run_id: str) -> str:
+    """
+    Encode the position of a run in the runs listing, sorted by (created_at, run_id), into an opaque cursor.
+    """
+    payload = json.dumps({"created_at": created_at.isoformat(), "run_id": run_id})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("utf-8")
+
+
+def decode_run_cursor(cursor: str) -> tuple[datetime, str]:
+    """
+    :raises ValueError: if the cursor is malformed.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("utf-8")))
+        return datetime.fromisoformat(payload["created_at"]), str(payload["run_id"])
+    except (KeyError, TypeError, UnicodeDecodeError, json.JSONDecodeError, binascii.Error) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
@@ -7,9 +7,11 @@ from skyvern.exceptions import OrganizationNotFound
 from skyvern.forge import app
 from skyvern.forge.sdk.core import skyvern_context
 from skyvern.forge.sdk.core.skyvern_context import SkyvernContext
+from skyvern.forge.sdk.models import Step
 from skyvern.forge.sdk.schemas.organizations import Organization
+from skyvern.forge.sdk.schemas.run_queue import QueuedRunType
 from skyvern.forge.sdk.schemas.task_v2 import TaskV2Status
-from skyvern.forge.sdk.schemas.tasks import TaskStatus
+from skyvern.forge.sdk.schemas.tasks import Task, TaskStatus
 from skyvern.forge.sdk.workflow.models.workflow import WorkflowRunStatus
 from skyvern.schemas.runs import RunEngine, RunType
 from skyvern.services import task_v2_service
@@ -17,6 +19,60 @@ from skyvern.services import task_v2_service
 LOG = structlog.get_logger()
 
 
+async def prepare_task_run(
+    task_id: str,
+    organization_id: str,
+    max_steps_override: int | None,
+) -> tuple[Organization, Task, Step, RunEngine]:
+    """
+    Create the first step of the task, mark the task as running and set up the skyvern context of the run.
+    """
+    organization = await app.DATABASE.get_organization(organization_id)
+    if organization is None:
+        raise OrganizationNotFound(organization_id)
+
+    step = await app.DATABASE.create_step(
+        task_id,
+        order=0,
+        retry_index=0,
+        organization_id=organization_id,
+    )
+
+    task = await app.DATABASE.update_task(
+        task_id,
+        status=TaskStatus.running,
+        organization_id=organization_id,
+    )
+    run_obj = await app.DATABASE.get_run(run_id=task_id, organization_id=organization_id)
+    engine = RunEngine.skyvern_v1
+    if run_obj and run_obj.task_run_type == RunType.openai_cua:
+        engine = RunEngine.openai_cua
+    elif run_obj and run_obj.task_run_type == RunType.anthropic_cua:
+        engine = RunEngine.anthropic_cua
+
+    context: SkyvernContext = skyvern_context.ensure_context()
+    context.task_id = task.task_id
+    context.organization_id = organization_id
+    context.max_steps_override = max_steps_override
+    return organization, task, step, engine
+
+
+async def mark_task_v2_as_queued(task_v2_id: str, organization_id: str) -> None:
+    task_v2 = await app.DATABASE.get_task_v2(task_v2_id=task_v2_id, organization_id=organization_id)
+    if not task_v2 or not task_v2.workflow_run_id:
+        raise ValueError("No task v2 or no workflow run associated with task v2")
+
+    await app.DATABASE.update_task_v2(
+        task_v2_id=task_v2_id,
+        status=TaskV2Status.queued,
+        organization_id=organization_id,
+    )
+    await app.DATABASE.update_workflow_run(
+        workflow_run_id=task_v2.workflow_run_id,
+        status=WorkflowRunStatus.queued,
+    )
+
+
 class AsyncExecutor(abc.ABC):
     @abc.abstractmethod
     async def execute_task(
@@ -75,35 +131,7 @@ class BackgroundTaskExecutor(AsyncExecutor):
     ) -> None:
         LOG.info("Executing task using background task executor", task_id=task_id)
 
-        close_browser_on_completion = browser_session_id is None
-
-        organization = await app.DATABASE.get_organization(organization_id)
-        if organization is None:
-            raise OrganizationNotFound(organization_id)
-
-        step = await app.DATABASE.create_step(
-            task_id,
-            order=0,
-            retry_index=0,
-            organization_id=organization_id,
-        )
-
-        task = await app.DATABASE.update_task(
-            task_id,
-            status=TaskStatus.running,
-            organization_id=organization_id,
-        )
-        run_obj = await app.DATABASE.get_run(run_id=task_id, organization_id=organization_id)
-        engine = RunEngine.skyvern_v1
-        if run_obj and run_obj.task_run_type == RunType.openai_cua:
-            engine = RunEngine.openai_cua
-        elif run_obj and run_obj.task_run_type == RunType.anthropic_cua:
-            engine = RunEngine.anthropic_cua
-
-        context: SkyvernContext = skyvern_context.ensure_context()
-        context.task_id = task.task_id
-        context.organization_id = organization_id
-        context.max_steps_override = max_steps_override
+        organization, task, step, engine = await prepare_task_run(task_id, organization_id, max_steps_override)
 
         if background_tasks:
             background_tasks.add_task(
@@ -112,7 +140,7 @@ class BackgroundTaskExecutor(AsyncExecutor):
                 task,
                 step,
                 api_key,
-                close_browser_on_completion=close_browser_on_completion,
+                close_browser_on_completion=browser_session_id is None,
                 browser_session_id=browser_session_id,
                 engine=engine,
             )
@@ -162,20 +190,7 @@ class BackgroundTaskExecutor(AsyncExecutor):
         if organization is None:
             raise OrganizationNotFound(organization_id)
 
-        task_v2 = await app.DATABASE.get_task_v2(task_v2_id=task_v2_id, organization_id=organization_id)
-        if not task_v2 or not task_v2.workflow_run_id:
-            raise ValueError("No task v2 or no workflow run associated with task v2")
-
-        # mark task v2 as queued
-        await app.DATABASE.update_task_v2(
-            task_v2_id=task_v2_id,
-            status=TaskV2Status.queued,
-            organization_id=organization_id,
-        )
-        await app.DATABASE.update_workflow_run(
-            workflow_run_id=task_v2.workflow_run_id,
-            status=WorkflowRunStatus.queued,
-        )
+        await mark_task_v2_as_queued(task_v2_id, organization_id)
 
         if background_tasks:
             background_tasks.add_task(
@@ -185,3 +200,75 @@ class BackgroundTaskExecutor(AsyncExecutor):
                 max_steps_override=max_steps_override,
                 browser_session_id=browser_session_id,
             )
+
+
+class QueuedRunExecutor(AsyncExecutor):
+    """
+    Put the runs in the durable run queue, they are executed by the run queue workers (skyvern run worker)
+    instead of the API process.
+    """
+
+    async def execute_task(
+        self,
+        request: Request | None,
+        background_tasks: BackgroundTasks | None,
+        task_id: str,
+        organization_id: str,
+        max_steps_override: int | None,
+        api_key: str | None,
+        browser_session_id: str | None,
+        **kwargs: dict,
+    ) -> None:
+        queued_run = await app.DATABASE.enqueue_run(
+            organization_id=organization_id,
+            run_type=QueuedRunType.task,
+            run_id=task_id,
+            parameters={
+                "max_steps_override": max_steps_override,
+                "browser_session_id": browser_session_id,
+            },
+        )
+        LOG.info("Queued the task", task_id=task_id, queued_run_id=queued_run.queued_run_id)
+
+    async def execute_workflow(
+        self,
+        request: Request | None,
+        background_tasks: BackgroundTasks | None,
+        organization: Organization,
+        workflow_id: str,
+        workflow_run_id: str,
+        max_steps_override: int | None,
+        api_key: str | None,
+        browser_session_id: str | None,
+        **kwargs: dict,
+    ) -> None:
+        queued_run = await app.DATABASE.enqueue_run(
+            organization_id=organization.organization_id,
+            run_type=QueuedRunType.workflow_run,
+            run_id=workflow_run_id,
+            parameters={
+                "browser_session_id": browser_session_id,
+            },
+        )
+        LOG.info("Queued the workflow run", workflow_run_id=workflow_run_id, queued_run_id=queued_run.queued_run_id)
+
+    async def execute_task_v2(
+        self,
+        request: Request | None,
+        background_tasks: BackgroundTasks | None,
+        organization_id: str,
+        task_v2_id: str,
+        max_steps_override: int | str | None,
+        browser_session_id: str | None,
+        **kwargs: dict,
+    ) -> None:
+        queued_run = await app.DATABASE.enqueue_run(
+            organization_id=organization_id,
+            run_type=QueuedRunType.task_v2,
+            run_id=task_v2_id,
+            parameters={
+                "max_steps_override": max_steps_override,
+                "browser_session_id": browser_session_id,
+            },
+        )
+        LOG.info("Queued the task v2", task_v2_id=task_v2_id, queued_run_id=queued_run.queued_run_id)
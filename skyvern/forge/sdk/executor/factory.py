@@ -1,8 +1,9 @@
-from skyvern.forge.sdk.executor.async_executor import AsyncExecutor, BackgroundTaskExecutor
+from skyvern.config import settings
+from skyvern.forge.sdk.executor.async_executor import AsyncExecutor, BackgroundTaskExecutor, QueuedRunExecutor
 
 
 class AsyncExecutorFactory:
-    __instance: AsyncExecutor = BackgroundTaskExecutor()
+    __instance: AsyncExecutor = QueuedRunExecutor() if settings.RUN_QUEUE_ENABLED else BackgroundTaskExecutor()
 
     @staticmethod
     def set_executor(executor: AsyncExecutor) -> None:
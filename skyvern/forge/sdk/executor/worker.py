@@ -0,0 +1,256 @@
+import asyncio
+import contextvars
+import os
+import signal
+import socket
+import uuid
+from datetime import datetime, timedelta
+
+import structlog
+
+from skyvern.config import settings
+from skyvern.exceptions import OrganizationNotFound
+from skyvern.forge import app
+from skyvern.forge.sdk.api.aws import AsyncAWSClient
+from skyvern.forge.sdk.db.enums import OrganizationAuthTokenType
+from skyvern.forge.sdk.executor.async_executor import prepare_task_run
+from skyvern.forge.sdk.schemas.run_queue import QueuedRun, QueuedRunStatus, QueuedRunType
+from skyvern.forge.sdk.schemas.task_v2 import TaskV2Status
+from skyvern.forge.sdk.schemas.tasks import TaskStatus
+from skyvern.forge.sdk.workflow.models.workflow import WorkflowRunStatus
+from skyvern.services import task_v2_service
+
+LOG = structlog.get_logger()
+
+WORKER_STOPPED_FAILURE_REASON = "The worker executing the run stopped"
+# the created and queued statuses have the same values for the tasks, the workflow runs and the task v2
+NOT_STARTED_RUN_STATUSES = {TaskStatus.created, TaskStatus.queued}
+
+
+class RunQueueWorker:
+    """
+    Execute the runs of the run queue, up to `slots` at the same time (one browser per run).
+    The claimed runs are leased to the worker, the heartbeat renews the leases while they are executed.
+    When a worker stops without finishing its runs, their leases expire and another worker takes them over.
+    """
+
+    def __init__(
+        self,
+        slots: int = settings.RUN_QUEUE_WORKER_SLOTS,
+        max_running_per_organization: int | None = settings.RUN_QUEUE_MAX_RUNNING_PER_ORGANIZATION,
+        lease_seconds: int = settings.RUN_QUEUE_LEASE_SECONDS,
+        heartbeat_interval_seconds: float = settings.RUN_QUEUE_HEARTBEAT_INTERVAL_SECONDS,
+        poll_interval_seconds: float = settings.RUN_QUEUE_POLL_INTERVAL_SECONDS,
+        max_attempts: int = settings.RUN_QUEUE_MAX_ATTEMPTS,
+        finished_retention_hours: float = settings.RUN_QUEUE_FINISHED_RETENTION_HOURS,
+    ) -> None:
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.slots = slots
+        self.max_running_per_organization = max_running_per_organization
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval_seconds = heartbeat_interval_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        self.max_attempts = max_attempts
+        self.finished_retention_hours = finished_retention_hours
+        self._running: dict[str, asyncio.Task[None]] = {}
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        LOG.info("Stopping the run queue worker", worker_id=self.worker_id, running=len(self._running))
+        self._stopping.set()
+
+    async def run(self) -> None:
+        LOG.info("Starting the run queue worker", worker_id=self.worker_id, slots=self.slots)
+        heartbeat = asyncio.create_task(self._heartbeat())
+        app.WEBHOOK_DISPATCHER.start()
+        try:
+            while not self._stopping.is_set():
+                claimed = await self._claim()
+                # poll right away when the queue had more runs than the free slots
+                if claimed and len(self._running) < self.slots:
+                    continue
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval_seconds)
+                except asyncio.TimeoutError:
+                    pass
+            # let the running runs finish, the heartbeat keeps their leases until then
+            if self._running:
+                await asyncio.gather(*self._running.values(), return_exceptions=True)
+        finally:
+            heartbeat.cancel()
+            await app.STEP_USAGE_ACCUMULATOR.close()
+            await app.WEBHOOK_DISPATCHER.close()
+            await AsyncAWSClient.close_clients()
+        LOG.info("Stopped the run queue worker", worker_id=self.worker_id)
+
+    async def _claim(self) -> int:
+        free_slots = self.slots - len(self._running)
+        if free_slots <= 0:
+            return 0
+        try:
+            queued_runs = await app.DATABASE.claim_queued_runs(
+                worker_id=self.worker_id,
+                limit=free_slots,
+                lease_seconds=self.lease_seconds,
+                max_running_per_organization=self.max_running_per_organization,
+            )
+        except Exception:
+            LOG.exception("Failed to claim the queued runs", worker_id=self.worker_id)
+            return 0
+        for queued_run in queued_runs:
+            # every run gets its own skyvern context
+            self._running[queued_run.queued_run_id] = asyncio.create_task(
+                self._execute(queued_run), context=contextvars.Context()
+            )
+        return len(queued_runs)
+
+    async def _execute(self, queued_run: QueuedRun) -> None:
+        LOG.info(
+            "Executing a queued run",
+            queued_run_id=queued_run.queued_run_id,
+            run_type=queued_run.run_type,
+            run_id=queued_run.run_id,
+            attempts=queued_run.attempts,
+            queued_seconds=(datetime.utcnow() - queued_run.created_at).total_seconds(),
+        )
+        status = QueuedRunStatus.completed
+        try:
+            await execute_queued_run(queued_run)
+        except Exception:
+            LOG.exception("Failed to execute the queued run", queued_run_id=queued_run.queued_run_id)
+            status = QueuedRunStatus.failed
+        finally:
+            self._running.pop(queued_run.queued_run_id, None)
+            try:
+                await app.DATABASE.finish_queued_run(queued_run.queued_run_id, self.worker_id, status)
+            except Exception:
+                LOG.exception("Failed to finish the queued run", queued_run_id=queued_run.queued_run_id)
+
+    async def _heartbeat(self) -> None:
+        while True:
+            try:
+                await app.DATABASE.renew_queued_run_leases(self.worker_id, list(self._running), self.lease_seconds)
+                for queued_run in await app.DATABASE.release_expired_queued_runs(self.max_attempts):
+                    LOG.warning(
+                        "Queued run is out of attempts",
+                        queued_run_id=queued_run.queued_run_id,
+                        run_id=queued_run.run_id,
+                        attempts=queued_run.attempts,
+                    )
+                    await fail_queued_run(queued_run)
+                await app.DATABASE.delete_finished_queued_runs(
+                    finished_before=datetime.utcnow() - timedelta(hours=self.finished_retention_hours)
+                )
+                await self._log_metrics()
+            except Exception:
+                LOG.exception("Run queue heartbeat failed", worker_id=self.worker_id)
+            await asyncio.sleep(self.heartbeat_interval_seconds)
+
+    async def _log_metrics(self) -> None:
+        counts = await app.DATABASE.get_queued_run_counts()
+        oldest_created_at = await app.DATABASE.get_oldest_queued_run_created_at()
+        LOG.info(
+            "Run queue metrics",
+            worker_id=self.worker_id,
+            queued=counts.get(QueuedRunStatus.queued, 0),
+            running=counts.get(QueuedRunStatus.running, 0),
+            oldest_queued_seconds=(datetime.utcnow() - oldest_created_at).total_seconds() if oldest_created_at else 0,
+            worker_running=len(self._running),
+            worker_slots=self.slots,
+        )
+
+
+async def get_run_status(queued_run: QueuedRun) -> TaskStatus | WorkflowRunStatus | TaskV2Status | None:
+    if queued_run.run_type == QueuedRunType.task:
+        task = await app.DATABASE.get_task(queued_run.run_id, organization_id=queued_run.organization_id)
+        return task.status if task else None
+    if queued_run.run_type == QueuedRunType.workflow_run:
+        workflow_run = await app.DATABASE.get_workflow_run(
+            queued_run.run_id, organization_id=queued_run.organization_id
+        )
+        return workflow_run.status if workflow_run else None
+    task_v2 = await app.DATABASE.get_task_v2(queued_run.run_id, organization_id=queued_run.organization_id)
+    return task_v2.status if task_v2 else None
+
+
+async def execute_queued_run(queued_run: QueuedRun) -> None:
+    if queued_run.attempts > 1:
+        run_status = await get_run_status(queued_run)
+        if run_status is None or run_status.is_final():
+            return
+        # a run the stopped worker already started can't be resumed, its browser is gone
+        if run_status not in NOT_STARTED_RUN_STATUSES:
+            LOG.warning("Failing a queued run started by a stopped worker", queued_run_id=queued_run.queued_run_id)
+            await fail_queued_run(queued_run)
+            return
+
+    parameters = queued_run.parameters
+    browser_session_id = parameters.get("browser_session_id")
+    # the api key of the request is not stored in the queue, the runs use a token of the organization
+    org_token = await app.DATABASE.get_valid_org_auth_token(queued_run.organization_id, OrganizationAuthTokenType.api)
+    api_key = org_token.token if org_token else None
+    if queued_run.run_type == QueuedRunType.task:
+        organization, task, step, engine = await prepare_task_run(
+            queued_run.run_id, queued_run.organization_id, parameters.get("max_steps_override")
+        )
+        await app.agent.execute_step(
+            organization,
+            task,
+            step,
+            api_key,
+            close_browser_on_completion=browser_session_id is None,
+            browser_session_id=browser_session_id,
+            engine=engine,
+        )
+        return
+
+    organization = await app.DATABASE.get_organization(queued_run.organization_id)
+    if organization is None:
+        raise OrganizationNotFound(queued_run.organization_id)
+    if queued_run.run_type == QueuedRunType.workflow_run:
+        await app.WORKFLOW_SERVICE.execute_workflow(
+            workflow_run_id=queued_run.run_id,
+            api_key=api_key,
+            organization=organization,
+            browser_session_id=browser_session_id,
+        )
+    else:
+        await task_v2_service.run_task_v2(
+            organization=organization,
+            task_v2_id=queued_run.run_id,
+            max_steps_override=parameters.get("max_steps_override"),
+            browser_session_id=browser_session_id,
+        )
+
+
+async def fail_queued_run(queued_run: QueuedRun, failure_reason: str = WORKER_STOPPED_FAILURE_REASON) -> None:
+    run_status = await get_run_status(queued_run)
+    if run_status is None or run_status.is_final():
+        return
+    if queued_run.run_type == QueuedRunType.task:
+        await app.DATABASE.update_task(
+            queued_run.run_id,
+            status=TaskStatus.failed,
+            failure_reason=failure_reason,
+            organization_id=queued_run.organization_id,
+        )
+    elif queued_run.run_type == QueuedRunType.workflow_run:
+        await app.WORKFLOW_SERVICE.mark_workflow_run_as_failed(
+            workflow_run_id=queued_run.run_id, failure_reason=failure_reason
+        )
+    else:
+        task_v2 = await app.DATABASE.get_task_v2(queued_run.run_id, organization_id=queued_run.organization_id)
+        await task_v2_service.mark_task_v2_as_failed(
+            queued_run.run_id,
+            workflow_run_id=task_v2.workflow_run_id if task_v2 else None,
+            failure_reason=failure_reason,
+            organization_id=queued_run.organization_id,
+        )
+
+
+async def run_worker(slots: int = settings.RUN_QUEUE_WORKER_SLOTS) -> None:
+    worker = RunQueueWorker(slots=slots)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    await worker.run()
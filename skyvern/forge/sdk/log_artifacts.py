@@ -120,6 +120,8 @@ async def _save_log_artifacts(
 
         log_json = json.dumps(log, cls=SkyvernJSONLogEncoder, indent=2)
 
+        # the log artifacts created earlier may still be buffered
+        await app.ARTIFACT_MANAGER.flush_artifacts()
         log_artifact = await app.DATABASE.get_artifact_by_entity_id(
             artifact_type=ArtifactType.SKYVERN_LOG_RAW,
             step_id=step_id,
@@ -0,0 +1,75 @@
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Any
+
+MAX_PENDING_MESSAGES = 100
+
+
+class Subscription:
+    """
+    The messages published to any of the channels, in order. A slow subscriber drops its oldest messages
+    instead of blocking the publishers. Only the latest pending message of a conflated channel is kept, eg: a
+    subscriber that can't keep up with the frames of a live view skips to the latest frame.
+    """
+
+    def __init__(
+        self,
+        channels: list[str],
+        conflated_channels: set[str] | None = None,
+        max_pending_messages: int = MAX_PENDING_MESSAGES,
+    ) -> None:
+        self.channels = channels
+        self.conflated_channels = conflated_channels or set()
+        # a conflated message is queued as (channel, None) and read from here when it's dequeued
+        self._conflated_messages: dict[str, dict[str, Any]] = {}
+        self._queue: asyncio.Queue[tuple[str, dict[str, Any] | None]] = asyncio.Queue(maxsize=max_pending_messages)
+
+    def put_nowait(self, channel: str, message: dict[str, Any]) -> None:
+        if channel in self.conflated_channels:
+            has_pending_message = channel in self._conflated_messages
+            self._conflated_messages[channel] = message
+            if has_pending_message:
+                return
+            self._put_nowait((channel, None))
+        else:
+            self._put_nowait((channel, message))
+
+    def _put_nowait(self, item: tuple[str, dict[str, Any] | None]) -> None:
+        if self._queue.full():
+            channel, message = self._queue.get_nowait()
+            if message is None:
+                self._conflated_messages.pop(channel, None)
+        self._queue.put_nowait(item)
+
+    async def get(self, timeout: float) -> dict[str, Any] | None:
+        """
+        :return: the next message, or None if nothing is published before the timeout.
+        """
+        try:
+            async with asyncio.timeout(timeout):
+                channel, message = await self._queue.get()
+        except TimeoutError:
+            return None
+        if message is None:
+            return self._conflated_messages.pop(channel, None)
+        return message
+
+
+class BasePubSub(ABC):
+    @abstractmethod
+    async def publish(self, channel: str, message: dict[str, Any]) -> None:
+        pass
+
+    @abstractmethod
+    async def subscribe(self, channels: list[str], conflated_channels: set[str] | None = None) -> Subscription:
+        pass
+
+    @abstractmethod
+    async def unsubscribe(self, subscription: Subscription) -> None:
+        pass
+
+    async def count_subscribers(self, channel: str) -> int:
+        """
+        The backends that can't count the subscribers of a channel report one, so the publishers keep publishing.
+        """
+        return 1
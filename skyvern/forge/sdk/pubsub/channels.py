@@ -0,0 +1,18 @@
+def get_task_channel(task_id: str) -> str:
+    return f"task:{task_id}"
+
+
+def get_workflow_run_channel(workflow_run_id: str) -> str:
+    return f"workflow_run:{workflow_run_id}"
+
+
+def get_streaming_screenshot_channel(organization_id: str, file_name: str) -> str:
+    return f"streaming_screenshot:{organization_id}:{file_name}"
+
+
+def get_live_view_channel(run_id: str) -> str:
+    return f"live_view:{run_id}"
+
+
+def get_totp_channel(organization_id: str, totp_identifier: str) -> str:
+    return f"totp:{organization_id}:{totp_identifier}"
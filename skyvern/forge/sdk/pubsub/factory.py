@@ -0,0 +1,14 @@
+from skyvern.forge.sdk.pubsub.base import BasePubSub
+from skyvern.forge.sdk.pubsub.local import LocalPubSub
+
+
+class PubSubFactory:
+    __pubsub: BasePubSub = LocalPubSub()
+
+    @staticmethod
+    def set_pubsub(pubsub: BasePubSub) -> None:
+        PubSubFactory.__pubsub = pubsub
+
+    @staticmethod
+    def get_pubsub() -> BasePubSub:
+        return PubSubFactory.__pubsub
@@ -0,0 +1,35 @@
+from collections import defaultdict
+from typing import Any
+
+from skyvern.forge.sdk.pubsub.base import BasePubSub, Subscription
+
+
+class LocalPubSub(BasePubSub):
+    """
+    In-process pub/sub: the messages only reach the subscribers of the same process.
+    """
+
+    def __init__(self) -> None:
+        self.subscriptions: dict[str, set[Subscription]] = defaultdict(set)
+
+    async def publish(self, channel: str, message: dict[str, Any]) -> None:
+        for subscription in list(self.subscriptions.get(channel, ())):
+            subscription.put_nowait(channel, message)
+
+    async def subscribe(self, channels: list[str], conflated_channels: set[str] | None = None) -> Subscription:
+        subscription = Subscription(channels, conflated_channels=conflated_channels)
+        for channel in channels:
+            self.subscriptions[channel].add(subscription)
+        return subscription
+
+    async def unsubscribe(self, subscription: Subscription) -> None:
+        for channel in subscription.channels:
+            subscriptions = self.subscriptions.get(channel)
+            if subscriptions is None:
+                continue
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self.subscriptions[channel]
+
+    async def count_subscribers(self, channel: str) -> int:
+        return len(self.subscriptions.get(channel, ()))
@@ -0,0 +1,78 @@
+import asyncio
+import base64
+import hashlib
+
+import structlog
+
+from skyvern.forge import app
+from skyvern.forge.sdk.pubsub.channels import get_streaming_screenshot_channel
+
+LOG = structlog.get_logger()
+SCREENSHOT_POLL_INTERVAL = 2
+
+
+class StreamingScreenshotWatcher:
+    """
+    Read the streaming screenshot of a run once per interval for all the sockets watching it, and publish it only
+    when its content changes.
+    """
+
+    def __init__(self, organization_id: str, file_name: str) -> None:
+        self.organization_id = organization_id
+        self.file_name = file_name
+        self.channel = get_streaming_screenshot_channel(organization_id, file_name)
+        self.subscribers = 0
+        # replayed to the sockets joining after the frame is published
+        self.latest_frame: dict[str, str] | None = None
+        self._poll_task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        self._poll_task = asyncio.create_task(self._poll())
+
+    def stop(self) -> None:
+        if self._poll_task:
+            self._poll_task.cancel()
+
+    async def _poll(self) -> None:
+        while True:
+            try:
+                screenshot = await app.STORAGE.get_streaming_file(self.organization_id, self.file_name)
+                if screenshot:
+                    screenshot_hash = hashlib.sha256(screenshot).hexdigest()
+                    if not self.latest_frame or self.latest_frame["screenshot_hash"] != screenshot_hash:
+                        self.latest_frame = {
+                            "screenshot": base64.b64encode(screenshot).decode("utf-8"),
+                            "screenshot_hash": screenshot_hash,
+                        }
+                        await app.PUBSUB.publish(self.channel, self.latest_frame)
+            except Exception:
+                LOG.warning(
+                    "Failed to poll the streaming screenshot",
+                    organization_id=self.organization_id,
+                    file_name=self.file_name,
+                    exc_info=True,
+                )
+            await asyncio.sleep(SCREENSHOT_POLL_INTERVAL)
+
+
+_watchers: dict[str, StreamingScreenshotWatcher] = {}
+
+
+def acquire_screenshot_watcher(organization_id: str, file_name: str) -> StreamingScreenshotWatcher:
+    channel = get_streaming_screenshot_channel(organization_id, file_name)
+    watcher = _watchers.get(channel)
+    if watcher is None:
+        watcher = StreamingScreenshotWatcher(organization_id, file_name)
+        watcher.start()
+        _watchers[channel] = watcher
+    watcher.subscribers += 1
+    return watcher
+
+
+def release_screenshot_watcher(watcher: StreamingScreenshotWatcher) -> None:
+    watcher.subscribers -= 1
+    if watcher.subscribers > 0:
+        return
+    watcher.stop()
+    if _watchers.get(watcher.channel) is watcher:
+        del _watchers[watcher.channel]
@@ -21,6 +21,7 @@ from skyvern.forge.sdk.core import skyvern_context
 from skyvern.forge.sdk.core.permissions.permission_checker_factory import PermissionCheckerFactory
 from skyvern.forge.sdk.core.security import generate_skyvern_signature
 from skyvern.forge.sdk.db.enums import OrganizationAuthTokenType
+from skyvern.forge.sdk.db.utils import encode_run_cursor
 from skyvern.forge.sdk.executor.factory import AsyncExecutorFactory
 from skyvern.forge.sdk.models import Step
 from skyvern.forge.sdk.routes.routers import base_router, legacy_base_router, legacy_v2_router
@@ -42,6 +43,7 @@ from skyvern.forge.sdk.schemas.tasks import (
     TaskResponse,
     TaskStatus,
 )
+from skyvern.forge.sdk.schemas.webhook_deliveries import WebhookDelivery
 from skyvern.forge.sdk.schemas.workflow_runs import WorkflowRunTimeline
 from skyvern.forge.sdk.services import org_auth_service
 from skyvern.forge.sdk.workflow.exceptions import (
@@ -425,17 +427,26 @@ async def get_tasks(
 async def get_runs(
     current_org: Organization = Depends(org_auth_service.get_current_org),
     page: int = Query(1, ge=1),
-    page_size: int = Query(10, ge=1),
+    page_size: int = Query(10, ge=1, le=settings.RUNS_MAX_PAGE_SIZE),
     status: Annotated[list[WorkflowRunStatus] | None, Query()] = None,
+    cursor: str | None = Query(
+        None, description="The X-Next-Cursor header of the previous page. When set, the page is ignored."
+    ),
 ) -> Response:
     analytics.capture("skyvern-oss-agent-runs-get")
 
-    # temporary limit to 100 runs
-    if page > 10:
-        return []
-
-    runs = await app.DATABASE.get_all_runs(current_org.organization_id, page=page, page_size=page_size, status=status)
-    return ORJSONResponse([run.model_dump() for run in runs])
+    try:
+        runs = await app.DATABASE.get_all_runs(
+            current_org.organization_id, page=page, page_size=page_size, status=status, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response = ORJSONResponse([run.model_dump() for run in runs])
+    if len(runs) == page_size:
+        last_run = runs[-1]
+        last_run_id = last_run.workflow_run_id if isinstance(last_run, WorkflowRun) else last_run.task_id
+        response.headers["X-Next-Cursor"] = encode_run_cursor(last_run.created_at, last_run_id)
+    return response
 
 
 @base_router.get(
@@ -471,6 +482,29 @@ async def get_run(
     return run_response
 
 
+@base_router.get(
+    "/runs/{run_id}/webhook_deliveries",
+    tags=["Agent"],
+    response_model=list[WebhookDelivery],
+    description="Get the webhook deliveries of a task or a workflow run, the latest first",
+    summary="Get the webhook deliveries of a run",
+    openapi_extra={
+        "x-fern-sdk-group-name": "agent",
+        "x-fern-sdk-method-name": "get_run_webhook_deliveries",
+    },
+)
+@base_router.get(
+    "/runs/{run_id}/webhook_deliveries/",
+    response_model=list[WebhookDelivery],
+    include_in_schema=False,
+)
+async def get_run_webhook_deliveries(
+    run_id: str = Path(..., description="The id of the task run or the workflow run."),
+    current_org: Organization = Depends(org_auth_service.get_current_org),
+) -> list[WebhookDelivery]:
+    return await app.DATABASE.get_webhook_deliveries(run_id, organization_id=current_org.organization_id)
+
+
 @legacy_base_router.get(
     "/tasks/{task_id}/steps",
     tags=["agent"],
@@ -1,5 +1,3 @@
-import asyncio
-import base64
 from datetime import datetime
 
 import structlog
@@ -7,7 +5,20 @@ from fastapi import WebSocket, WebSocketDisconnect
 from pydantic import ValidationError
 from websockets.exceptions import ConnectionClosedOK
 
+from skyvern.config import settings
 from skyvern.forge import app
+from skyvern.forge.sdk.pubsub.base import Subscription
+from skyvern.forge.sdk.pubsub.channels import (
+    get_live_view_channel,
+    get_streaming_screenshot_channel,
+    get_task_channel,
+    get_workflow_run_channel,
+)
+from skyvern.forge.sdk.pubsub.screenshot import (
+    StreamingScreenshotWatcher,
+    acquire_screenshot_watcher,
+    release_screenshot_watcher,
+)
 from skyvern.forge.sdk.routes.routers import legacy_base_router
 from skyvern.forge.sdk.schemas.tasks import TaskStatus
 from skyvern.forge.sdk.services.org_auth_service import get_current_org
@@ -15,6 +26,20 @@ from skyvern.forge.sdk.workflow.models.workflow import WorkflowRunStatus
 
 LOG = structlog.get_logger()
 STREAMING_TIMEOUT = 300
+# the status changes are pushed through app.PUBSUB. The status is still read from the database once in a while
+# in case the run is updated by another process the pubsub backend doesn't reach.
+STATUS_RECONCILE_INTERVAL = 30
+
+
+def _get_wait_timeout(last_activity_timestamp: datetime, last_reconcile_timestamp: datetime) -> float:
+    now = datetime.utcnow()
+    return max(
+        0,
+        min(
+            STREAMING_TIMEOUT - (now - last_activity_timestamp).total_seconds(),
+            STATUS_RECONCILE_INTERVAL - (now - last_reconcile_timestamp).total_seconds(),
+        ),
+    )
 
 
 @legacy_base_router.websocket("/stream/tasks/{task_id}")
@@ -47,8 +72,33 @@ async def task_stream(
     LOG.info("Started task streaming", task_id=task_id, organization_id=organization_id)
     # timestamp last time when streaming activity happens
     last_activity_timestamp = datetime.utcnow()
+    subscription: Subscription | None = None
+    screenshot_watcher: StreamingScreenshotWatcher | None = None
+    last_screenshot_hash: str | None = None
+    live_view_frame_sent = False
 
     try:
+        task = await app.DATABASE.get_task(task_id=task_id, organization_id=organization_id)
+        if not task:
+            LOG.info("Task not found. Closing connection", task_id=task_id, organization_id=organization_id)
+            await websocket.send_json(
+                {
+                    "task_id": task_id,
+                    "status": "not_found",
+                }
+            )
+            return
+        last_reconcile_timestamp = datetime.utcnow()
+        task_status = task.status
+        # the screenshot of a task in a workflow run is streamed under the workflow run id
+        file_name = f"{task.workflow_run_id or task_id}.png"
+        screenshot_channel = get_streaming_screenshot_channel(organization_id, file_name)
+        live_view_channel = get_live_view_channel(task.workflow_run_id or task_id)
+        subscription = await app.PUBSUB.subscribe(
+            [get_task_channel(task_id), screenshot_channel, live_view_channel],
+            conflated_channels={screenshot_channel, live_view_channel},
+        )
+
         while True:
             # if no activity for 5 minutes, close the connection
             if (datetime.utcnow() - last_activity_timestamp).total_seconds() > STREAMING_TIMEOUT:
@@ -63,47 +113,61 @@ async def task_stream(
                 )
                 return
 
-            task = await app.DATABASE.get_task(task_id=task_id, organization_id=organization_id)
-            if not task:
-                LOG.info("Task not found. Closing connection", task_id=task_id, organization_id=organization_id)
-                await websocket.send_json(
-                    {
-                        "task_id": task_id,
-                        "status": "not_found",
-                    }
-                )
-                return
-            if task.status.is_final():
+            if (datetime.utcnow() - last_reconcile_timestamp).total_seconds() >= STATUS_RECONCILE_INTERVAL:
+                last_reconcile_timestamp = datetime.utcnow()
+                task = await app.DATABASE.get_task(task_id=task_id, organization_id=organization_id)
+                if task:
+                    task_status = task.status
+
+            if task_status.is_final():
                 LOG.info(
                     "Task is in a final state. Closing connection",
-                    task_status=task.status,
+                    task_status=task_status,
                     task_id=task_id,
                     organization_id=organization_id,
                 )
                 await websocket.send_json(
                     {
                         "task_id": task_id,
-                        "status": task.status,
+                        "status": task_status,
                     }
                 )
                 return
 
-            if task.status == TaskStatus.running:
-                file_name = f"{task_id}.png"
-                if task.workflow_run_id:
-                    file_name = f"{task.workflow_run_id}.png"
-                screenshot = await app.STORAGE.get_streaming_file(organization_id, file_name)
-                if screenshot:
-                    encoded_screenshot = base64.b64encode(screenshot).decode("utf-8")
-                    await websocket.send_json(
-                        {
-                            "task_id": task_id,
-                            "status": task.status,
-                            "screenshot": encoded_screenshot,
-                        }
-                    )
-                    last_activity_timestamp = datetime.utcnow()
-            await asyncio.sleep(2)
+            # the live view frames are pushed by the browser, no need to poll the streaming screenshot
+            if task_status == TaskStatus.running and screenshot_watcher is None and not settings.LIVE_VIEW_ENABLED:
+                screenshot_watcher = acquire_screenshot_watcher(organization_id, file_name)
+                if screenshot_watcher.latest_frame:
+                    subscription.put_nowait(screenshot_channel, screenshot_watcher.latest_frame)
+
+            message = await subscription.get(
+                timeout=_get_wait_timeout(last_activity_timestamp, last_reconcile_timestamp)
+            )
+            if not message:
+                continue
+            if "status" in message:
+                task_status = TaskStatus(message["status"])
+            elif task_status == TaskStatus.running and "frame" in message:
+                # the replayed frames are for the viewers who joined after the latest repaint
+                if message.get("replay") and live_view_frame_sent:
+                    continue
+                await websocket.send_bytes(message["frame"])
+                live_view_frame_sent = True
+                last_activity_timestamp = datetime.utcnow()
+            elif (
+                task_status == TaskStatus.running
+                and "screenshot" in message
+                and message["screenshot_hash"] != last_screenshot_hash
+            ):
+                await websocket.send_json(
+                    {
+                        "task_id": task_id,
+                        "status": task_status,
+                        "screenshot": message["screenshot"],
+                    }
+                )
+                last_screenshot_hash = message["screenshot_hash"]
+                last_activity_timestamp = datetime.utcnow()
 
     except ValidationError as e:
         await websocket.send_text(f"Invalid data: {e}")
@@ -115,6 +179,11 @@ async def task_stream(
     except Exception:
         LOG.warning("Error while streaming", task_id=task_id, organization_id=organization_id, exc_info=True)
         return
+    finally:
+        if subscription:
+            await app.PUBSUB.unsubscribe(subscription)
+        if screenshot_watcher:
+            release_screenshot_watcher(screenshot_watcher)
     LOG.info("WebSocket connection closed successfully", task_id=task_id, organization_id=organization_id)
     return
 
@@ -153,8 +222,39 @@ async def workflow_run_streaming(
     )
     # timestamp last time when streaming activity happens
     last_activity_timestamp = datetime.utcnow()
+    subscription: Subscription | None = None
+    screenshot_watcher: StreamingScreenshotWatcher | None = None
+    last_screenshot_hash: str | None = None
+    live_view_frame_sent = False
+    file_name = f"{workflow_run_id}.png"
 
     try:
+        workflow_run = await app.DATABASE.get_workflow_run(
+            workflow_run_id=workflow_run_id,
+            organization_id=organization_id,
+        )
+        if not workflow_run or workflow_run.organization_id != organization_id:
+            LOG.info(
+                "WofklowRun Streaming: Workflow not found",
+                workflow_run_id=workflow_run_id,
+                organization_id=organization_id,
+            )
+            await websocket.send_json(
+                {
+                    "workflow_run_id": workflow_run_id,
+                    "status": "not_found",
+                }
+            )
+            return
+        last_reconcile_timestamp = datetime.utcnow()
+        workflow_run_status = workflow_run.status
+        screenshot_channel = get_streaming_screenshot_channel(organization_id, file_name)
+        live_view_channel = get_live_view_channel(workflow_run_id)
+        subscription = await app.PUBSUB.subscribe(
+            [get_workflow_run_channel(workflow_run_id), screenshot_channel, live_view_channel],
+            conflated_channels={screenshot_channel, live_view_channel},
+        )
+
         while True:
             # if no activity for 5 minutes, close the connection
             if (datetime.utcnow() - last_activity_timestamp).total_seconds() > STREAMING_TIMEOUT:
@@ -171,56 +271,72 @@ async def workflow_run_streaming(
                 )
                 return
 
-            workflow_run = await app.DATABASE.get_workflow_run(
-                workflow_run_id=workflow_run_id,
-                organization_id=organization_id,
-            )
-            if not workflow_run or workflow_run.organization_id != organization_id:
-                LOG.info(
-                    "WofklowRun Streaming: Workflow not found",
+            if (datetime.utcnow() - last_reconcile_timestamp).total_seconds() >= STATUS_RECONCILE_INTERVAL:
+                last_reconcile_timestamp = datetime.utcnow()
+                workflow_run = await app.DATABASE.get_workflow_run(
                     workflow_run_id=workflow_run_id,
                     organization_id=organization_id,
                 )
-                await websocket.send_json(
-                    {
-                        "workflow_run_id": workflow_run_id,
-                        "status": "not_found",
-                    }
-                )
-                return
-            if workflow_run.status in [
+                if workflow_run:
+                    workflow_run_status = workflow_run.status
+
+            if workflow_run_status in [
                 WorkflowRunStatus.completed,
                 WorkflowRunStatus.failed,
                 WorkflowRunStatus.terminated,
             ]:
                 LOG.info(
                     "Workflow run is in a final state. Closing connection",
-                    workflow_run_status=workflow_run.status,
+                    workflow_run_status=workflow_run_status,
                     workflow_run_id=workflow_run_id,
                     organization_id=organization_id,
                 )
                 await websocket.send_json(
                     {
                         "workflow_run_id": workflow_run_id,
-                        "status": workflow_run.status,
+                        "status": workflow_run_status,
                     }
                 )
                 return
 
-            if workflow_run.status == WorkflowRunStatus.running:
-                file_name = f"{workflow_run_id}.png"
-                screenshot = await app.STORAGE.get_streaming_file(organization_id, file_name)
-                if screenshot:
-                    encoded_screenshot = base64.b64encode(screenshot).decode("utf-8")
-                    await websocket.send_json(
-                        {
-                            "workflow_run_id": workflow_run_id,
-                            "status": workflow_run.status,
-                            "screenshot": encoded_screenshot,
-                        }
-                    )
-                    last_activity_timestamp = datetime.utcnow()
-            await asyncio.sleep(2)
+            # the live view frames are pushed by the browser, no need to poll the streaming screenshot
+            if (
+                workflow_run_status == WorkflowRunStatus.running
+                and screenshot_watcher is None
+                and not settings.LIVE_VIEW_ENABLED
+            ):
+                screenshot_watcher = acquire_screenshot_watcher(organization_id, file_name)
+                if screenshot_watcher.latest_frame:
+                    subscription.put_nowait(screenshot_channel, screenshot_watcher.latest_frame)
+
+            message = await subscription.get(
+                timeout=_get_wait_timeout(last_activity_timestamp, last_reconcile_timestamp)
+            )
+            if not message:
+                continue
+            if "status" in message:
+                workflow_run_status = WorkflowRunStatus(message["status"])
+            elif workflow_run_status == WorkflowRunStatus.running and "frame" in message:
+                # the replayed frames are for the viewers who joined after the latest repaint
+                if message.get("replay") and live_view_frame_sent:
+                    continue
+                await websocket.send_bytes(message["frame"])
+                live_view_frame_sent = True
+                last_activity_timestamp = datetime.utcnow()
+            elif (
+                workflow_run_status == WorkflowRunStatus.running
+                and "screenshot" in message
+                and message["screenshot_hash"] != last_screenshot_hash
+            ):
+                await websocket.send_json(
+                    {
+                        "workflow_run_id": workflow_run_id,
+                        "status": workflow_run_status,
+                        "screenshot": message["screenshot"],
+                    }
+                )
+                last_screenshot_hash = message["screenshot_hash"]
+                last_activity_timestamp = datetime.utcnow()
 
     except ValidationError as e:
         await websocket.send_text(f"Invalid data: {e}")
@@ -245,6 +361,11 @@ async def workflow_run_streaming(
             exc_info=True,
         )
         return
+    finally:
+        if subscription:
+            await app.PUBSUB.unsubscribe(subscription)
+        if screenshot_watcher:
+            release_screenshot_watcher(screenshot_watcher)
     LOG.info(
         "WofklowRun Streaming: WebSocket connection closed successfully",
         workflow_run_id=workflow_run_id,
@@ -3,6 +3,7 @@ from fastapi import Depends, HTTPException
 
 from skyvern.forge import app
 from skyvern.forge.prompts import prompt_engine
+from skyvern.forge.sdk.pubsub.channels import get_totp_channel
 from skyvern.forge.sdk.routes.routers import legacy_base_router
 from skyvern.forge.sdk.schemas.organizations import Organization
 from skyvern.forge.sdk.schemas.totp_codes import TOTPCode, TOTPCodeCreate
@@ -34,7 +35,7 @@ async def send_totp_code(
     code = await parse_totp_code(data.content)
     if not code:
         raise HTTPException(status_code=400, detail="Failed to parse totp code")
-    return await app.DATABASE.create_totp_code(
+    totp_code = await app.DATABASE.create_totp_code(
         organization_id=curr_org.organization_id,
         totp_identifier=data.totp_identifier,
         content=data.content,
@@ -45,6 +46,12 @@ async def send_totp_code(
         source=data.source,
         expired_at=data.expired_at,
     )
+    # wake the runs waiting for a code of this identifier, they read it from the database
+    await app.PUBSUB.publish(
+        get_totp_channel(curr_org.organization_id, data.totp_identifier),
+        {"totp_code_id": totp_code.totp_code_id},
+    )
+    return totp_code
 
 
 async def parse_totp_code(content: str) -> str | None:
@@ -0,0 +1,36 @@
+from datetime import datetime
+from enum import StrEnum
+from typing import Any
+
+from pydantic import BaseModel, ConfigDict
+
+
+class QueuedRunType(StrEnum):
+    task = "task"
+    workflow_run = "workflow_run"
+    task_v2 = "task_v2"
+
+
+class QueuedRunStatus(StrEnum):
+    queued = "queued"
+    running = "running"
+    completed = "completed"
+    failed = "failed"
+
+
+class QueuedRun(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    queued_run_id: str
+    organization_id: str
+    run_type: QueuedRunType
+    run_id: str
+    parameters: dict[str, Any]
+    status: QueuedRunStatus
+    attempts: int
+    worker_id: str | None = None
+    lease_expires_at: datetime | None = None
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    created_at: datetime
+    modified_at: datetime
@@ -0,0 +1,36 @@
+from datetime import datetime
+from enum import StrEnum
+
+from pydantic import BaseModel, ConfigDict
+
+
+class WebhookDeliveryStatus(StrEnum):
+    pending = "pending"
+    delivered = "delivered"
+    failed = "failed"
+
+
+class WebhookDelivery(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    webhook_delivery_id: str
+    organization_id: str
+    run_id: str
+    url: str
+    status: WebhookDeliveryStatus
+    attempts: int
+    next_attempt_at: datetime
+    last_status_code: int | None = None
+    last_error: str | None = None
+    delivered_at: datetime | None = None
+    created_at: datetime
+    modified_at: datetime
+
+
+class WebhookDeliveryRequest(WebhookDelivery):
+    """
+    A delivery with the signed request, as the dispatcher sends it
+    """
+
+    payload: str
+    headers: dict[str, str]
@@ -0,0 +1,255 @@
+import asyncio
+import contextvars
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+
+import httpx
+import structlog
+
+from skyvern.config import settings
+from skyvern.forge import app
+from skyvern.forge.sdk.core.security import generate_skyvern_webhook_headers
+from skyvern.forge.sdk.schemas.webhook_deliveries import WebhookDelivery, WebhookDeliveryRequest, WebhookDeliveryStatus
+
+LOG = structlog.get_logger()
+
+# the other 4xx responses won't change on a retry
+RETRYABLE_STATUS_CODES = {408, 425, 429}
+
+# how often the dispatcher deletes the deliveries older than the retention
+CLEANUP_INTERVAL_SECONDS = 3600
+
+
+class WebhookDispatcher:
+    """
+    Deliver the webhooks of the runs from the webhook_deliveries outbox:
+    - a webhook is signed once and stored, the run doesn't wait for the delivery
+    - the deliveries share one pooled http client, with a bounded number of requests per destination host
+    - a failed delivery (network error, timeout, 5xx, 408, 425, 429) is retried with an exponential backoff until
+      it's out of attempts
+    - the pending deliveries are claimed from the database, so they survive a restart and any dispatcher can
+      deliver them. the lease of a delivery starts once a request to its host can be sent
+    - the delivered and failed deliveries are deleted after WEBHOOK_DELIVERY_RETENTION_HOURS
+    """
+
+    def __init__(
+        self,
+        timeout_seconds: float = settings.WEBHOOK_TIMEOUT_SECONDS,
+        max_attempts: int = settings.WEBHOOK_MAX_ATTEMPTS,
+        retry_base_delay_seconds: float = settings.WEBHOOK_RETRY_BASE_DELAY_SECONDS,
+        retry_max_delay_seconds: float = settings.WEBHOOK_RETRY_MAX_DELAY_SECONDS,
+        max_concurrency_per_host: int = settings.WEBHOOK_MAX_CONCURRENCY_PER_HOST,
+        max_in_flight: int = settings.WEBHOOK_MAX_IN_FLIGHT,
+        poll_interval_seconds: float = settings.WEBHOOK_DISPATCH_POLL_INTERVAL_SECONDS,
+        lease_seconds: int = settings.WEBHOOK_DELIVERY_LEASE_SECONDS,
+        retention_hours: float = settings.WEBHOOK_DELIVERY_RETENTION_HOURS,
+    ) -> None:
+        self.timeout_seconds = timeout_seconds
+        self.max_attempts = max_attempts
+        self.retry_base_delay_seconds = retry_base_delay_seconds
+        self.retry_max_delay_seconds = retry_max_delay_seconds
+        self.max_concurrency_per_host = max_concurrency_per_host
+        self.max_in_flight = max_in_flight
+        self.poll_interval_seconds = poll_interval_seconds
+        self.lease_seconds = lease_seconds
+        self.retention_hours = retention_hours
+        self._next_cleanup_at = 0.0
+        self._client: httpx.AsyncClient | None = None
+        self._host_semaphores: dict[str, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(self.max_concurrency_per_host)
+        )
+        self._wake_up = asyncio.Event()
+        self._dispatch_task: asyncio.Task[None] | None = None
+        self._in_flight: set[asyncio.Task[None]] = set()
+
+    async def enqueue(
+        self,
+        organization_id: str,
+        run_id: str,
+        url: str,
+        payload: str,
+        api_key: str,
+    ) -> WebhookDelivery:
+        """
+        Sign the payload and store the delivery. It's sent by the dispatcher right away.
+        """
+        headers = generate_skyvern_webhook_headers(payload=payload, api_key=api_key)
+        webhook_delivery = await app.DATABASE.create_webhook_delivery(
+            organization_id=organization_id,
+            run_id=run_id,
+            url=url,
+            payload=payload,
+            headers=headers,
+        )
+        LOG.info(
+            "Queued webhook delivery",
+            webhook_delivery_id=webhook_delivery.webhook_delivery_id,
+            run_id=run_id,
+            webhook_callback_url=url,
+            payload=payload,
+        )
+        self.start()
+        self._wake_up.set()
+        return webhook_delivery
+
+    def start(self) -> None:
+        if self._dispatch_task is None or self._dispatch_task.done():
+            # the dispatcher outlives the run that started it, don't inherit its skyvern context
+            self._dispatch_task = asyncio.create_task(self._dispatch(), context=contextvars.Context())
+
+    async def close(self) -> None:
+        if self._dispatch_task:
+            self._dispatch_task.cancel()
+            self._dispatch_task = None
+        # the deliveries being sent are finished, the others are claimed again once their lease expires
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout_seconds),
+                limits=httpx.Limits(max_connections=self.max_in_flight),
+            )
+        return self._client
+
+    async def _dispatch(self) -> None:
+        while True:
+            self._wake_up.clear()
+            if time.monotonic() >= self._next_cleanup_at:
+                self._next_cleanup_at = time.monotonic() + CLEANUP_INTERVAL_SECONDS
+                try:
+                    await app.DATABASE.delete_finished_webhook_deliveries(
+                        finished_before=datetime.utcnow() - timedelta(hours=self.retention_hours)
+                    )
+                except Exception:
+                    LOG.exception("Failed to delete the finished webhook deliveries")
+            limit = self.max_in_flight - len(self._in_flight)
+            webhook_deliveries: list[WebhookDeliveryRequest] = []
+            if limit > 0:
+                try:
+                    webhook_deliveries = await app.DATABASE.claim_webhook_deliveries(
+                        limit=limit, lease_seconds=self.lease_seconds
+                    )
+                except Exception:
+                    LOG.exception("Failed to claim the webhook deliveries")
+            for webhook_delivery in webhook_deliveries:
+                delivery_task = asyncio.create_task(self._deliver(webhook_delivery))
+                self._in_flight.add(delivery_task)
+                delivery_task.add_done_callback(self._in_flight.discard)
+            # claim again right away when more deliveries may be due
+            if webhook_deliveries and len(webhook_deliveries) == limit:
+                continue
+            try:
+                await asyncio.wait_for(self._wake_up.wait(), timeout=self.poll_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _deliver(self, webhook_delivery: WebhookDeliveryRequest) -> None:
+        status_code: int | None = None
+        error: str | None = None
+        # the payload is signed once, the timestamp is not part of the signature and tells when it was sent
+        headers = {**webhook_delivery.headers, "x-skyvern-timestamp": str(int(datetime.utcnow().timestamp()))}
+        async with self._host_semaphores[urlparse(webhook_delivery.url).netloc]:
+            # the wait for the host doesn't count against the lease
+            if not await self._renew_lease(webhook_delivery):
+                return
+            try:
+                resp = await self._get_client().post(
+                    webhook_delivery.url, content=webhook_delivery.payload, headers=headers
+                )
+                status_code = resp.status_code
+                if not resp.is_success:
+                    error = resp.text[:1000]
+            except httpx.HTTPError as e:
+                error = str(e) or type(e).__name__
+
+        if status_code is not None and 200 <= status_code < 300:
+            LOG.info(
+                "Webhook delivered",
+                webhook_delivery_id=webhook_delivery.webhook_delivery_id,
+                run_id=webhook_delivery.run_id,
+                attempts=webhook_delivery.attempts,
+                resp_code=status_code,
+            )
+            await self._update(webhook_delivery, WebhookDeliveryStatus.delivered, status_code=status_code)
+            return
+
+        retryable = status_code is None or status_code >= 500 or status_code in RETRYABLE_STATUS_CODES
+        if retryable and webhook_delivery.attempts < self.max_attempts:
+            delay_seconds = min(
+                self.retry_base_delay_seconds * 2 ** (webhook_delivery.attempts - 1), self.retry_max_delay_seconds
+            )
+            LOG.warning(
+                "Webhook delivery failed, retrying",
+                webhook_delivery_id=webhook_delivery.webhook_delivery_id,
+                run_id=webhook_delivery.run_id,
+                attempts=webhook_delivery.attempts,
+                resp_code=status_code,
+                error=error,
+                retry_in_seconds=delay_seconds,
+            )
+            await self._update(
+                webhook_delivery,
+                WebhookDeliveryStatus.pending,
+                status_code=status_code,
+                error=error,
+                next_attempt_at=datetime.utcnow() + timedelta(seconds=delay_seconds),
+            )
+            return
+
+        LOG.warning(
+            "Webhook delivery failed",
+            webhook_delivery_id=webhook_delivery.webhook_delivery_id,
+            run_id=webhook_delivery.run_id,
+            attempts=webhook_delivery.attempts,
+            resp_code=status_code,
+            error=error,
+        )
+        await self._update(webhook_delivery, WebhookDeliveryStatus.failed, status_code=status_code, error=error)
+
+    async def _renew_lease(self, webhook_delivery: WebhookDeliveryRequest) -> bool:
+        try:
+            renewed = await app.DATABASE.renew_webhook_delivery_lease(
+                webhook_delivery.webhook_delivery_id, webhook_delivery.attempts, self.lease_seconds
+            )
+        except Exception:
+            # the claim is still leased, send it
+            LOG.exception(
+                "Failed to renew the webhook delivery lease", webhook_delivery_id=webhook_delivery.webhook_delivery_id
+            )
+            return True
+        if not renewed:
+            LOG.warning(
+                "Webhook delivery was claimed again while waiting for its host, skipping it",
+                webhook_delivery_id=webhook_delivery.webhook_delivery_id,
+                run_id=webhook_delivery.run_id,
+            )
+        return renewed
+
+    async def _update(
+        self,
+        webhook_delivery: WebhookDelivery,
+        status: WebhookDeliveryStatus,
+        status_code: int | None = None,
+        error: str | None = None,
+        next_attempt_at: datetime | None = None,
+    ) -> None:
+        try:
+            await app.DATABASE.update_webhook_delivery(
+                webhook_delivery.webhook_delivery_id,
+                status=status,
+                next_attempt_at=next_attempt_at,
+                last_status_code=status_code,
+                last_error=error,
+            )
+        except Exception:
+            # the delivery is claimed again once its lease expires
+            LOG.exception(
+                "Failed to update the webhook delivery", webhook_delivery_id=webhook_delivery.webhook_delivery_id
+            )
@@ -3,7 +3,6 @@ import json
 from datetime import UTC, datetime
 from typing import Any
 
-import httpx
 import structlog
 
 from skyvern import analytics
@@ -19,7 +18,6 @@ from skyvern.exceptions import (
 from skyvern.forge import app
 from skyvern.forge.sdk.artifact.models import ArtifactType
 from skyvern.forge.sdk.core import skyvern_context
-from skyvern.forge.sdk.core.security import generate_skyvern_webhook_headers
 from skyvern.forge.sdk.core.skyvern_context import SkyvernContext
 from skyvern.forge.sdk.db.enums import TaskType
 from skyvern.forge.sdk.models import Step, StepStatus
@@ -1015,7 +1013,9 @@ class WorkflowService:
             if len(screenshot_artifacts) >= 3:
                 break
         if screenshot_artifacts:
-            screenshot_urls = await app.ARTIFACT_MANAGER.get_share_links(screenshot_artifacts)
+            screenshot_share_links = await app.ARTIFACT_MANAGER.get_share_links(screenshot_artifacts)
+            if screenshot_share_links:
+                screenshot_urls = [share_link for share_link in screenshot_share_links if share_link]
 
         recording_url = None
         recording_artifact = await app.DATABASE.get_artifact_for_workflow_run(
@@ -1195,43 +1195,16 @@ class WorkflowService:
             )
             return
 
-        # send webhook to the webhook callback url
+        # the webhook is delivered by the webhook dispatcher, with retries
         payload = workflow_run_status_response.model_dump_json()
-        headers = generate_skyvern_webhook_headers(
-            payload=payload,
-            api_key=api_key,
-        )
-        LOG.info(
-            "Sending webhook run status to webhook callback url",
-            workflow_id=workflow_id,
-            workflow_run_id=workflow_run.workflow_run_id,
-            webhook_callback_url=workflow_run.webhook_callback_url,
-            payload=payload,
-            headers=headers,
-        )
         try:
-            async with httpx.AsyncClient() as client:
-                resp = await client.post(
-                    url=workflow_run.webhook_callback_url, data=payload, headers=headers, timeout=httpx.Timeout(30.0)
-                )
-            if resp.status_code == 200:
-                LOG.info(
-                    "Webhook sent successfully",
-                    workflow_id=workflow_id,
-                    workflow_run_id=workflow_run.workflow_run_id,
-                    resp_code=resp.status_code,
-                    resp_text=resp.text,
-                )
-            else:
-                LOG.info(
-                    "Webhook failed",
-                    workflow_id=workflow_id,
-                    workflow_run_id=workflow_run.workflow_run_id,
-                    webhook_data=payload,
-                    resp=resp,
-                    resp_code=resp.status_code,
-                    resp_text=resp.text,
-                )
+            await app.WEBHOOK_DISPATCHER.enqueue(
+                organization_id=workflow_run.organization_id,
+                run_id=workflow_run.workflow_run_id,
+                url=workflow_run.webhook_callback_url,
+                payload=payload,
+                api_key=api_key,
+            )
         except Exception as e:
             raise FailedToSendWebhook(
                 workflow_id=workflow_id,
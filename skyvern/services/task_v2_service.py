@@ -4,7 +4,6 @@ import string
 from datetime import UTC, datetime
 from typing import Any
 
-import httpx
 import structlog
 from playwright.async_api import Page
 from sqlalchemy.exc import OperationalError
@@ -22,7 +21,6 @@ from skyvern.forge.prompts import prompt_engine
 from skyvern.forge.sdk.artifact.models import ArtifactType
 from skyvern.forge.sdk.core import skyvern_context
 from skyvern.forge.sdk.core.hashing import generate_url_hash
-from skyvern.forge.sdk.core.security import generate_skyvern_webhook_headers
 from skyvern.forge.sdk.core.skyvern_context import SkyvernContext
 from skyvern.forge.sdk.db.enums import OrganizationAuthTokenType
 from skyvern.forge.sdk.schemas.organizations import Organization
@@ -582,7 +580,7 @@ async def run_task_v2_helper(
                 continue
             current_url = current_url if current_url else str(await SkyvernFrame.get_url(frame=page) if page else url)
 
-            task_v2_prompt = load_prompt_with_elements(
+            task_v2_prompt = await load_prompt_with_elements(
                 scraped_page,
                 prompt_engine,
                 "task_v2",
@@ -1213,7 +1211,7 @@ async def _generate_extraction_task(
     LOG.info("Generating extraction task", data_extraction_goal=data_extraction_goal, current_url=current_url)
     # extract the data
     context = skyvern_context.ensure_context()
-    generate_extraction_task_prompt = load_prompt_with_elements(
+    generate_extraction_task_prompt = await load_prompt_with_elements(
         scraped_page=scraped_page,
         prompt_engine=prompt_engine,
         template_name="task_v2_generate_extraction_task",
@@ -1593,34 +1591,15 @@ async def send_task_v2_webhook(task_v2: TaskV2) -> None:
             task_v2_id=task_v2.observer_cruise_id,
         )
         return
-    # build the task v2 response
+    # build the task v2 response, it's delivered by the webhook dispatcher with retries
     payload = task_v2.model_dump_json(by_alias=True)
-    headers = generate_skyvern_webhook_headers(payload=payload, api_key=api_key.token)
-    LOG.info(
-        "Sending task v2 response to webhook callback url",
-        task_v2_id=task_v2.observer_cruise_id,
-        webhook_callback_url=task_v2.webhook_callback_url,
-        payload=payload,
-        headers=headers,
-    )
     try:
-        resp = await httpx.AsyncClient().post(
-            task_v2.webhook_callback_url, data=payload, headers=headers, timeout=httpx.Timeout(30.0)
+        await app.WEBHOOK_DISPATCHER.enqueue(
+            organization_id=organization_id,
+            run_id=task_v2.observer_cruise_id,
+            url=task_v2.webhook_callback_url,
+            payload=payload,
+            api_key=api_key.token,
         )
-        if resp.status_code == 200:
-            LOG.info(
-                "Task v2 webhook sent successfully",
-                task_v2_id=task_v2.observer_cruise_id,
-                resp_code=resp.status_code,
-                resp_text=resp.text,
-            )
-        else:
-            LOG.info(
-                "Task v2 webhook failed",
-                task_v2_id=task_v2.observer_cruise_id,
-                resp=resp,
-                resp_code=resp.status_code,
-                resp_text=resp.text,
-            )
     except Exception as e:
         raise FailedToSendWebhook(task_v2_id=task_v2.observer_cruise_id) from e
@@ -0,0 +1,147 @@
+from dataclasses import dataclass
+
+import structlog
+
+from skyvern.utils.token_counter import count_tokens_batch
+from skyvern.webeye.scraper.scraper import ScrapedPage, json_to_html
+
+LOG = structlog.get_logger()
+
+PRIORITY_RECENTLY_ACTED = 4
+PRIORITY_INTERACTABLE = 2
+PRIORITY_IN_VIEWPORT = 1
+
+
+@dataclass
+class _PackingNode:
+    element: dict
+    parent: int | None
+    token_count: int
+    priority: int
+
+
+def build_element_own_html(element: dict, html_need_skyvern_attrs: bool = True) -> str:
+    """
+    The html of the element itself, excluding its children.
+    """
+    return json_to_html({**element, "children": []}, need_skyvern_attrs=html_need_skyvern_attrs)
+
+
+class ElementTreePacker:
+    """
+    Fit the element tree into a token budget in one pass.
+    The token count of every element is counted (and cached) on its own, in one batch off the event loop. Then the
+    elements are greedily picked by priority: recently acted-on elements first, then interactable elements, then the
+    elements in the viewport, and the document order for the rest. An element is only picked together with all its
+    ancestors.
+    """
+
+    def __init__(
+        self,
+        scraped_page: ScrapedPage,
+        html_need_skyvern_attrs: bool = True,
+        priority_element_ids: set[str] | None = None,
+    ) -> None:
+        self.scraped_page = scraped_page
+        self.html_need_skyvern_attrs = html_need_skyvern_attrs
+        self.priority_element_ids = priority_element_ids or set()
+
+    def _is_in_viewport(self, element_id: str) -> bool:
+        window_dimension = self.scraped_page.window_dimension
+        raw_element = self.scraped_page.id_to_element_dict.get(element_id)
+        if not window_dimension or not raw_element or not raw_element.get("rect"):
+            return False
+        rect = raw_element["rect"]
+        return rect.get("top", 0) < window_dimension["height"] and rect.get("bottom", 0) > 0
+
+    def _get_priority(self, element: dict) -> int:
+        element_id = element.get("id")
+        if not element_id:
+            return 0
+        priority = 0
+        if element_id in self.priority_element_ids:
+            priority += PRIORITY_RECENTLY_ACTED
+        if element.get("interactable", False):
+            priority += PRIORITY_INTERACTABLE
+        if self._is_in_viewport(element_id):
+            priority += PRIORITY_IN_VIEWPORT
+        return priority
+
+    async def _flatten(self, element_tree: list[dict]) -> list[_PackingNode]:
+        nodes: list[_PackingNode] = []
+        element_htmls: list[str] = []
+        stack: list[tuple[dict, int | None]] = [(element, None) for element in reversed(element_tree)]
+        while stack:
+            element, parent = stack.pop()
+            nodes.append(
+                _PackingNode(element=element, parent=parent, token_count=0, priority=self._get_priority(element))
+            )
+            element_htmls.append(build_element_own_html(element, self.html_need_skyvern_attrs))
+            index = len(nodes) - 1
+            stack.extend((child, index) for child in reversed(element.get("children", [])))
+        for node, token_count in zip(nodes, await count_tokens_batch(element_htmls)):
+            node.token_count = token_count
+        return nodes
+
+    async def pack(self, element_tree: list[dict], token_budget: int) -> tuple[list[dict], int]:
+        """
+        :return: the packed element tree and its token count.
+        """
+        nodes = await self._flatten(element_tree)
+        total_token_count = sum(node.token_count for node in nodes)
+        if total_token_count <= token_budget:
+            return element_tree, total_token_count
+
+        selected: set[int] = set()
+        used_token_count = 0
+        # nodes are in document order, so the sort is stable for the same priority
+        for index in sorted(range(len(nodes)), key=lambda i: -nodes[i].priority):
+            if index in selected:
+                continue
+            # the element has to be rendered with all its ancestors
+            path: list[int] = []
+            current: int | None = index
+            while current is not None and current not in selected:
+                path.append(current)
+                current = nodes[current].parent
+            cost = sum(nodes[i].token_count for i in path)
+            if used_token_count + cost > token_budget:
+                continue
+            selected.update(path)
+            used_token_count += cost
+
+        LOG.info(
+            "Packed the element tree into the token budget",
+            token_budget=token_budget,
+            total_token_count=total_token_count,
+            packed_token_count=used_token_count,
+            total_elements=len(nodes),
+            packed_elements=len(selected),
+        )
+        return self._build_packed_tree(nodes, selected), used_token_count
+
+    @staticmethod
+    def _build_packed_tree(nodes: list[_PackingNode], selected: set[int]) -> list[dict]:
+        packed_children: dict[int | None, list[dict]] = {}
+        # children always come after their parent, so build the tree bottom-up by walking backwards
+        for index in range(len(nodes) - 1, -1, -1):
+            if index not in selected:
+                continue
+            node = nodes[index]
+            children = list(reversed(packed_children.pop(index, [])))
+            element = node.element
+            original_children = element.get("children", [])
+            # share the element with the original tree if none of its descendants is dropped
+            if len(children) != len(original_children) or any(
+                child is not original_child for child, original_child in zip(children, original_children)
+            ):
+                element = {**element, "children": children}
+            packed_children.setdefault(node.parent, []).append(element)
+        return list(reversed(packed_children.get(None, [])))
+
+    async def build_element_tree_html(self, element_tree: list[dict], token_budget: int) -> str:
+        packed_tree, _ = await self.pack(element_tree, token_budget)
+        self.scraped_page.last_used_element_tree = packed_tree
+        return "".join(
+            json_to_html(element, need_skyvern_attrs=self.html_need_skyvern_attrs) for element in packed_tree
+        )
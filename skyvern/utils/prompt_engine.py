@@ -5,8 +5,9 @@ from pydantic import BaseModel
 
 from skyvern.constants import DEFAULT_MAX_TOKENS
 from skyvern.forge.sdk.prompting import PromptEngine
-from skyvern.utils.token_counter import count_tokens
-from skyvern.webeye.scraper.scraper import ScrapedPage
+from skyvern.utils.element_tree_packer import ElementTreePacker
+from skyvern.utils.token_counter import count_tokens_async
+from skyvern.webeye.scraper.scraper import ScrapedPage, build_economy_element_tree
 
 LOG = structlog.get_logger()
 
@@ -20,48 +21,39 @@ class CheckPhoneNumberFormatResponse(BaseModel):
     recommended_phone_number: str | None
 
 
-def load_prompt_with_elements(
+async def load_prompt_with_elements(
     scraped_page: ScrapedPage,
     prompt_engine: PromptEngine,
     template_name: str,
     html_need_skyvern_attrs: bool = True,
+    priority_element_ids: set[str] | None = None,
     **kwargs: Any,
 ) -> str:
-    prompt = prompt_engine.load_prompt(
-        template_name,
-        elements=scraped_page.build_element_tree(html_need_skyvern_attrs=html_need_skyvern_attrs),
-        **kwargs,
-    )
-    token_count = count_tokens(prompt)
-    if token_count > DEFAULT_MAX_TOKENS:
-        # get rid of all the secondary elements like SVG, etc
-        economy_elements_tree = scraped_page.build_economy_elements_tree(
-            html_need_skyvern_attrs=html_need_skyvern_attrs
+    # the elements are counted on their own, so only the rest of the prompt needs to be tokenized here
+    template_token_count = await count_tokens_async(prompt_engine.load_prompt(template_name, elements="", **kwargs))
+    token_budget = DEFAULT_MAX_TOKENS - template_token_count
+
+    elements = scraped_page.build_element_tree(html_need_skyvern_attrs=html_need_skyvern_attrs)
+    if not html_need_skyvern_attrs and scraped_page.element_tree_trimmed_token_count is not None:
+        element_token_count = scraped_page.element_tree_trimmed_token_count
+    else:
+        element_token_count = await count_tokens_async(elements)
+
+    if element_token_count > token_budget:
+        # get rid of all the secondary elements like SVG, etc, and pack the rest by priority
+        if not scraped_page.economy_element_tree:
+            scraped_page.economy_element_tree = build_economy_element_tree(scraped_page.element_tree_trimmed)
+        packer = ElementTreePacker(
+            scraped_page=scraped_page,
+            html_need_skyvern_attrs=html_need_skyvern_attrs,
+            priority_element_ids=priority_element_ids,
         )
-        prompt = prompt_engine.load_prompt(template_name, elements=economy_elements_tree, **kwargs)
-        economy_token_count = count_tokens(prompt)
+        elements = await packer.build_element_tree_html(scraped_page.economy_element_tree, token_budget)
         LOG.warning(
-            "Prompt is longer than the max tokens. Going to use the economy elements tree.",
+            "Prompt is longer than the max tokens. Going to use the packed economy elements tree.",
             template_name=template_name,
-            token_count=token_count,
-            economy_token_count=economy_token_count,
+            token_count=template_token_count + element_token_count,
             max_tokens=DEFAULT_MAX_TOKENS,
         )
-        if economy_token_count > DEFAULT_MAX_TOKENS:
-            # !!! HACK alert
-            # dump the last 1/3 of the html context and keep the first 2/3 of the html context
-            economy_elements_tree_dumped = scraped_page.build_economy_elements_tree(
-                html_need_skyvern_attrs=html_need_skyvern_attrs,
-                percent_to_keep=2 / 3,
-            )
-            prompt = prompt_engine.load_prompt(template_name, elements=economy_elements_tree_dumped, **kwargs)
-            token_count_after_dump = count_tokens(prompt)
-            LOG.warning(
-                "Prompt is still longer than the max tokens. Will only keep the first 2/3 of the html context.",
-                template_name=template_name,
-                token_count=token_count,
-                economy_token_count=economy_token_count,
-                token_count_after_dump=token_count_after_dump,
-                max_tokens=DEFAULT_MAX_TOKENS,
-            )
-    return prompt
+
+    return prompt_engine.load_prompt(template_name, elements=elements, **kwargs)
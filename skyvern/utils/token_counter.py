@@ -1,5 +1,119 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import structlog
 import tiktoken
+from cachetools import LRUCache
+
+from skyvern.config import settings
+from skyvern.forge.sdk.api.crypto import calculate_sha256
+
+LOG = structlog.get_logger()
+
+DEFAULT_TOKENIZER_MODEL = "gpt-4o"
+
+# token counts keyed by (encoding name, sha256 of the text)
+_TOKEN_COUNT_CACHE: LRUCache[tuple[str, str], int] = LRUCache(maxsize=settings.TOKEN_COUNT_CACHE_SIZE)
+_TOKENIZER_EXECUTOR = ThreadPoolExecutor(
+    max_workers=settings.TOKEN_COUNT_MAX_WORKERS, thread_name_prefix="token-counter"
+)
+
+
+@lru_cache
+def get_encoding(model_name: str = DEFAULT_TOKENIZER_MODEL) -> tiktoken.Encoding:
+    """
+    Load the tiktoken encoding once per model. The models tiktoken doesn't know (eg: non-OpenAI models) fall back to
+    the encoding of the default model, which is close enough to estimate the prompt size.
+    """
+    # litellm model names can have a provider prefix, eg: azure/gpt-4o
+    base_model_name = model_name.split("/")[-1]
+    try:
+        return tiktoken.encoding_for_model(base_model_name)
+    except KeyError:
+        LOG.debug("No tiktoken encoding for the model, using the default one", model_name=model_name)
+        return tiktoken.encoding_for_model(DEFAULT_TOKENIZER_MODEL)
+
+
+@lru_cache
+def get_encoding_for_llm_key(llm_key: str) -> tiktoken.Encoding:
+    # imported here to keep the token counter importable without loading the llm providers
+    from skyvern.forge.sdk.api.llm.config_registry import LLMConfigRegistry
+
+    try:
+        model_name = LLMConfigRegistry.get_config(llm_key).model_name
+    except Exception:
+        LOG.warning("Failed to get the model name of the llm key, using the default encoding", llm_key=llm_key)
+        model_name = DEFAULT_TOKENIZER_MODEL
+    return get_encoding(model_name)
+
+
+def _resolve_encoding(llm_key: str | None) -> tiktoken.Encoding:
+    llm_key = llm_key or settings.LLM_KEY
+    if not llm_key:
+        return get_encoding()
+    return get_encoding_for_llm_key(llm_key)
+
+
+def _count_encoded_tokens(encoding: tiktoken.Encoding, text: str) -> int:
+    return len(encoding.encode(text))
+
+
+def _count_encoded_tokens_many(encoding: tiktoken.Encoding, texts: list[str]) -> list[int]:
+    return [_count_encoded_tokens(encoding, text) for text in texts]
+
+
+def count_tokens(text: str, llm_key: str | None = None) -> int:
+    """
+    Count the tokens of the text with the encoding of the llm key, settings.LLM_KEY by default.
+    """
+    encoding = _resolve_encoding(llm_key)
+    cache_key = (encoding.name, calculate_sha256(text))
+    token_count = _TOKEN_COUNT_CACHE.get(cache_key)
+    if token_count is None:
+        token_count = _count_encoded_tokens(encoding, text)
+        _TOKEN_COUNT_CACHE[cache_key] = token_count
+    return token_count
+
+
+async def count_tokens_batch(texts: list[str], llm_key: str | None = None) -> list[int]:
+    """
+    Count the tokens of many texts, eg: every element of a page. The texts that are not cached yet are split into
+    one chunk per worker and tokenized in the thread pool, so a large page doesn't block the event loop.
+    """
+    encoding = _resolve_encoding(llm_key)
+    cache_keys = [(encoding.name, calculate_sha256(text)) for text in texts]
+    token_counts: dict[tuple[str, str], int] = {}
+    missing_texts: dict[tuple[str, str], str] = {}
+    for cache_key, text in zip(cache_keys, texts):
+        token_count = _TOKEN_COUNT_CACHE.get(cache_key)
+        if token_count is not None:
+            token_counts[cache_key] = token_count
+        else:
+            missing_texts[cache_key] = text
+
+    if missing_texts:
+        missing_keys = list(missing_texts)
+        chunk_size = -(-len(missing_keys) // settings.TOKEN_COUNT_MAX_WORKERS)
+        key_chunks = [missing_keys[i : i + chunk_size] for i in range(0, len(missing_keys), chunk_size)]
+        loop = asyncio.get_running_loop()
+        counted_chunks = await asyncio.gather(
+            *[
+                loop.run_in_executor(
+                    _TOKENIZER_EXECUTOR,
+                    _count_encoded_tokens_many,
+                    encoding,
+                    [missing_texts[cache_key] for cache_key in key_chunk],
+                )
+                for key_chunk in key_chunks
+            ]
+        )
+        for key_chunk, counted_chunk in zip(key_chunks, counted_chunks):
+            for cache_key, token_count in zip(key_chunk, counted_chunk):
+                _TOKEN_COUNT_CACHE[cache_key] = token_count
+                token_counts[cache_key] = token_count
+    return [token_counts[cache_key] for cache_key in cache_keys]
 
 
-def count_tokens(text: str) -> int:
-    return len(tiktoken.encoding_for_model("gpt-4o").encode(text))
+async def count_tokens_async(text: str, llm_key: str | None = None) -> int:
+    return (await count_tokens_batch([text], llm_key))[0]
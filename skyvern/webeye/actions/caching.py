@@ -1,8 +1,14 @@
+import re
+from urllib.parse import urlsplit, urlunsplit
+
 import structlog
+from cachetools import TTLCache
 
+from skyvern.config import settings
 from skyvern.exceptions import CachedActionPlanError
 from skyvern.forge import app
 from skyvern.forge.prompts import prompt_engine
+from skyvern.forge.sdk.api.crypto import calculate_sha256
 from skyvern.forge.sdk.models import Step
 from skyvern.forge.sdk.schemas.tasks import Task
 from skyvern.webeye.actions.actions import Action, ActionStatus, ActionType
@@ -10,6 +16,55 @@ from skyvern.webeye.scraper.scraper import ScrapedPage
 
 LOG = structlog.get_logger()
 
+# the actions of the cached plans by plan key, the actions are copied before they're executed.
+# the entries expire, so a plan cached by another process is picked up
+_ACTION_PLANS: TTLCache[str, list[Action]] = TTLCache(
+    maxsize=settings.ACTION_PLAN_CACHE_SIZE, ttl=settings.ACTION_PLAN_CACHE_TTL_SECONDS
+)
+
+
+def _normalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), parts.query, parts.fragment))
+
+
+def build_action_plan_key(url: str, navigation_goal: str) -> str:
+    normalized_goal = re.sub(r"\s+", " ", navigation_goal).strip()
+    return calculate_sha256(f"{_normalize_url(url)}\n{normalized_goal}")
+
+
+async def cache_action_plan(task: Task) -> None:
+    """
+    Make the actions of the completed task the action plan of its url and navigation goal.
+    """
+    if not task.url or not task.navigation_goal:
+        return
+    plan_key = build_action_plan_key(task.url, task.navigation_goal)
+    try:
+        await app.DATABASE.upsert_action_plan_cache(
+            plan_key=plan_key,
+            task_id=task.task_id,
+            url=task.url,
+            navigation_goal=task.navigation_goal,
+        )
+    except Exception:
+        LOG.warning("Failed to cache the action plan", task_id=task.task_id, exc_info=True)
+        return
+    _ACTION_PLANS.pop(plan_key, None)
+
+
+async def _get_cached_actions(task: Task) -> list[Action]:
+    if not task.url or not task.navigation_goal:
+        return []
+    plan_key = build_action_plan_key(task.url, task.navigation_goal)
+    cached_actions = _ACTION_PLANS.get(plan_key)
+    if cached_actions is None:
+        cached_actions = await app.DATABASE.retrieve_action_plan(plan_key=plan_key)
+        # no plan yet, one can be cached by a task completing later
+        if cached_actions:
+            _ACTION_PLANS[plan_key] = cached_actions
+    return cached_actions
+
 
 async def retrieve_action_plan(task: Task, step: Step, scraped_page: ScrapedPage) -> list[Action]:
     try:
@@ -23,14 +78,17 @@ async def _retrieve_action_plan(task: Task, step: Step, scraped_page: ScrapedPag
     # V0: use the previous action plan if there is a completed task with the same url and navigation goal
     # get completed task with the same url and navigation goal
     # TODO(kerem): don't use step_order, get all the previous actions instead
-    cached_actions = await app.DATABASE.retrieve_action_plan(task=task)
+    cached_actions = await _get_cached_actions(task)
     if not cached_actions:
         LOG.info("No cached actions found for the task, fallback to no-cache mode")
         return []
 
     # Get the existing actions for this task from the database. Then find the actions that are already executed by looking at
     # the source_action_id field for this task's actions.
-    previous_actions = await app.DATABASE.get_previous_actions_for_task(task_id=task.task_id)
+    # The first attempt of the first step has no previous actions.
+    previous_actions: list[Action] = []
+    if step.order > 0 or step.retry_index > 0:
+        previous_actions = await app.DATABASE.get_previous_actions_for_task(task_id=task.task_id)
 
     executed_cached_actions = []
     remaining_cached_actions = []
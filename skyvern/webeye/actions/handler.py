@@ -67,6 +67,8 @@ from skyvern.forge.sdk.core.security import generate_skyvern_signature
 from skyvern.forge.sdk.core.skyvern_context import ensure_context
 from skyvern.forge.sdk.db.enums import OrganizationAuthTokenType
 from skyvern.forge.sdk.models import Step
+from skyvern.forge.sdk.pubsub.base import Subscription
+from skyvern.forge.sdk.pubsub.channels import get_totp_channel
 from skyvern.forge.sdk.schemas.tasks import Task
 from skyvern.forge.sdk.services.bitwarden import BitwardenConstants
 from skyvern.utils.prompt_engine import CheckPhoneNumberFormatResponse, load_prompt_with_elements
@@ -2467,7 +2469,7 @@ async def select_from_emerging_elements(
     if len(new_interactable_element_ids) == 0:
         raise NoIncrementalElementFoundForCustomSelection(element_id=action.element_id)
 
-    prompt = load_prompt_with_elements(
+    prompt = await load_prompt_with_elements(
         scraped_page=scraped_page_after_open,
         prompt_engine=prompt_engine,
         template_name="custom-select",
@@ -3037,7 +3039,7 @@ async def normal_select(
     is_success = False
     locator = skyvern_element.get_locator()
 
-    prompt = load_prompt_with_elements(
+    prompt = await load_prompt_with_elements(
         scraped_page=dom.scraped_page,
         prompt_engine=prompt_engine,
         template_name="parse-input-or-select-context",
@@ -3209,7 +3211,7 @@ async def extract_information_for_navigation_goal(
     """
     scraped_page_refreshed = await scraped_page.refresh()
     context = ensure_context()
-    extract_information_prompt = load_prompt_with_elements(
+    extract_information_prompt = await load_prompt_with_elements(
         scraped_page=scraped_page_refreshed,
         prompt_engine=prompt_engine,
         template_name="extract-information",
@@ -3282,6 +3284,16 @@ async def get_input_value(tag_name: str, locator: Locator) -> str | None:
     return await locator.inner_text()
 
 
+async def get_verification_code_window_start(task: Task, step: Step) -> datetime:
+    """
+    The codes stored from the start of the previous step can answer the current prompt, the actions of the previous
+    step (eg: submitting the login form) may have sent the code before the page asked for it.
+    """
+    steps = await app.DATABASE.get_task_steps(task.task_id, organization_id=task.organization_id)
+    previous_steps = [previous_step for previous_step in steps if previous_step.order < step.order]
+    return previous_steps[-1].created_at if previous_steps else step.created_at
+
+
 async def poll_verification_code(
     task_id: str,
     organization_id: str,
@@ -3290,7 +3302,12 @@ async def poll_verification_code(
     workflow_permanent_id: str | None = None,
     totp_verification_url: str | None = None,
     totp_identifier: str | None = None,
+    created_after: datetime | None = None,
 ) -> str | None:
+    """
+    :param created_after: the codes stored before are ignored, they were sent for an earlier prompt.
+        See get_verification_code_window_start.
+    """
     timeout = timedelta(minutes=settings.VERIFICATION_CODE_POLLING_TIMEOUT_MINS)
     start_datetime = datetime.utcnow()
     timeout_datetime = start_datetime + timeout
@@ -3298,39 +3315,58 @@ async def poll_verification_code(
     if not org_token:
         LOG.error("Failed to get organization token when trying to get verification code")
         return None
-    # wait for 40 seconds to let the verification code comes in before polling
-    await asyncio.sleep(settings.VERIFICATION_CODE_INITIAL_WAIT_TIME_SECS)
-    while True:
-        # check timeout
-        if datetime.utcnow() > timeout_datetime:
-            LOG.warning("Polling verification code timed out", workflow_id=workflow_id)
-            raise NoTOTPVerificationCodeFound(
-                task_id=task_id,
-                workflow_run_id=workflow_run_id,
-                totp_verification_url=totp_verification_url,
-                totp_identifier=totp_identifier,
-            )
-        verification_code = None
-        if totp_verification_url:
-            verification_code = await _get_verification_code_from_url(
-                task_id,
-                totp_verification_url,
-                org_token.token,
-                workflow_run_id=workflow_run_id,
-            )
-        elif totp_identifier:
-            verification_code = await _get_verification_code_from_db(
-                task_id,
-                organization_id,
-                totp_identifier,
-                workflow_id=workflow_id,
-                workflow_run_id=workflow_run_id,
-            )
-        if verification_code:
-            LOG.info("Got verification code", verification_code=verification_code)
-            return verification_code
-
-        await asyncio.sleep(10)
+    subscription: Subscription | None = None
+    if not totp_verification_url and totp_identifier:
+        # subscribe before the first lookup, so a code stored in between still wakes the waiter
+        subscription = await app.PUBSUB.subscribe([get_totp_channel(organization_id, totp_identifier)])
+    poll_interval = settings.VERIFICATION_CODE_URL_POLLING_INITIAL_INTERVAL_SECS
+    if totp_verification_url:
+        # the response of the url can't be filtered by age, give the new code a moment to replace the previous one
+        await asyncio.sleep(settings.VERIFICATION_CODE_URL_INITIAL_WAIT_TIME_SECS)
+    try:
+        while True:
+            verification_code = None
+            if totp_verification_url:
+                verification_code = await _get_verification_code_from_url(
+                    task_id,
+                    totp_verification_url,
+                    org_token.token,
+                    workflow_run_id=workflow_run_id,
+                )
+            elif totp_identifier:
+                verification_code = await _get_verification_code_from_db(
+                    task_id,
+                    organization_id,
+                    totp_identifier,
+                    workflow_id=workflow_id,
+                    workflow_run_id=workflow_run_id,
+                    created_after=created_after,
+                )
+            if verification_code:
+                LOG.info(
+                    "Got verification code",
+                    verification_code=verification_code,
+                    wait_seconds=(datetime.utcnow() - start_datetime).total_seconds(),
+                )
+                return verification_code
+
+            remaining_seconds = (timeout_datetime - datetime.utcnow()).total_seconds()
+            if remaining_seconds <= 0:
+                LOG.warning("Polling verification code timed out", workflow_id=workflow_id)
+                raise NoTOTPVerificationCodeFound(
+                    task_id=task_id,
+                    workflow_run_id=workflow_run_id,
+                    totp_verification_url=totp_verification_url,
+                    totp_identifier=totp_identifier,
+                )
+            if subscription:
+                await subscription.get(timeout=min(settings.VERIFICATION_CODE_POLLING_INTERVAL_SECS, remaining_seconds))
+            else:
+                await asyncio.sleep(min(poll_interval, remaining_seconds))
+                poll_interval = min(poll_interval * 2, settings.VERIFICATION_CODE_POLLING_INTERVAL_SECS)
+    finally:
+        if subscription:
+            await app.PUBSUB.unsubscribe(subscription)
 
 
 async def _get_verification_code_from_url(
@@ -3366,9 +3402,13 @@ async def _get_verification_code_from_db(
     totp_identifier: str,
     workflow_id: str | None = None,
     workflow_run_id: str | None = None,
+    created_after: datetime | None = None,
 ) -> str | None:
     totp_codes = await app.DATABASE.get_totp_codes(organization_id=organization_id, totp_identifier=totp_identifier)
     for totp_code in totp_codes:
+        # a code sent before the window was meant for an earlier prompt, eg: the previous login
+        if created_after and totp_code.created_at < created_after:
+            continue
         if totp_code.workflow_run_id and workflow_run_id and totp_code.workflow_run_id != workflow_run_id:
             continue
         if totp_code.workflow_id and workflow_id and totp_code.workflow_id != workflow_id:
@@ -3384,7 +3424,7 @@ async def _get_verification_code_from_db(
 async def _get_input_or_select_context(
     action: InputTextAction | SelectOptionAction, scraped_page: ScrapedPage, step: Step
 ) -> InputOrSelectContext:
-    prompt = load_prompt_with_elements(
+    prompt = await load_prompt_with_elements(
         scraped_page=scraped_page,
         prompt_engine=prompt_engine,
         template_name="parse-input-or-select-context",
@@ -33,7 +33,7 @@ from skyvern.webeye.actions.actions import (
     VerificationCodeAction,
     WaitAction,
 )
-from skyvern.webeye.actions.handler import poll_verification_code
+from skyvern.webeye.actions.handler import get_verification_code_window_start, poll_verification_code
 from skyvern.webeye.scraper.scraper import ScrapedPage
 
 LOG = structlog.get_logger()
@@ -782,6 +782,7 @@ async def generate_cua_fallback_actions(
                     workflow_run_id=task.workflow_run_id,
                     totp_verification_url=task.totp_verification_url,
                     totp_identifier=task.totp_identifier,
+                    created_after=await get_verification_code_window_start(task, step),
                 )
                 reasoning = reasoning or f"Received verification code: {verification_code}"
                 action = VerificationCodeAction(
@@ -32,36 +32,49 @@ from skyvern.exceptions import (
 from skyvern.forge.sdk.api.files import get_download_dir, make_temp_directory
 from skyvern.forge.sdk.core.skyvern_context import current, ensure_context
 from skyvern.schemas.runs import ProxyLocation, get_tzinfo_from_proxy
-from skyvern.webeye.utils.page import SkyvernFrame
+from skyvern.webeye.live_view import LiveViewScreencast
+from skyvern.webeye.utils.page import SkyvernFrame, register_js_functions, track_page_network_activity
 
 LOG = structlog.get_logger()
 
 
 BrowserCleanupFunc = Callable[[], None] | None
+# give the browser context back to the pool instead of closing it. the argument tells if the context is still usable
+BrowserReleaseFunc = Callable[[bool], Awaitable[None]] | None
+
+
+def create_browser_console_log_file() -> str | None:
+    log_path = f"{settings.LOG_PATH}/{datetime.utcnow().strftime('%Y-%m-%d')}/{uuid.uuid4()}.log"
+    try:
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        # create the empty log file
+        with open(log_path, "w") as _:
+            pass
+    except Exception:
+        LOG.warning(
+            "Failed to create browser log file",
+            log_path=log_path,
+            exc_info=True,
+        )
+        return None
+    return log_path
+
+
+def format_browser_console_message(msg: ConsoleMessage) -> str:
+    current_time = datetime.now().strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    key_values = " ".join([f"{key}={value}" for key, value in msg.location.items()])
+    return f"{current_time}[{msg.type}]{msg.text} {key_values}\n"
 
 
 def set_browser_console_log(browser_context: BrowserContext, browser_artifacts: BrowserArtifacts) -> None:
     if browser_artifacts.browser_console_log_path is None:
-        log_path = f"{settings.LOG_PATH}/{datetime.utcnow().strftime('%Y-%m-%d')}/{uuid.uuid4()}.log"
-        try:
-            os.makedirs(os.path.dirname(log_path), exist_ok=True)
-            # create the empty log file
-            with open(log_path, "w") as _:
-                pass
-        except Exception:
-            LOG.warning(
-                "Failed to create browser log file",
-                log_path=log_path,
-                exc_info=True,
-            )
+        log_path = create_browser_console_log_file()
+        if log_path is None:
             return
         browser_artifacts.browser_console_log_path = log_path
 
     async def browser_console_log(msg: ConsoleMessage) -> None:
-        current_time = datetime.now().strftime("%Y-%m-%dT%H:%M:%S.%fZ")
-        key_values = " ".join([f"{key}={value}" for key, value in msg.location.items()])
-        format_log = f"{current_time}[{msg.type}]{msg.text} {key_values}\n"
-        await browser_artifacts.append_browser_console_log(format_log)
+        await browser_artifacts.append_browser_console_log(format_browser_console_message(msg))
 
     LOG.info("browser console log is saved", log_path=browser_artifacts.browser_console_log_path)
     browser_context.on("console", browser_console_log)
@@ -126,6 +139,13 @@ def set_download_file_listener(browser_context: BrowserContext, **kwargs: Any) -
     browser_context.on("page", listen_to_new_page)
 
 
+def set_network_activity_listener(browser_context: BrowserContext) -> None:
+    # track the in-flight requests since the page is created, so that we know when the page is settled
+    for page in browser_context.pages:
+        track_page_network_activity(page)
+    browser_context.on("page", track_page_network_activity)
+
+
 def initialize_download_dir() -> str:
     context = ensure_context()
     return get_download_dir(context.workflow_run_id, context.task_id)
@@ -254,11 +274,16 @@ class BrowserContextFactory:
             if not creator:
                 raise UnknownBrowserType(browser_type)
             browser_context, browser_artifacts, cleanup_func = await creator(playwright, **kwargs)
-            set_browser_console_log(browser_context=browser_context, browser_artifacts=browser_artifacts)
+            pooled = bool(kwargs.get("pooled"))
+            # a pooled context serves many runs, the pool logs the console of each lease to its own file
+            if not pooled:
+                set_browser_console_log(browser_context=browser_context, browser_artifacts=browser_artifacts)
             set_download_file_listener(browser_context=browser_context, **kwargs)
+            set_network_activity_listener(browser_context=browser_context)
+            await register_js_functions(browser_context=browser_context)
 
             proxy_location: ProxyLocation | None = kwargs.get("proxy_location")
-            if proxy_location is not None:
+            if proxy_location is not None and not pooled:
                 context = ensure_context()
                 context.tz_info = get_tzinfo_from_proxy(proxy_location)
 
@@ -366,6 +391,22 @@ def _get_proxy_server_creds(proxy: str) -> dict:
     return {}
 
 
+def _get_download_dir(kwargs: dict) -> str:
+    # a pooled context is created outside of any run, it gets its own download dir from the pool
+    download_dir = kwargs.get("download_dir")
+    if isinstance(download_dir, str):
+        return download_dir
+    return initialize_download_dir()
+
+
+def _build_browser_artifacts(browser_args: dict[str, Any], kwargs: dict) -> BrowserArtifacts:
+    # the har and the video are written when the context is closed, a pooled context would mix the runs it served
+    if kwargs.get("pooled"):
+        browser_args.pop("record_har_path", None)
+        browser_args.pop("record_video_dir", None)
+    return BrowserContextFactory.build_browser_artifacts(har_path=browser_args.get("record_har_path"))
+
+
 def _get_cdp_port(kwargs: dict) -> int | None:
     raw_cdp_port = kwargs.get("cdp_port")
     if isinstance(raw_cdp_port, (int, str)):
@@ -405,7 +446,7 @@ async def _create_headless_chromium(
     playwright: Playwright, proxy_location: ProxyLocation | None = None, **kwargs: dict
 ) -> tuple[BrowserContext, BrowserArtifacts, BrowserCleanupFunc]:
     user_data_dir = make_temp_directory(prefix="skyvern_browser_")
-    download_dir = initialize_download_dir()
+    download_dir = _get_download_dir(kwargs)
     BrowserContextFactory.update_chromium_browser_preferences(
         user_data_dir=user_data_dir,
         download_dir=download_dir,
@@ -419,7 +460,7 @@ async def _create_headless_chromium(
         }
     )
 
-    browser_artifacts = BrowserContextFactory.build_browser_artifacts(har_path=browser_args["record_har_path"])
+    browser_artifacts = _build_browser_artifacts(browser_args, kwargs)
     browser_context = await playwright.chromium.launch_persistent_context(**browser_args)
     return browser_context, browser_artifacts, None
 
@@ -428,7 +469,7 @@ async def _create_headful_chromium(
     playwright: Playwright, proxy_location: ProxyLocation | None = None, **kwargs: dict
 ) -> tuple[BrowserContext, BrowserArtifacts, BrowserCleanupFunc]:
     user_data_dir = make_temp_directory(prefix="skyvern_browser_")
-    download_dir = initialize_download_dir()
+    download_dir = _get_download_dir(kwargs)
     BrowserContextFactory.update_chromium_browser_preferences(
         user_data_dir=user_data_dir,
         download_dir=download_dir,
@@ -442,7 +483,7 @@ async def _create_headful_chromium(
             "headless": False,
         }
     )
-    browser_artifacts = BrowserContextFactory.build_browser_artifacts(har_path=browser_args["record_har_path"])
+    browser_artifacts = _build_browser_artifacts(browser_args, kwargs)
     browser_context = await playwright.chromium.launch_persistent_context(**browser_args)
     return browser_context, browser_artifacts, None
 
@@ -524,12 +565,17 @@ class BrowserState:
         page: Page | None = None,
         browser_artifacts: BrowserArtifacts = BrowserArtifacts(),
         browser_cleanup: BrowserCleanupFunc = None,
+        browser_release: BrowserReleaseFunc = None,
     ):
         self.__page = page
         self.pw = pw
         self.browser_context = browser_context
         self.browser_artifacts = browser_artifacts
         self.browser_cleanup = browser_cleanup
+        # a context leased from the pool is given back instead of being closed, and the playwright driver is shared
+        self.browser_release = browser_release
+        self.owns_playwright = browser_release is None
+        self.live_view: LiveViewScreencast | None = None
 
     async def __assert_page(self) -> Page:
         page = await self.get_working_page()
@@ -667,8 +713,22 @@ class BrowserState:
         assert page is not None
         return page
 
+    async def start_live_view(self, channel: str) -> None:
+        if self.live_view is None:
+            self.live_view = LiveViewScreencast(channel)
+        else:
+            self.live_view.channel = channel
+        page = await self.get_working_page()
+        if page is not None:
+            await self.live_view.start(page)
+
     async def set_working_page(self, page: Page | None, index: int = 0) -> None:
         self.__page = page
+        if self.live_view is not None:
+            if page is None:
+                await self.live_view.stop()
+            else:
+                await self.live_view.start(page)
         if page is None:
             return
         if len(self.browser_artifacts.video_artifacts) > index:
@@ -751,7 +811,11 @@ class BrowserState:
         try:
             async with asyncio.timeout(BROWSER_CLOSE_TIMEOUT):
                 await self._close_all_other_pages()
-                if self.browser_context is not None:
+                if self.browser_release is not None:
+                    # the pooled context is broken, let the pool close it
+                    browser_release, self.browser_release = self.browser_release, None
+                    await browser_release(False)
+                elif self.browser_context is not None:
                     await self.browser_context.close()
                 self.browser_context = None
                 await self.set_working_page(None)
@@ -787,6 +851,18 @@ class BrowserState:
 
     async def close(self, close_browser_on_completion: bool = True) -> None:
         LOG.info("Closing browser state")
+        if self.live_view is not None:
+            await self.live_view.stop()
+        if self.browser_release is not None and close_browser_on_completion:
+            LOG.info("Releasing the browser context to the pool")
+            browser_release, self.browser_release = self.browser_release, None
+            try:
+                await browser_release(True)
+            except Exception:
+                LOG.warning("Failed to release the browser context to the pool", exc_info=True)
+            self.browser_context = None
+            return
+
         try:
             async with asyncio.timeout(BROWSER_CLOSE_TIMEOUT):
                 if self.browser_context and close_browser_on_completion:
@@ -807,7 +883,7 @@ class BrowserState:
 
         try:
             async with asyncio.timeout(BROWSER_CLOSE_TIMEOUT):
-                if self.pw and close_browser_on_completion:
+                if self.pw and close_browser_on_completion and self.owns_playwright:
                     try:
                         LOG.info("Stopping playwright")
                         await self.pw.stop()
@@ -5,12 +5,15 @@ import os
 import structlog
 from playwright.async_api import async_playwright
 
+from skyvern.config import settings
 from skyvern.exceptions import MissingBrowserState
 from skyvern.forge import app
+from skyvern.forge.sdk.pubsub.channels import get_live_view_channel
 from skyvern.forge.sdk.schemas.tasks import Task
 from skyvern.forge.sdk.workflow.models.workflow import WorkflowRun
 from skyvern.schemas.runs import ProxyLocation
 from skyvern.webeye.browser_factory import BrowserContextFactory, BrowserState, VideoArtifact
+from skyvern.webeye.browser_pool import BrowserContextPool
 
 LOG = structlog.get_logger()
 
@@ -18,6 +21,7 @@ LOG = structlog.get_logger()
 class BrowserManager:
     instance = None
     pages: dict[str, BrowserState] = dict()
+    browser_pool = BrowserContextPool()
 
     def __new__(cls) -> BrowserManager:
         if cls.instance is None:
@@ -32,6 +36,13 @@ class BrowserManager:
         workflow_run_id: str | None = None,
         organization_id: str | None = None,
     ) -> BrowserState:
+        if settings.BROWSER_POOL_ENABLED:
+            browser_state = await BrowserManager.browser_pool.lease(
+                proxy_location=proxy_location, organization_id=organization_id
+            )
+            if browser_state is not None:
+                return browser_state
+
         pw = await async_playwright().start()
         (
             browser_context,
@@ -120,6 +131,9 @@ class BrowserManager:
         if task.workflow_run_id:
             self.pages[task.workflow_run_id] = browser_state
 
+        if settings.LIVE_VIEW_ENABLED:
+            await browser_state.start_live_view(get_live_view_channel(task.workflow_run_id or task.task_id))
+
         # The URL here is only used when creating a new page, and not when using an existing page.
         # This will make sure browser_state.page is not None.
         await browser_state.get_or_create_page(
@@ -189,6 +203,9 @@ class BrowserManager:
         if parent_workflow_run_id:
             self.pages[parent_workflow_run_id] = browser_state
 
+        if settings.LIVE_VIEW_ENABLED:
+            await browser_state.start_live_view(get_live_view_channel(workflow_run_id))
+
         # The URL here is only used when creating a new page, and not when using an existing page.
         # This will make sure browser_state.page is not None.
         await browser_state.get_or_create_page(
@@ -288,6 +305,7 @@ class BrowserManager:
         for browser_state in cls.pages.values():
             await browser_state.close()
         cls.pages = dict()
+        await cls.browser_pool.close()
         LOG.info("BrowserManger is closed")
 
     async def cleanup_for_task(
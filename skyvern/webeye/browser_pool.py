@@ -0,0 +1,362 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import os
+import shutil
+import time
+import uuid
+from collections import defaultdict
+from functools import partial
+from urllib.parse import urlparse
+
+import structlog
+from playwright.async_api import BrowserContext, ConsoleMessage, Playwright, Request, async_playwright
+
+from skyvern.config import settings
+from skyvern.constants import BROWSER_CLOSE_TIMEOUT
+from skyvern.forge.sdk.api.files import make_temp_directory
+from skyvern.forge.sdk.core.skyvern_context import current
+from skyvern.schemas.runs import ProxyLocation, get_tzinfo_from_proxy
+from skyvern.webeye.browser_factory import (
+    BrowserArtifacts,
+    BrowserCleanupFunc,
+    BrowserContextFactory,
+    BrowserState,
+    create_browser_console_log_file,
+    format_browser_console_message,
+    initialize_download_dir,
+)
+
+LOG = structlog.get_logger()
+
+# cdp-connect attaches to a browser the pool doesn't own
+POOLABLE_BROWSER_TYPES = {"chromium-headless", "chromium-headful"}
+
+# browser type, organization id, proxy location. the contexts are never shared between organizations
+BrowserPoolKey = tuple[str, str, ProxyLocation | None]
+
+
+def _point_download_dir(download_link: str, target_dir: str) -> None:
+    # swap the symlink atomically, the browser keeps downloading to the link
+    tmp_link = f"{download_link}.{uuid.uuid4().hex}"
+    os.symlink(target_dir, tmp_link)
+    os.replace(tmp_link, download_link)
+
+
+class PooledBrowserContext:
+    def __init__(
+        self,
+        key: BrowserPoolKey,
+        browser_context: BrowserContext,
+        browser_cleanup: BrowserCleanupFunc,
+        download_link: str,
+        idle_download_dir: str,
+    ) -> None:
+        self.key = key
+        self.browser_context = browser_context
+        self.browser_cleanup = browser_cleanup
+        # the downloads path of the browser is a symlink to the download dir of the current run
+        self.download_link = download_link
+        self.idle_download_dir = idle_download_dir
+        self.browser_artifacts = BrowserArtifacts()
+        self.uses = 0
+        self.closed = False
+        self.idle_since = time.monotonic()
+        # the origins visited by the current run, their storage is cleared before the next run
+        self.origins: set[str] = set()
+
+        browser_context.on("close", self._on_close)
+        browser_context.on("request", self._on_request)
+        browser_context.on("console", self._on_console)
+
+    def _on_close(self, _: BrowserContext) -> None:
+        self.closed = True
+
+    def _on_request(self, request: Request) -> None:
+        parsed_url = urlparse(request.url)
+        if parsed_url.scheme in ("http", "https"):
+            self.origins.add(f"{parsed_url.scheme}://{parsed_url.netloc}")
+
+    async def _on_console(self, msg: ConsoleMessage) -> None:
+        # resolve the artifacts of the current lease when the message comes in
+        await self.browser_artifacts.append_browser_console_log(format_browser_console_message(msg))
+
+
+class BrowserContextPool:
+    """
+    Warm browser contexts sharing one playwright driver, keyed by browser type, organization and proxy location.
+    A run leases a context and gives it back when it's done. The context is scrubbed before it's reused by the same
+    organization (cookies, storage of the visited origins, service workers, cache, permissions, pages, downloads),
+    and recycled after BROWSER_POOL_MAX_USES runs or when it crashes or fails the health check.
+    The process holds at most BROWSER_POOL_MAX_TOTAL_SIZE contexts over all the keys, the least recently used idle
+    context is closed to make room for another key. The contexts idle for BROWSER_POOL_IDLE_TIMEOUT_SECONDS are closed.
+    The contexts don't record videos or hars, nothing is pooled while VIDEO_PATH or HAR_PATH is set.
+    """
+
+    def __init__(
+        self,
+        min_size: int = settings.BROWSER_POOL_MIN_SIZE,
+        max_size: int = settings.BROWSER_POOL_MAX_SIZE,
+        max_uses: int = settings.BROWSER_POOL_MAX_USES,
+        max_total_size: int = settings.BROWSER_POOL_MAX_TOTAL_SIZE,
+        idle_timeout_seconds: int = settings.BROWSER_POOL_IDLE_TIMEOUT_SECONDS,
+    ) -> None:
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.max_total_size = max_total_size
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self._playwright: Playwright | None = None
+        self._playwright_lock = asyncio.Lock()
+        self._idle: dict[BrowserPoolKey, list[PooledBrowserContext]] = defaultdict(list)
+        # idle, leased and being created
+        self._sizes: dict[BrowserPoolKey, int] = defaultdict(int)
+        self._total_size = 0
+        self._warm_up_tasks: dict[BrowserPoolKey, asyncio.Task[None]] = {}
+        self._reaper_task: asyncio.Task[None] | None = None
+
+    async def get_playwright(self) -> Playwright:
+        async with self._playwright_lock:
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            return self._playwright
+
+    async def lease(
+        self, proxy_location: ProxyLocation | None = None, organization_id: str | None = None
+    ) -> BrowserState | None:
+        """
+        :return: a browser state on a warm context, or None if the run can't use a pooled context or the pool is full.
+        """
+        if settings.BROWSER_TYPE not in POOLABLE_BROWSER_TYPES or organization_id is None:
+            return None
+        # a video or a har covers the whole life of a context, it can't be split between the runs it served
+        if settings.VIDEO_PATH or settings.HAR_PATH:
+            return None
+        key: BrowserPoolKey = (settings.BROWSER_TYPE, organization_id, proxy_location)
+        self._start_reaper()
+
+        download_dir = initialize_download_dir()
+        pooled: PooledBrowserContext | None = None
+        while self._idle[key]:
+            candidate = self._idle[key].pop()
+            if await self._is_healthy(candidate):
+                pooled = candidate
+                break
+            LOG.warning(
+                "Recycling an unhealthy pooled browser context",
+                browser_type=key[0],
+                organization_id=key[1],
+                proxy_location=key[2],
+            )
+            await self._close(candidate)
+
+        if pooled is None:
+            if self._sizes[key] >= self.max_size:
+                LOG.info(
+                    "Browser context pool is full", browser_type=key[0], organization_id=key[1], proxy_location=key[2]
+                )
+                return None
+            while self._total_size >= self.max_total_size:
+                if not await self._evict_least_recently_used():
+                    LOG.info("Browser context pool is full for the process", total_size=self._total_size)
+                    return None
+            pooled = await self._create(key)
+
+        pooled.uses += 1
+        _point_download_dir(pooled.download_link, download_dir)
+        pooled.browser_artifacts = BrowserContextFactory.build_browser_artifacts(
+            browser_console_log_path=create_browser_console_log_file()
+        )
+        context = current()
+        if context and proxy_location is not None:
+            context.tz_info = get_tzinfo_from_proxy(proxy_location)
+        self._schedule_warm_up(key)
+
+        LOG.info("Leased a browser context from the pool", uses=pooled.uses, idle=len(self._idle[key]))
+        return BrowserState(
+            pw=await self.get_playwright(),
+            browser_context=pooled.browser_context,
+            page=None,
+            browser_artifacts=pooled.browser_artifacts,
+            browser_release=partial(self.release, pooled),
+        )
+
+    async def release(self, pooled: PooledBrowserContext, healthy: bool = True) -> None:
+        # the browser state of the finished run keeps its artifacts, the next messages don't go to its log
+        pooled.browser_artifacts = BrowserArtifacts()
+        if not healthy or pooled.closed or pooled.uses >= self.max_uses or not await self._scrub(pooled):
+            await self._close(pooled)
+            self._schedule_warm_up(pooled.key)
+            return
+        pooled.idle_since = time.monotonic()
+        self._idle[pooled.key].append(pooled)
+
+    async def _create(self, key: BrowserPoolKey) -> PooledBrowserContext:
+        self._sizes[key] += 1
+        self._total_size += 1
+        try:
+            pool_dir = make_temp_directory(prefix="skyvern_browser_pool_")
+            idle_download_dir = os.path.join(pool_dir, "idle_downloads")
+            download_link = os.path.join(pool_dir, "downloads")
+            os.makedirs(idle_download_dir, exist_ok=True)
+            _point_download_dir(download_link, idle_download_dir)
+            browser_context, _, browser_cleanup = await BrowserContextFactory.create_browser_context(
+                await self.get_playwright(),
+                proxy_location=key[2],
+                download_dir=download_link,
+                pooled=True,
+            )
+        except Exception:
+            self._sizes[key] -= 1
+            self._total_size -= 1
+            raise
+        return PooledBrowserContext(
+            key=key,
+            browser_context=browser_context,
+            browser_cleanup=browser_cleanup,
+            download_link=download_link,
+            idle_download_dir=idle_download_dir,
+        )
+
+    async def _is_healthy(self, pooled: PooledBrowserContext) -> bool:
+        if pooled.closed:
+            return False
+        try:
+            async with asyncio.timeout(settings.BROWSER_POOL_HEALTH_CHECK_TIMEOUT_MS / 1000):
+                await pooled.browser_context.cookies()
+            return True
+        except Exception:
+            return False
+
+    async def _scrub(self, pooled: PooledBrowserContext) -> bool:
+        browser_context = pooled.browser_context
+        try:
+            async with asyncio.timeout(BROWSER_CLOSE_TIMEOUT):
+                # keep a blank page so the browser stays up while the pages of the run are closed
+                blank_page = await browser_context.new_page()
+                for page in browser_context.pages:
+                    if page != blank_page:
+                        await page.close()
+                cdp_session = await browser_context.new_cdp_session(blank_page)
+                for origin in pooled.origins:
+                    await cdp_session.send("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+                await cdp_session.send("ServiceWorker.enable")
+                await cdp_session.send("ServiceWorker.stopAllWorkers")
+                await cdp_session.send("Network.clearBrowserCache")
+                await cdp_session.detach()
+                await browser_context.clear_cookies()
+                await browser_context.clear_permissions()
+        except Exception:
+            LOG.warning("Failed to scrub the pooled browser context", exc_info=True)
+            return False
+
+        pooled.origins.clear()
+        _point_download_dir(pooled.download_link, pooled.idle_download_dir)
+        shutil.rmtree(pooled.idle_download_dir, ignore_errors=True)
+        os.makedirs(pooled.idle_download_dir, exist_ok=True)
+        return True
+
+    async def _close(self, pooled: PooledBrowserContext) -> None:
+        self._sizes[pooled.key] -= 1
+        self._total_size -= 1
+        try:
+            async with asyncio.timeout(BROWSER_CLOSE_TIMEOUT):
+                await pooled.browser_context.close()
+        except Exception:
+            LOG.warning("Failed to close the pooled browser context", exc_info=True)
+        if pooled.browser_cleanup is not None:
+            try:
+                pooled.browser_cleanup()
+            except Exception:
+                LOG.warning("Failed to execute browser cleanup", exc_info=True)
+
+    def _schedule_warm_up(self, key: BrowserPoolKey) -> None:
+        warm_up_task = self._warm_up_tasks.get(key)
+        if warm_up_task and not warm_up_task.done():
+            return
+        if (
+            len(self._idle[key]) >= self.min_size
+            or self._sizes[key] >= self.max_size
+            or self._total_size >= self.max_total_size
+        ):
+            return
+        # the contexts are not created for the current run, don't inherit its skyvern context
+        self._warm_up_tasks[key] = asyncio.create_task(self._warm_up(key), context=contextvars.Context())
+
+    async def _warm_up(self, key: BrowserPoolKey) -> None:
+        # warming up never evicts, the contexts of the other keys may be leased again soon
+        while (
+            len(self._idle[key]) < self.min_size
+            and self._sizes[key] < self.max_size
+            and self._total_size < self.max_total_size
+        ):
+            try:
+                pooled = await self._create(key)
+            except Exception:
+                LOG.exception(
+                    "Failed to warm up a browser context",
+                    browser_type=key[0],
+                    organization_id=key[1],
+                    proxy_location=key[2],
+                )
+                return
+            self._idle[key].append(pooled)
+
+    async def _evict_least_recently_used(self) -> bool:
+        idle_contexts = [pooled for idle in self._idle.values() for pooled in idle]
+        if not idle_contexts:
+            return False
+        least_recently_used = min(idle_contexts, key=lambda pooled: pooled.idle_since)
+        self._idle[least_recently_used.key].remove(least_recently_used)
+        LOG.info(
+            "Evicting the least recently used browser context",
+            browser_type=least_recently_used.key[0],
+            organization_id=least_recently_used.key[1],
+            proxy_location=least_recently_used.key[2],
+        )
+        await self._close(least_recently_used)
+        return True
+
+    async def _evict_idle(self) -> None:
+        idle_deadline = time.monotonic() - self.idle_timeout_seconds
+        for key, idle_contexts in list(self._idle.items()):
+            for pooled in [pooled for pooled in idle_contexts if pooled.idle_since <= idle_deadline]:
+                # leased while an earlier context was closing
+                if pooled not in idle_contexts:
+                    continue
+                idle_contexts.remove(pooled)
+                await self._close(pooled)
+            # forget the keys nobody uses anymore, there is one per organization and proxy location
+            warm_up_task = self._warm_up_tasks.get(key)
+            if not self._idle[key] and self._sizes[key] == 0 and (not warm_up_task or warm_up_task.done()):
+                self._idle.pop(key, None)
+                self._sizes.pop(key, None)
+                self._warm_up_tasks.pop(key, None)
+
+    def _start_reaper(self) -> None:
+        if self._reaper_task and not self._reaper_task.done():
+            return
+        self._reaper_task = asyncio.create_task(self._reap_idle(), context=contextvars.Context())
+
+    async def _reap_idle(self) -> None:
+        while True:
+            await asyncio.sleep(min(self.idle_timeout_seconds, 60))
+            try:
+                await self._evict_idle()
+            except Exception:
+                LOG.exception("Failed to close the idle browser contexts")
+
+    async def close(self) -> None:
+        if self._reaper_task is not None:
+            self._reaper_task.cancel()
+            self._reaper_task = None
+        for warm_up_task in self._warm_up_tasks.values():
+            warm_up_task.cancel()
+        for idle_contexts in self._idle.values():
+            for pooled in idle_contexts:
+                await self._close(pooled)
+        self._idle.clear()
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
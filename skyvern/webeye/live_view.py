@@ -0,0 +1,118 @@
+import asyncio
+import base64
+import time
+from typing import Any
+
+import structlog
+from playwright.async_api import CDPSession, Page
+
+from skyvern.config import settings
+from skyvern.forge import app
+
+LOG = structlog.get_logger()
+
+
+class LiveViewScreencast:
+    """
+    Stream the working page over a CDP screencast. The JPEG frames are published on the live view channel of the run.
+    The browser sends the next frame only once the previous one is acked, so delaying the ack caps the fps.
+    The screencast only runs while the channel has subscribers. The browser only sends a frame when the page
+    repaints, so the latest frame is replayed at the replay interval for the viewers who joined since.
+    """
+
+    def __init__(
+        self,
+        channel: str,
+        quality: int = settings.LIVE_VIEW_JPEG_QUALITY,
+        max_fps: int = settings.LIVE_VIEW_MAX_FPS,
+        replay_interval_seconds: float = settings.LIVE_VIEW_REPLAY_INTERVAL_MS / 1000,
+    ) -> None:
+        self.channel = channel
+        self.quality = quality
+        self.min_frame_interval = 1 / max_fps
+        self.replay_interval_seconds = replay_interval_seconds
+        self.page: Page | None = None
+        self.latest_frame: bytes | None = None
+        self._cdp_session: CDPSession | None = None
+        self._watch_task: asyncio.Task[None] | None = None
+        self._last_frame_time = 0.0
+        self._last_publish_time = 0.0
+
+    async def start(self, page: Page) -> None:
+        if page == self.page and self._watch_task is not None:
+            return
+        await self.stop()
+        self.page = page
+        self._watch_task = asyncio.create_task(self._watch(page))
+
+    async def stop(self) -> None:
+        watch_task, self._watch_task = self._watch_task, None
+        if watch_task is not None:
+            watch_task.cancel()
+        self.page = None
+        self.latest_frame = None
+        await self._stop_screencast()
+
+    async def _watch(self, page: Page) -> None:
+        while True:
+            try:
+                subscribed = await app.PUBSUB.count_subscribers(self.channel) > 0
+                if subscribed and self._cdp_session is None:
+                    await self._start_screencast(page)
+                elif not subscribed and self._cdp_session is not None:
+                    await self._stop_screencast()
+                elif (
+                    subscribed
+                    and self.latest_frame
+                    and time.monotonic() - self._last_publish_time >= self.replay_interval_seconds
+                ):
+                    self._last_publish_time = time.monotonic()
+                    await app.PUBSUB.publish(self.channel, {"frame": self.latest_frame, "replay": True})
+            except Exception:
+                LOG.debug("Failed to update the live view screencast", channel=self.channel, exc_info=True)
+            await asyncio.sleep(self.replay_interval_seconds)
+
+    async def _start_screencast(self, page: Page) -> None:
+        try:
+            cdp_session = await page.context.new_cdp_session(page)
+            cdp_session.on("Page.screencastFrame", self._on_frame)
+            await cdp_session.send(
+                "Page.startScreencast",
+                {
+                    "format": "jpeg",
+                    "quality": self.quality,
+                    "maxWidth": settings.BROWSER_WIDTH,
+                    "maxHeight": settings.BROWSER_HEIGHT,
+                },
+            )
+        except Exception:
+            LOG.warning("Failed to start the live view screencast", channel=self.channel, exc_info=True)
+            return
+        self._cdp_session = cdp_session
+
+    async def _stop_screencast(self) -> None:
+        cdp_session, self._cdp_session = self._cdp_session, None
+        if cdp_session is None:
+            return
+        try:
+            await cdp_session.send("Page.stopScreencast")
+            await cdp_session.detach()
+        except Exception:
+            # the page is already closed
+            LOG.debug("Failed to stop the live view screencast", channel=self.channel, exc_info=True)
+
+    async def _on_frame(self, params: dict[str, Any]) -> None:
+        cdp_session = self._cdp_session
+        if cdp_session is None:
+            return
+        try:
+            self.latest_frame = base64.b64decode(params["data"])
+            self._last_publish_time = time.monotonic()
+            await app.PUBSUB.publish(self.channel, {"frame": self.latest_frame})
+            delay = self._last_frame_time + self.min_frame_interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._last_frame_time = time.monotonic()
+            await cdp_session.send("Page.screencastFrameAck", {"sessionId": params["sessionId"]})
+        except Exception:
+            LOG.debug("Failed to handle the live view frame", channel=self.channel, exc_info=True)
@@ -469,6 +469,27 @@ function getBlockElementUniqueID(element) {
   return [hitElement.getAttribute("unique_id") ?? "", true];
 }
 
+// batched visibility and blocking checks, so the shape conversion doesn't pay a round trip per element.
+// an element not found in the light DOM is reported as null, the caller falls back to its locator.
+function getShapeElementsState(uniqueIds) {
+  const states = {};
+  for (const uniqueId of uniqueIds) {
+    const element = document.querySelector(`[unique_id="${uniqueId}"]`);
+    if (!element) {
+      states[uniqueId] = null;
+      continue;
+    }
+    // same as playwright's isVisible: a non-empty box and not visibility:hidden
+    const rect = element.getBoundingClientRect();
+    const style = getElementComputedStyle(element);
+    const visible =
+      rect.width > 0 && rect.height > 0 && style?.visibility !== "hidden";
+    const [, blocked] = getBlockElementUniqueID(element);
+    states[uniqueId] = { visible: visible, blocked: blocked };
+  }
+  return states;
+}
+
 function isHidden(element) {
   const style = getElementComputedStyle(element);
   if (style?.display === "none") {
@@ -1383,10 +1404,13 @@ async function buildElementObject(
   return elementObj;
 }
 
-// build the element tree for the body
+// build the element tree for the body.
+// with reuse_clean_elements, the elements the page didn't change since the previous call are not built again,
+// only their visibility and their rect are computed again
 async function buildTreeFromBody(
   frame = "main.frame",
   frame_index = undefined,
+  reuse_clean_elements = false,
 ) {
   if (
     window.GlobalSkyvernFrameIndex === undefined &&
@@ -1394,7 +1418,18 @@ async function buildTreeFromBody(
   ) {
     window.GlobalSkyvernFrameIndex = frame_index;
   }
-  return await buildElementTree(document.body, frame);
+  const hoverStylesMap = getHoverStylesMap();
+  const buildCache = reuse_clean_elements
+    ? prepareElementBuildCache(hoverStylesMap)
+    : null;
+  return await buildElementTree(
+    document.body,
+    frame,
+    false,
+    true,
+    hoverStylesMap,
+    buildCache,
+  );
 }
 
 async function buildElementTree(
@@ -1403,6 +1438,7 @@ async function buildElementTree(
   full_tree = false,
   needContext = true,
   hoverStylesMap = undefined,
+  buildCache = null,
 ) {
   // Generate hover styles map at the start
   if (hoverStylesMap === undefined) {
@@ -1419,7 +1455,58 @@ async function buildElementTree(
       return [];
     }
   }
-  async function processElement(element, parentId) {
+
+  // build the skyvern element of a visible element, null if the element is left out of the tree
+  async function buildSkyvernElement(element, tagName) {
+    const interactable = isInteractable(element, hoverStylesMap);
+    let elementObj = null;
+    let isParentSVG = null;
+    if (interactable) {
+      elementObj = await buildElementObject(frame, element, interactable);
+    } else if (
+      tagName === "frameset" ||
+      tagName === "iframe" ||
+      tagName === "frame"
+    ) {
+      elementObj = await buildElementObject(frame, element, interactable);
+    } else if (element.shadowRoot) {
+      elementObj = await buildElementObject(frame, element, interactable);
+    } else if (isTableRelatedElement(element)) {
+      // build all table related elements into skyvern element
+      // we need these elements to preserve the DOM structure
+      elementObj = await buildElementObject(frame, element, interactable);
+    } else if (hasBeforeOrAfterPseudoContent(element)) {
+      elementObj = await buildElementObject(frame, element, interactable);
+    } else if (tagName === "svg") {
+      elementObj = await buildElementObject(frame, element, interactable);
+    } else if (
+      (isParentSVG = element.closest("svg")) &&
+      isParentSVG.getAttribute("unique_id")
+    ) {
+      // if elemnet is the children of the <svg> with an unique_id
+      elementObj = await buildElementObject(frame, element, interactable);
+    } else if (
+      getElementText(element).length > 0 &&
+      getElementText(element).length <= 5000
+    ) {
+      elementObj = await buildElementObject(frame, element, interactable);
+    } else if (full_tree) {
+      // when building full tree, we only get text from element itself
+      // elements without text are purgeable
+      elementObj = await buildElementObject(
+        frame,
+        element,
+        interactable,
+        true,
+      );
+      if (elementObj.text.length > 0) {
+        elementObj.purgeable = false;
+      }
+    }
+    return elementObj;
+  }
+
+  async function processElement(element, parentId, insideDirtySubtree = false) {
     if (element === null) {
       _jsConsoleLog("get a null element");
       return;
@@ -1444,55 +1531,46 @@ async function buildElementTree(
       }
     }
 
+    // the mutations inside a shadow root are not observed, it's always built again
+    if (
+      buildCache &&
+      (element.shadowRoot || buildCache.dirtySubtrees.has(element))
+    ) {
+      insideDirtySubtree = true;
+    }
+
     let children = [];
     const isVisible = isElementVisible(element);
     if (isVisible && !isHidden(element) && !isScriptOrStyle(element)) {
-      const interactable = isInteractable(element, hoverStylesMap);
       let elementObj = null;
-      let isParentSVG = null;
       if (element.shadowRoot) {
         children = getChildElements(element.shadowRoot);
       }
-      if (interactable) {
-        elementObj = await buildElementObject(frame, element, interactable);
-      } else if (
-        tagName === "frameset" ||
-        tagName === "iframe" ||
-        tagName === "frame"
-      ) {
-        elementObj = await buildElementObject(frame, element, interactable);
-      } else if (element.shadowRoot) {
-        elementObj = await buildElementObject(frame, element, interactable);
-      } else if (isTableRelatedElement(element)) {
-        // build all table related elements into skyvern element
-        // we need these elements to preserve the DOM structure
-        elementObj = await buildElementObject(frame, element, interactable);
-      } else if (hasBeforeOrAfterPseudoContent(element)) {
-        elementObj = await buildElementObject(frame, element, interactable);
-      } else if (tagName === "svg") {
-        elementObj = await buildElementObject(frame, element, interactable);
-      } else if (
-        (isParentSVG = element.closest("svg")) &&
-        isParentSVG.getAttribute("unique_id")
-      ) {
-        // if elemnet is the children of the <svg> with an unique_id
-        elementObj = await buildElementObject(frame, element, interactable);
-      } else if (
-        getElementText(element).length > 0 &&
-        getElementText(element).length <= 5000
-      ) {
-        elementObj = await buildElementObject(frame, element, interactable);
-      } else if (full_tree) {
-        // when building full tree, we only get text from element itself
-        // elements without text are purgeable
-        elementObj = await buildElementObject(
-          frame,
-          element,
-          interactable,
-          true,
-        );
-        if (elementObj.text.length > 0) {
-          elementObj.purgeable = false;
+      const builtElement = getReusableBuiltElement(
+        buildCache,
+        element,
+        frame,
+        insideDirtySubtree,
+      );
+      if (builtElement !== undefined) {
+        elementObj = builtElement && {
+          ...builtElement,
+          attributes: { ...builtElement.attributes },
+          children: [],
+          rect: DomUtils.getVisibleClientRect(element, true),
+        };
+      } else {
+        elementObj = await buildSkyvernElement(element, tagName);
+        if (buildCache) {
+          // copied before the context and the text trimming below change it
+          buildCache.builtElements.set(element, {
+            frame: frame,
+            elementObj: elementObj && {
+              ...elementObj,
+              attributes: { ...elementObj.attributes },
+              children: [],
+            },
+          });
         }
       }
 
@@ -1520,7 +1598,7 @@ async function buildElementTree(
     children = children.concat(getChildElements(element));
     for (let i = 0; i < children.length; i++) {
       const childElement = children[i];
-      await processElement(childElement, parentId);
+      await processElement(childElement, parentId, insideDirtySubtree);
     }
     return;
   }
@@ -1792,6 +1870,157 @@ async function buildElementTree(
   return [elements, resultArray];
 }
 
+function isStyleNode(node) {
+  return node?.nodeName === "STYLE" || node?.nodeName === "LINK";
+}
+
+function trackElementBuildMutations(buildCache, mutationsList) {
+  for (const mutation of mutationsList) {
+    // ignore the bounding boxes drawn by skyvern and the unique_id written by skyvern
+    if (
+      mutation.target?.closest?.("#boundingBoxContainer") ||
+      (mutation.type === "attributes" && mutation.attributeName === "unique_id")
+    ) {
+      continue;
+    }
+    // a stylesheet change can restyle any element
+    if (
+      isStyleNode(mutation.target) ||
+      isStyleNode(mutation.target.parentNode) ||
+      Array.from(mutation.addedNodes).some(isStyleNode) ||
+      Array.from(mutation.removedNodes).some(isStyleNode)
+    ) {
+      buildCache.valid = false;
+      continue;
+    }
+    if (mutation.type === "attributes") {
+      // the style and the interactability of the descendants can depend on the attributes
+      buildCache.dirtySubtrees.add(mutation.target);
+    } else if (mutation.type === "characterData") {
+      if (mutation.target.parentElement) {
+        buildCache.dirtyElements.add(mutation.target.parentElement);
+      }
+    } else {
+      if (mutation.target.nodeType === Node.ELEMENT_NODE) {
+        buildCache.dirtyElements.add(mutation.target);
+      }
+      for (const node of mutation.addedNodes) {
+        if (node.nodeType === Node.ELEMENT_NODE) {
+          buildCache.dirtySubtrees.add(node);
+        }
+      }
+    }
+  }
+}
+
+function getStyleSheetsSignature(hoverStylesMap) {
+  let ruleCount = 0;
+  for (const sheet of document.styleSheets) {
+    try {
+      ruleCount += sheet.cssRules.length;
+    } catch (e) {
+      // the rules of a cross-origin stylesheet can't be read
+    }
+  }
+  return `${document.styleSheets.length}:${ruleCount}:${hoverStylesMap.size}`;
+}
+
+// the skyvern elements built by the previous buildTreeFromBody, and the DOM nodes changed since then.
+// the elements are built again when the page changed them, one of their descendants or one of their ancestors
+function prepareElementBuildCache(hoverStylesMap) {
+  let buildCache = window.globalSkyvernElementBuildCache;
+  if (buildCache === undefined) {
+    buildCache = {
+      valid: false,
+      signature: null,
+      builtElements: new WeakMap(),
+      dirtySubtrees: new Set(),
+      dirtyElements: new Set(),
+      observer: null,
+    };
+    buildCache.observer = new MutationObserver((mutationsList) =>
+      trackElementBuildMutations(buildCache, mutationsList),
+    );
+    buildCache.observer.observe(document.documentElement, {
+      attributes: true,
+      childList: true,
+      subtree: true,
+      characterData: true,
+    });
+    // the media queries can restyle any element
+    window.addEventListener("resize", () => {
+      buildCache.valid = false;
+    });
+    window.globalSkyvernElementBuildCache = buildCache;
+  }
+  trackElementBuildMutations(buildCache, buildCache.observer.takeRecords());
+
+  const signature = getStyleSheetsSignature(hoverStylesMap);
+  if (!buildCache.valid || buildCache.signature !== signature) {
+    buildCache.builtElements = new WeakMap();
+    buildCache.dirtySubtrees.clear();
+    buildCache.dirtyElements.clear();
+    buildCache.valid = true;
+    buildCache.signature = signature;
+  }
+
+  // the text, the options and the interactability of an element can depend on its descendants
+  const rebuiltElements = new Set();
+  const markRebuilt = (element) => {
+    while (element && !rebuiltElements.has(element)) {
+      rebuiltElements.add(element);
+      element = parentElementOrShadowHost(element);
+    }
+  };
+  buildCache.dirtyElements.forEach(markRebuilt);
+  buildCache.dirtySubtrees.forEach((element) =>
+    markRebuilt(parentElementOrShadowHost(element)),
+  );
+
+  const dirtySubtrees = new Set(buildCache.dirtySubtrees);
+  // the mutations from now on are for the next build
+  buildCache.dirtySubtrees.clear();
+  buildCache.dirtyElements.clear();
+  return {
+    builtElements: buildCache.builtElements,
+    dirtySubtrees: dirtySubtrees,
+    rebuiltElements: rebuiltElements,
+  };
+}
+
+// the skyvern element built for the element by the previous buildTreeFromBody, null if the element was left out of
+// the tree, undefined if the element has to be built again
+function getReusableBuiltElement(
+  buildCache,
+  element,
+  frame,
+  insideDirtySubtree,
+) {
+  if (
+    !buildCache ||
+    insideDirtySubtree ||
+    buildCache.rebuiltElements.has(element)
+  ) {
+    return undefined;
+  }
+  // the value of a form control changes without a mutation
+  const tagName = element.tagName.toLowerCase();
+  if (tagName === "input" || tagName === "textarea" || tagName === "select") {
+    return undefined;
+  }
+  const builtElement = buildCache.builtElements.get(element);
+  if (builtElement === undefined || builtElement.frame !== frame) {
+    return undefined;
+  }
+  if (
+    builtElement.elementObj &&
+    builtElement.elementObj.id !== element.getAttribute("unique_id")
+  ) {
+    return undefined;
+  }
+  return builtElement.elementObj;
+}
+
 function drawBoundingBoxes(elements) {
   // draw a red border around the elements
   var groups = groupElementsVisually(elements);
@@ -2536,6 +2765,65 @@ async function getIncrementElements(wait_until_finished = true) {
   return [Array.from(idToElement.values()), cleanedTreeList];
 }
 
+if (window.globalSkyvernLastMutationTime === undefined) {
+  window.globalSkyvernLastMutationTime = performance.now();
+}
+
+if (window.globalObserverForPageSettle === undefined) {
+  window.globalObserverForPageSettle = new MutationObserver(function (
+    mutationsList,
+  ) {
+    for (const mutation of mutationsList) {
+      // ignore the bounding boxes drawn by skyvern and the unique_id written by skyvern
+      if (
+        mutation.target?.closest?.("#boundingBoxContainer") ||
+        (mutation.type === "attributes" &&
+          mutation.attributeName === "unique_id")
+      ) {
+        continue;
+      }
+      window.globalSkyvernLastMutationTime = performance.now();
+      return;
+    }
+  });
+}
+
+// the finite animations which are still running, infinite animations (like spinners) never end so they're skipped
+function countRunningAnimations() {
+  if (typeof document.getAnimations !== "function") {
+    return 0;
+  }
+  return document.getAnimations().filter((animation) => {
+    if (animation.playState !== "running") {
+      return false;
+    }
+    const endTime = animation.effect?.getComputedTiming?.().endTime;
+    return endTime !== undefined && Number.isFinite(endTime);
+  }).length;
+}
+
+async function getPageActivity() {
+  // start observing lazily, the document might not be ready when the script is loaded as an init script
+  if (!window.globalPageSettleObserving) {
+    window.globalObserverForPageSettle.observe(document.documentElement, {
+      attributes: true,
+      childList: true,
+      subtree: true,
+      characterData: true,
+    });
+    window.globalPageSettleObserving = true;
+    window.globalSkyvernLastMutationTime = performance.now();
+  }
+  // wait for the next frame, so the pending mutation callbacks are flushed.
+  // requestAnimationFrame is paused in background tabs, so don't wait for it too long
+  await Promise.race([waitForNextFrame(), asyncSleepFor(100)]);
+  return {
+    msSinceLastMutation: performance.now() - window.globalSkyvernLastMutationTime,
+    runningAnimations: countRunningAnimations(),
+    readyState: document.readyState,
+  };
+}
+
 /**
 
 // How to run the code:
@@ -1,5 +1,4 @@
 import asyncio
-import copy
 import json
 from collections import defaultdict
 from enum import StrEnum
@@ -11,12 +10,12 @@ from playwright.async_api import ElementHandle, Frame, Locator, Page
 from pydantic import BaseModel, PrivateAttr
 
 from skyvern.config import settings
-from skyvern.constants import BUILDING_ELEMENT_TREE_TIMEOUT_MS, DEFAULT_MAX_TOKENS, SKYVERN_DIR, SKYVERN_ID_ATTR
+from skyvern.constants import BUILDING_ELEMENT_TREE_TIMEOUT_MS, DEFAULT_MAX_TOKENS, SKYVERN_ID_ATTR
 from skyvern.exceptions import FailedToTakeScreenshot, ScrapingFailed, UnknownElementTreeFormat
 from skyvern.forge.sdk.api.crypto import calculate_sha256
 from skyvern.forge.sdk.core import skyvern_context
 from skyvern.utils.image_resizer import Resolution
-from skyvern.utils.token_counter import count_tokens
+from skyvern.utils.token_counter import count_tokens_async
 from skyvern.webeye.browser_factory import BrowserState
 from skyvern.webeye.utils.page import SkyvernFrame
 
@@ -69,22 +68,6 @@ ELEMENT_NODE_ATTRIBUTES = {
 }
 
 
-def load_js_script() -> str:
-    # TODO: Handle file location better. This is a hacky way to find the file location.
-    path = f"{SKYVERN_DIR}/webeye/scraper/domUtils.js"
-    try:
-        # TODO: Implement TS of domUtils.js and use the complied JS file instead of the raw JS file.
-        # This will allow our code to be type safe.
-        with open(path, "r") as f:
-            return f.read()
-    except FileNotFoundError as e:
-        LOG.exception("Failed to load the JS script", path=path)
-        raise e
-
-
-JS_FUNCTION_DEFS = load_js_script()
-
-
 # function to convert JSON element to HTML
 def build_attribute(key: str, value: Any) -> str:
     if isinstance(value, bool) or isinstance(value, int):
@@ -98,7 +81,8 @@ def json_to_html(element: dict, need_skyvern_attrs: bool = True) -> str:
     if element is flagged as dropped, the html format is empty
     """
     tag = element["tagName"]
-    attributes: dict[str, Any] = copy.deepcopy(element.get("attributes", {}))
+    # attribute values are immutable, so the attributes are only copied when they need to be changed
+    attributes: dict[str, Any] = element.get("attributes", {})
 
     interactable = element.get("interactable", False)
     if element.get("isDropped", False):
@@ -118,15 +102,13 @@ def json_to_html(element: dict, need_skyvern_attrs: bool = True) -> str:
         # adding "_" to make sure the variable name is valid.
         hashed_href = "_" + calculate_sha256(href)
         context.hashed_href_map[hashed_href] = href
-        attributes["href"] = "{{" + hashed_href + "}}"
+        attributes = {**attributes, "href": "{{" + hashed_href + "}}"}
 
     if need_skyvern_attrs:
         # adding the node attribute to attributes
-        for attr in ELEMENT_NODE_ATTRIBUTES:
-            value = element.get(attr)
-            if value is None:
-                continue
-            attributes[attr] = value
+        node_attributes = {attr: element[attr] for attr in ELEMENT_NODE_ATTRIBUTES if element.get(attr) is not None}
+        if node_attributes:
+            attributes = {**attributes, **node_attributes}
 
     attributes_html = " ".join(build_attribute(key, value) for key, value in attributes.items())
 
@@ -163,9 +145,51 @@ def json_to_html(element: dict, need_skyvern_attrs: bool = True) -> str:
         return f"<{tag}{attributes_html if not attributes_html else ' ' + attributes_html}>{before_pseudo_text}{text}{children_html + option_html}{after_pseudo_text}</{tag}>"
 
 
+def copy_element_tree(elements: list[dict]) -> list[dict]:
+    """
+    Copy the structure of the element tree: the element dicts, their attributes and children lists are new objects,
+    all the other values are shared with the original tree.
+    It's enough for the in-place cleanup and trimming, and much cheaper than copy.deepcopy.
+    """
+    copied_elements = []
+    for element in elements:
+        copied_element = dict(element)
+        if "attributes" in element:
+            copied_element["attributes"] = dict(element["attributes"])
+        if "children" in element:
+            copied_element["children"] = copy_element_tree(element["children"])
+        copied_elements.append(copied_element)
+    return copied_elements
+
+
+def build_economy_element_tree(elements: list[dict]) -> list[dict]:
+    """
+    Economy elements tree doesn't include secondary elements like SVG, etc.
+    The subtrees without any SVG are shared with the given tree instead of being copied.
+    """
+    economy_elements = []
+    for element in elements:
+        # Skip SVG elements entirely
+        if element.get("tagName", "").lower() == "svg":
+            continue
+
+        children = element.get("children")
+        if children:
+            economy_children = build_economy_element_tree(children)
+            if len(economy_children) != len(children) or any(
+                economy_child is not child for economy_child, child in zip(economy_children, children)
+            ):
+                element = {**element, "children": economy_children}
+        economy_elements.append(element)
+    return economy_elements
+
+
+HASHING_EXCLUDED_KEYS = {"id", "rect", "frame_index"}
+
+
 def clean_element_before_hashing(element: dict) -> dict:
     def clean_nested(element: dict) -> dict:
-        element_cleaned = {key: value for key, value in element.items() if key not in {"id", "rect", "frame_index"}}
+        element_cleaned = {key: value for key, value in element.items() if key not in HASHING_EXCLUDED_KEYS}
         if "attributes" in element:
             attributes_cleaned = {key: value for key, value in element["attributes"].items() if key != SKYVERN_ID_ATTR}
             element_cleaned["attributes"] = attributes_cleaned
@@ -177,12 +201,41 @@ def clean_element_before_hashing(element: dict) -> dict:
     return clean_nested(element)
 
 
-def hash_element(element: dict) -> str:
-    hash_ready_element = clean_element_before_hashing(element)
-    # Sort the keys to ensure consistent ordering
-    element_string = json.dumps(hash_ready_element, sort_keys=True)
+def serialize_element_for_hashing(element: dict, serialized_elements: dict[int, str] | None = None) -> str:
+    """
+    Produce exactly the same string as `json.dumps(clean_element_before_hashing(element), sort_keys=True)`,
+    but bottom-up: each child is serialized only once and reused by all its ancestors through serialized_elements.
+    """
+    if serialized_elements is None:
+        serialized_elements = {}
+
+    serialized = serialized_elements.get(id(element))
+    if serialized is not None:
+        return serialized
+
+    items: list[str] = []
+    for key in sorted(key for key in element if key not in HASHING_EXCLUDED_KEYS):
+        if key == "attributes":
+            attributes = {
+                attr_key: value for attr_key, value in element["attributes"].items() if attr_key != SKYVERN_ID_ATTR
+            }
+            value_str = json.dumps(attributes, sort_keys=True)
+        elif key == "children":
+            children_str = ", ".join(
+                serialize_element_for_hashing(child, serialized_elements) for child in element["children"]
+            )
+            value_str = f"[{children_str}]"
+        else:
+            value_str = json.dumps(element[key], sort_keys=True)
+        items.append(f"{json.dumps(key)}: {value_str}")
+
+    serialized = "{" + ", ".join(items) + "}"
+    serialized_elements[id(element)] = serialized
+    return serialized
+
 
-    return calculate_sha256(element_string)
+def hash_element(element: dict, serialized_elements: dict[int, str] | None = None) -> str:
+    return calculate_sha256(serialize_element_for_hashing(element, serialized_elements))
 
 
 def build_element_dict(
@@ -192,7 +245,9 @@ def build_element_dict(
     id_to_element_dict: dict[str, dict] = {}
     id_to_frame_dict: dict[str, str] = {}
     id_to_element_hash: dict[str, str] = {}
-    hash_to_element_ids: dict[str, list[str]] = {}
+    hash_to_element_ids: dict[str, list[str]] = defaultdict(list)
+    # elements share their subtrees with the ancestors, so every subtree is only serialized once
+    serialized_elements: dict[int, str] = {}
 
     for element in elements:
         element_id: str = element.get("id", "")
@@ -200,11 +255,11 @@ def build_element_dict(
         id_to_css_dict[element_id] = f"[{SKYVERN_ID_ATTR}='{element_id}']"
         id_to_element_dict[element_id] = element
         id_to_frame_dict[element_id] = element["frame"]
-        element_hash = hash_element(element)
+        element_hash = hash_element(element, serialized_elements)
         id_to_element_hash[element_id] = element_hash
-        hash_to_element_ids[element_hash] = hash_to_element_ids.get(element_hash, []) + [element_id]
+        hash_to_element_ids[element_hash].append(element_id)
 
-    return id_to_css_dict, id_to_element_dict, id_to_frame_dict, id_to_element_hash, hash_to_element_ids
+    return id_to_css_dict, id_to_element_dict, id_to_frame_dict, id_to_element_hash, dict(hash_to_element_ids)
 
 
 class ElementTreeFormat(StrEnum):
@@ -233,12 +288,16 @@ class ScrapedPage(BaseModel):
     element_tree: list[dict]
     element_tree_trimmed: list[dict]
     economy_element_tree: list[dict] | None = None
+    # the token count of the trimmed element tree html without the skyvern attrs, counted when taking the screenshots
+    element_tree_trimmed_token_count: int | None = None
     last_used_element_tree: list[dict] | None = None
     screenshots: list[bytes]
     url: str
     html: str
     extracted_text: str | None = None
     window_dimension: dict[str, int] | None = None
+    # seconds waited for the page to settle before scraping
+    page_settle_time: float | None = None
     _browser_state: BrowserState = PrivateAttr()
     _clean_up_func: CleanupElementTreeFunc = PrivateAttr()
     _scrape_exclude: ScrapeExcludeFunc | None = PrivateAttr(default=None)
@@ -274,59 +333,6 @@ class ScrapedPage(BaseModel):
 
         raise UnknownElementTreeFormat(fmt=fmt)
 
-    def build_economy_elements_tree(
-        self,
-        fmt: ElementTreeFormat = ElementTreeFormat.HTML,
-        html_need_skyvern_attrs: bool = True,
-        percent_to_keep: float = 1,
-    ) -> str:
-        """
-        Economy elements tree doesn't include secondary elements like SVG, etc
-        """
-        if not self.economy_element_tree:
-            economy_elements = []
-            copied_element_tree_trimmed = copy.deepcopy(self.element_tree_trimmed)
-
-            # Process each root element
-            for root_element in copied_element_tree_trimmed:
-                processed_element = self._process_element_for_economy_tree(root_element)
-                if processed_element:
-                    economy_elements.append(processed_element)
-
-            self.economy_element_tree = economy_elements
-
-        final_element_tree = self.economy_element_tree[: int(len(self.economy_element_tree) * percent_to_keep)]
-        self.last_used_element_tree = final_element_tree
-
-        if fmt == ElementTreeFormat.JSON:
-            return json.dumps(final_element_tree)
-
-        if fmt == ElementTreeFormat.HTML:
-            return "".join(
-                json_to_html(element, need_skyvern_attrs=html_need_skyvern_attrs) for element in final_element_tree
-            )
-
-        raise UnknownElementTreeFormat(fmt=fmt)
-
-    def _process_element_for_economy_tree(self, element: dict) -> dict | None:
-        """
-        Helper method to process an element for the economy tree using BFS.
-        Removes SVG elements and their children.
-        """
-        # Skip SVG elements entirely
-        if element.get("tagName", "").lower() == "svg":
-            return None
-
-        # Process children using BFS
-        if "children" in element:
-            new_children = []
-            for child in element["children"]:
-                processed_child = self._process_element_for_economy_tree(child)
-                if processed_child:
-                    new_children.append(processed_child)
-            element["children"] = new_children
-        return element
-
     async def refresh(self, draw_boxes: bool = True, scroll: bool = True) -> Self:
         refreshed_page = await scrape_website(
             browser_state=self._browser_state,
@@ -348,6 +354,7 @@ class ScrapedPage(BaseModel):
         self.html = refreshed_page.html
         self.extracted_text = refreshed_page.extracted_text
         self.url = refreshed_page.url
+        self.page_settle_time = refreshed_page.page_settle_time
         return self
 
     async def generate_scraped_page(
@@ -507,20 +514,20 @@ async def scrape_web_unsafe(
     # This also solves the issue where we can't scroll due to a popup.(e.g. geico first popup on the homepage after
     # clicking start my quote)
 
-    LOG.info("Waiting for 3 seconds before scraping the website.")
-    await asyncio.sleep(3)
+    page_settle_time = await SkyvernFrame.wait_for_page_settled(page=page)
 
     elements, element_tree = await get_interactable_element_tree(page, scrape_exclude)
-    element_tree = await cleanup_element_tree(page, url, copy.deepcopy(element_tree))
-    element_tree_trimmed = trim_element_tree(copy.deepcopy(element_tree))
+    element_tree = await cleanup_element_tree(page, url, copy_element_tree(element_tree))
+    element_tree_trimmed = trim_element_tree(copy_element_tree(element_tree))
 
     screenshots = []
+    element_tree_trimmed_token_count: int | None = None
     if take_screenshots:
         element_tree_trimmed_html_str = "".join(
             json_to_html(element, need_skyvern_attrs=False) for element in element_tree_trimmed
         )
-        token_count = count_tokens(element_tree_trimmed_html_str)
-        if token_count > DEFAULT_MAX_TOKENS:
+        element_tree_trimmed_token_count = await count_tokens_async(element_tree_trimmed_html_str)
+        if element_tree_trimmed_token_count > DEFAULT_MAX_TOKENS:
             max_screenshot_number = min(max_screenshot_number, 1)
 
         screenshots = await SkyvernFrame.take_split_screenshots(
@@ -562,11 +569,13 @@ async def scrape_web_unsafe(
         hash_to_element_ids=hash_to_element_ids,
         element_tree=element_tree,
         element_tree_trimmed=element_tree_trimmed,
+        element_tree_trimmed_token_count=element_tree_trimmed_token_count,
         screenshots=screenshots,
         url=page.url,
         html=html,
         extracted_text=text_content,
         window_dimension=window_dimension,
+        page_settle_time=page_settle_time,
         _browser_state=browser_state,
         _clean_up_func=cleanup_element_tree,
         _scrape_exclude=scrape_exclude,
@@ -598,42 +607,46 @@ async def filter_frames(frames: list[Frame], scrape_exclude: ScrapeExcludeFunc |
     return filtered_frames
 
 
-async def add_frame_interactable_elements(
-    frame: Frame,
+async def build_frame_element_tree(
+    frame: Page | Frame,
+    frame_name: str,
     frame_index: int,
-    elements: list[dict],
-    element_tree: list[dict],
 ) -> tuple[list[dict], list[dict]]:
     """
-    Add the interactable element of the frame to the elements and element_tree.
+    Build the elements and the element tree of a single frame.
+    """
+    reuse_clean_elements = "true" if settings.ENABLE_INCREMENTAL_SCRAPE else "false"
+    js_script = (
+        f"async () => await window.__skyvern.buildTreeFromBody('{frame_name}', {frame_index}, {reuse_clean_elements})"
+    )
+    return await SkyvernFrame.evaluate(frame=frame, expression=js_script, timeout_ms=BUILDING_ELEMENT_TREE_TIMEOUT_MS)
+
+
+async def get_frame_interactable_elements(
+    frame: Frame,
+    frame_index: int,
+) -> tuple[str | None, list[dict], list[dict]] | None:
+    """
+    Get the interactable elements of the frame.
+    :return: Tuple containing the unique_id of the frame element, the elements and the element tree of the frame.
+        None if the frame should be skipped.
     """
     try:
         frame_element = await frame.frame_element()
         # it will get stuck when we `frame.evaluate()` on an invisible iframe
         if not await frame_element.is_visible():
-            return elements, element_tree
+            return None
         unique_id = await frame_element.get_attribute("unique_id")
     except Exception:
         LOG.warning(
             "Unable to get unique_id from frame_element",
             exc_info=True,
         )
-        return elements, element_tree
-
-    frame_js_script = f"async () => await buildTreeFromBody('{unique_id}', {frame_index})"
-
-    await SkyvernFrame.evaluate(frame=frame, expression=JS_FUNCTION_DEFS)
-    frame_elements, frame_element_tree = await SkyvernFrame.evaluate(
-        frame=frame, expression=frame_js_script, timeout_ms=BUILDING_ELEMENT_TREE_TIMEOUT_MS
-    )
-
-    for element in elements:
-        if element["id"] == unique_id:
-            element["children"] = frame_element_tree
-
-    elements = elements + frame_elements
+        return None
 
-    return elements, element_tree
+    await SkyvernFrame.ensure_js_functions(frame=frame)
+    frame_elements, frame_element_tree = await build_frame_element_tree(frame, str(unique_id), frame_index)
+    return unique_id, frame_elements, frame_element_tree
 
 
 async def get_interactable_element_tree(
@@ -642,15 +655,13 @@ async def get_interactable_element_tree(
 ) -> tuple[list[dict], list[dict]]:
     """
     Get the element tree of the page, including all the elements that are interactable.
+    Child frames are scraped concurrently, each of them with its own timeout.
     :param page: Page instance to get the element tree from.
     :return: Tuple containing the element tree and a map of element IDs to elements.
     """
-    await SkyvernFrame.evaluate(frame=page, expression=JS_FUNCTION_DEFS)
+    await SkyvernFrame.ensure_js_functions(frame=page)
     # main page index is 0
-    main_frame_js_script = "async () => await buildTreeFromBody('main.frame', 0)"
-    elements, element_tree = await SkyvernFrame.evaluate(
-        frame=page, expression=main_frame_js_script, timeout_ms=BUILDING_ELEMENT_TREE_TIMEOUT_MS
-    )
+    elements, element_tree = await build_frame_element_tree(page, "main.frame", 0)
 
     context = skyvern_context.ensure_context()
     frames = await get_all_children_frames(page)
@@ -662,14 +673,48 @@ async def get_interactable_element_tree(
             frame_index = len(context.frame_index_map) + 1
             context.frame_index_map[frame] = frame_index
 
+    semaphore = asyncio.Semaphore(settings.MAX_CONCURRENT_FRAME_SCRAPING)
+    frame_tasks: dict[Frame, asyncio.Task[tuple[str | None, list[dict], list[dict]] | None]] = {}
+
+    async def scrape_frame(frame: Frame) -> tuple[str | None, list[dict], list[dict]] | None:
+        # the unique_id of the frame element is assigned when scraping the parent frame, so wait for the parent first
+        parent_task = frame_tasks.get(frame.parent_frame) if frame.parent_frame else None
+        if parent_task is not None:
+            await asyncio.wait([parent_task])
+
+        async with semaphore:
+            try:
+                async with asyncio.timeout(settings.FRAME_SCRAPING_TIMEOUT_MS / 1000):
+                    return await get_frame_interactable_elements(frame, context.frame_index_map[frame])
+            except (asyncio.TimeoutError, TimeoutError):
+                LOG.warning(
+                    "Timeout to scrape the frame, skipping it",
+                    frame_url=frame.url,
+                    timeout_ms=settings.FRAME_SCRAPING_TIMEOUT_MS,
+                )
+                return None
+
+    # frames are in BFS order, so the parent task is always created before its children
     for frame in frames:
-        frame_index = context.frame_index_map[frame]
-        elements, element_tree = await add_frame_interactable_elements(
-            frame,
-            frame_index,
-            elements,
-            element_tree,
-        )
+        frame_tasks[frame] = asyncio.create_task(scrape_frame(frame))
+    frame_results = await asyncio.gather(*frame_tasks.values(), return_exceptions=True)
+
+    id_to_element: dict[str, dict] = {element["id"]: element for element in elements}
+    frame_trees: list[tuple[str | None, list[dict]]] = []
+    for frame_result in frame_results:
+        if isinstance(frame_result, BaseException):
+            raise frame_result
+        if frame_result is None:
+            continue
+        unique_id, frame_elements, frame_element_tree = frame_result
+        for element in frame_elements:
+            id_to_element[element["id"]] = element
+        elements.extend(frame_elements)
+        frame_trees.append((unique_id, frame_element_tree))
+
+    for unique_id, frame_element_tree in frame_trees:
+        if unique_id is not None and unique_id in id_to_element:
+            id_to_element[unique_id]["children"] = frame_element_tree
 
     return elements, element_tree
 
@@ -695,7 +740,7 @@ class IncrementalScrapePage:
     ) -> list[dict]:
         frame = self.skyvern_frame.get_frame()
 
-        js_script = "async () => await getIncrementElements()"
+        js_script = "async () => await window.__skyvern.getIncrementElements()"
         try:
             incremental_elements, incremental_tree = await SkyvernFrame.evaluate(
                 frame=frame, expression=js_script, timeout_ms=BUILDING_ELEMENT_TREE_TIMEOUT_MS
@@ -705,7 +750,7 @@ class IncrementalScrapePage:
                 "Timeout to get incremental elements with wait_until_finished, going to get incremental elements without waiting",
             )
 
-            js_script = "async () => await getIncrementElements(false)"
+            js_script = "async () => await window.__skyvern.getIncrementElements(false)"
             incremental_elements, incremental_tree = await SkyvernFrame.evaluate(
                 frame=frame, expression=js_script, timeout_ms=BUILDING_ELEMENT_TREE_TIMEOUT_MS
             )
@@ -715,8 +760,8 @@ class IncrementalScrapePage:
 
         self.elements = incremental_elements
 
-        incremental_tree = await cleanup_element_tree(frame, frame.url, copy.deepcopy(incremental_tree))
-        trimmed_element_tree = trim_element_tree(copy.deepcopy(incremental_tree))
+        incremental_tree = await cleanup_element_tree(frame, frame.url, copy_element_tree(incremental_tree))
+        trimmed_element_tree = trim_element_tree(copy_element_tree(incremental_tree))
 
         self.element_tree = incremental_tree
         self.element_tree_trimmed = trimmed_element_tree
@@ -724,7 +769,7 @@ class IncrementalScrapePage:
         return self.element_tree_trimmed
 
     async def start_listen_dom_increment(self, element: ElementHandle | None = None) -> None:
-        js_script = "(element) => startGlobalIncrementalObserver(element)"
+        js_script = "(element) => window.__skyvern.startGlobalIncrementalObserver(element)"
         await SkyvernFrame.evaluate(frame=self.skyvern_frame.get_frame(), expression=js_script, arg=element)
 
     async def stop_listen_dom_increment(self) -> None:
@@ -732,7 +777,7 @@ class IncrementalScrapePage:
         js_script = "() => window.globalObserverForDOMIncrement === undefined"
         if await SkyvernFrame.evaluate(frame=self.skyvern_frame.get_frame(), expression=js_script):
             return
-        js_script = "async () => await stopGlobalIncrementalObserver()"
+        js_script = "async () => await window.__skyvern.stopGlobalIncrementalObserver()"
         await SkyvernFrame.evaluate(
             frame=self.skyvern_frame.get_frame(), expression=js_script, timeout_ms=BUILDING_ELEMENT_TREE_TIMEOUT_MS
         )
@@ -1,12 +1,15 @@
 from __future__ import annotations
 
 import asyncio
+import hashlib
+import re
 import time
 from typing import Any, Dict, List
+from weakref import WeakKeyDictionary, WeakSet
 
 import structlog
 from playwright._impl._errors import TimeoutError
-from playwright.async_api import ElementHandle, Frame, Page
+from playwright.async_api import BrowserContext, ElementHandle, Frame, Page, Request
 
 from skyvern.config import settings
 from skyvern.constants import BUILDING_ELEMENT_TREE_TIMEOUT_MS, PAGE_CONTENT_TIMEOUT, SKYVERN_DIR
@@ -28,7 +31,80 @@ def load_js_script() -> str:
         raise e
 
 
-JS_FUNCTION_DEFS = load_js_script()
+JS_FUNCTION_DEFS_VERSION = hashlib.sha256(load_js_script().encode()).hexdigest()[:16]
+# the functions declared at the top level of the script, they're exposed on JS_NAMESPACE
+JS_FUNCTION_NAMES = re.findall(r"^(?:async )?function (\w+)", load_js_script(), flags=re.MULTILINE)
+# the script runs in every document before the page's own scripts. its declarations are kept in a function scope,
+# so they can't clash with the globals of the page, and the page can't replace the functions we call
+JS_NAMESPACE = "window.__skyvern"
+# the namespace is set at the end of the script, so a partially loaded script is never treated as loaded
+JS_FUNCTION_DEFS = (
+    "(() => {\n"
+    + load_js_script()
+    + f'\n{JS_NAMESPACE} = Object.freeze({{ version: "{JS_FUNCTION_DEFS_VERSION}", {", ".join(JS_FUNCTION_NAMES)} }});\n'
+    + "})();\n"
+)
+
+_JS_FUNCTIONS_REGISTERED_CONTEXTS: WeakSet[BrowserContext] = WeakSet()
+
+
+async def register_js_functions(browser_context: BrowserContext) -> None:
+    """
+    Register the JS functions as an init script of the browser context, so every document (including iframes)
+    gets them before its own scripts run, and we don't need to send them through evaluate() again and again.
+    """
+    if browser_context in _JS_FUNCTIONS_REGISTERED_CONTEXTS:
+        return
+    await browser_context.add_init_script(script=JS_FUNCTION_DEFS)
+    _JS_FUNCTIONS_REGISTERED_CONTEXTS.add(browser_context)
+
+
+# long-lived connections never finish, they shouldn't block the page from settling
+IGNORED_SETTLE_RESOURCE_TYPES = {"websocket", "eventsource"}
+
+
+class PageNetworkActivity:
+    """
+    Track the in-flight requests of a page, so we can tell whether the network is quiet.
+    """
+
+    def __init__(self) -> None:
+        self.pending_requests: dict[Request, float] = {}
+        self.last_activity_time = time.monotonic()
+
+    def on_request(self, request: Request) -> None:
+        if request.resource_type in IGNORED_SETTLE_RESOURCE_TYPES:
+            return
+        self.pending_requests[request] = time.monotonic()
+        self.last_activity_time = time.monotonic()
+
+    def on_request_done(self, request: Request) -> None:
+        if self.pending_requests.pop(request, None) is not None:
+            self.last_activity_time = time.monotonic()
+
+    def count_pending_requests(self, max_age_seconds: float) -> int:
+        # requests pending for too long are most likely long polling, don't wait for them
+        now = time.monotonic()
+        return sum(1 for started_at in self.pending_requests.values() if now - started_at < max_age_seconds)
+
+    def idle_seconds(self) -> float:
+        return time.monotonic() - self.last_activity_time
+
+
+_PAGE_NETWORK_ACTIVITY: WeakKeyDictionary[Page, PageNetworkActivity] = WeakKeyDictionary()
+
+
+def track_page_network_activity(page: Page) -> PageNetworkActivity:
+    activity = _PAGE_NETWORK_ACTIVITY.get(page)
+    if activity is not None:
+        return activity
+
+    activity = PageNetworkActivity()
+    page.on("request", activity.on_request)
+    page.on("requestfinished", activity.on_request_done)
+    page.on("requestfailed", activity.on_request_done)
+    _PAGE_NETWORK_ACTIVITY[page] = activity
+    return activity
 
 
 class SkyvernFrame:
@@ -92,6 +168,61 @@ class SkyvernFrame:
             LOG.exception(f"Unknown error while taking screenshot: {str(e)}")
             raise FailedToTakeScreenshot(error_message=str(e)) from e
 
+    @staticmethod
+    async def wait_for_page_settled(
+        page: Page,
+        quiet_ms: float = settings.PAGE_SETTLE_QUIET_MS,
+        timeout_ms: float = settings.PAGE_SETTLE_TIMEOUT_MS,
+    ) -> float:
+        """
+        Wait until the page has been quiet (no pending requests, no DOM mutations and no running animations)
+        for quiet_ms, or until timeout_ms is reached.
+        :return: the waited time in seconds.
+        """
+        start_time = time.monotonic()
+        network_activity = track_page_network_activity(page)
+
+        settled = False
+        page_activity: dict = {}
+        pending_requests = 0
+        skyvern_page: SkyvernFrame | None = None
+        while True:
+            try:
+                if skyvern_page is None:
+                    skyvern_page = await SkyvernFrame.create_instance(frame=page)
+                page_activity = await skyvern_page.get_page_activity()
+            except Exception:
+                # the page could navigate away while waiting, inject the JS functions again in the next round
+                LOG.debug("Failed to get the page activity, the page is still changing", exc_info=True)
+                skyvern_page = None
+                page_activity = {}
+
+            pending_requests = network_activity.count_pending_requests(max_age_seconds=timeout_ms / 1000)
+            if (
+                pending_requests == 0
+                and network_activity.idle_seconds() * 1000 >= quiet_ms
+                and page_activity.get("msSinceLastMutation", 0) >= quiet_ms
+                and page_activity.get("runningAnimations", 0) == 0
+            ):
+                settled = True
+                break
+
+            elapsed_ms = (time.monotonic() - start_time) * 1000
+            if elapsed_ms >= timeout_ms:
+                break
+            await asyncio.sleep(min(settings.PAGE_SETTLE_POLL_INTERVAL_MS, timeout_ms - elapsed_ms) / 1000)
+
+        waited_time = time.monotonic() - start_time
+        LOG.info(
+            "Waited for the page to settle",
+            waited_time=waited_time,
+            settled=settled,
+            pending_requests=pending_requests,
+            ms_since_last_mutation=page_activity.get("msSinceLastMutation"),
+            running_animations=page_activity.get("runningAnimations"),
+        )
+        return waited_time
+
     @staticmethod
     async def take_split_screenshots(
         page: Page,
@@ -133,8 +264,7 @@ class SkyvernFrame:
                 await skyvern_page.remove_bounding_boxes()
             await skyvern_page.scroll_to_top(draw_boxes=False, frame=frame, frame_index=frame_index)
             # wait until animation ends, which is triggered by scrolling
-            LOG.debug("Waiting for 2 seconds until animation ends.")
-            await asyncio.sleep(2)
+            await SkyvernFrame.wait_for_page_settled(page=page, timeout_ms=settings.PAGE_SETTLE_AFTER_SCROLL_TIMEOUT_MS)
         else:
             if draw_boxes:
                 await skyvern_page.build_elements_and_draw_bounding_boxes(frame=frame, frame_index=frame_index)
@@ -148,10 +278,21 @@ class SkyvernFrame:
 
         return screenshots
 
+    @staticmethod
+    async def ensure_js_functions(frame: Page | Frame) -> None:
+        """
+        Inject the JS functions only when they're missing or outdated in the frame,
+        eg: the context is created without the init script or the frame was loaded before the registration.
+        """
+        js_script = f"(version) => {JS_NAMESPACE}?.version === version"
+        if await SkyvernFrame.evaluate(frame=frame, expression=js_script, arg=JS_FUNCTION_DEFS_VERSION):
+            return
+        await SkyvernFrame.evaluate(frame=frame, expression=JS_FUNCTION_DEFS)
+
     @classmethod
     async def create_instance(cls, frame: Page | Frame) -> SkyvernFrame:
         instance = cls(frame=frame)
-        await cls.evaluate(frame=instance.frame, expression=JS_FUNCTION_DEFS)
+        await cls.ensure_js_functions(frame=instance.frame)
         return instance
 
     def __init__(self, frame: Page | Frame) -> None:
@@ -165,41 +306,52 @@ class SkyvernFrame:
             return await self.frame.content()
 
     async def get_scroll_x_y(self) -> tuple[int, int]:
-        js_script = "() => getScrollXY()"
+        js_script = "() => window.__skyvern.getScrollXY()"
+        return await self.evaluate(frame=self.frame, expression=js_script)
+
+    async def get_page_activity(self) -> dict:
+        js_script = "async () => await window.__skyvern.getPageActivity()"
         return await self.evaluate(frame=self.frame, expression=js_script)
 
     async def scroll_to_x_y(self, x: int, y: int) -> None:
-        js_script = "([x, y]) => scrollToXY(x, y)"
+        js_script = "([x, y]) => window.__skyvern.scrollToXY(x, y)"
         return await self.evaluate(frame=self.frame, expression=js_script, arg=[x, y])
 
     async def scroll_to_element_bottom(self, element: ElementHandle, page_by_page: bool = False) -> None:
-        js_script = "([element, page_by_page]) => scrollToElementBottom(element, page_by_page)"
+        js_script = "([element, page_by_page]) => window.__skyvern.scrollToElementBottom(element, page_by_page)"
         return await self.evaluate(frame=self.frame, expression=js_script, arg=[element, page_by_page])
 
     async def scroll_to_element_top(self, element: ElementHandle) -> None:
-        js_script = "(element) => scrollToElementTop(element)"
+        js_script = "(element) => window.__skyvern.scrollToElementTop(element)"
         return await self.evaluate(frame=self.frame, expression=js_script, arg=element)
 
     async def parse_element_from_html(self, frame: str, element: ElementHandle, interactable: bool) -> Dict:
-        js_script = "async ([frame, element, interactable]) => await buildElementObject(frame, element, interactable)"
+        js_script = "async ([frame, element, interactable]) => await window.__skyvern.buildElementObject(frame, element, interactable)"
         return await self.evaluate(frame=self.frame, expression=js_script, arg=[frame, element, interactable])
 
     async def get_element_scrollable(self, element: ElementHandle) -> bool:
-        js_script = "(element) => isScrollable(element)"
+        js_script = "(element) => window.__skyvern.isScrollable(element)"
         return await self.evaluate(frame=self.frame, expression=js_script, arg=element)
 
     async def get_element_visible(self, element: ElementHandle) -> bool:
-        js_script = "(element) => isElementVisible(element) && !isHidden(element)"
+        js_script = "(element) => window.__skyvern.isElementVisible(element) && !window.__skyvern.isHidden(element)"
         return await self.evaluate(frame=self.frame, expression=js_script, arg=element)
 
     async def get_disabled_from_style(self, element: ElementHandle) -> bool:
-        js_script = "(element) => checkDisabledFromStyle(element)"
+        js_script = "(element) => window.__skyvern.checkDisabledFromStyle(element)"
         return await self.evaluate(frame=self.frame, expression=js_script, arg=element)
 
     async def get_blocking_element_id(self, element: ElementHandle) -> tuple[str, bool]:
-        js_script = "(element) => getBlockElementUniqueID(element)"
+        js_script = "(element) => window.__skyvern.getBlockElementUniqueID(element)"
         return await self.evaluate(frame=self.frame, expression=js_script, arg=element)
 
+    async def get_shape_elements_state(self, unique_ids: list[str]) -> dict[str, dict[str, bool] | None]:
+        """
+        :return: {"visible": bool, "blocked": bool} by unique id, None if the element isn't found in the light DOM.
+        """
+        js_script = "(unique_ids) => window.__skyvern.getShapeElementsState(unique_ids)"
+        return await self.evaluate(frame=self.frame, expression=js_script, arg=unique_ids)
+
     async def scroll_to_top(self, draw_boxes: bool, frame: str, frame_index: int) -> float:
         """
         Scroll to the top of the page and take a screenshot.
@@ -207,7 +359,7 @@ class SkyvernFrame:
         :param page: Page instance to take the screenshot from.
         :return: Screenshot of the page.
         """
-        js_script = "async ([draw_boxes, frame, frame_index]) => await safeScrollToTop(draw_boxes, frame, frame_index)"
+        js_script = "async ([draw_boxes, frame, frame_index]) => await window.__skyvern.safeScrollToTop(draw_boxes, frame, frame_index)"
         scroll_y_px = await self.evaluate(
             frame=self.frame,
             expression=js_script,
@@ -223,7 +375,7 @@ class SkyvernFrame:
         :param page: Page instance to take the screenshot from.
         :return: Screenshot of the page.
         """
-        js_script = "async ([draw_boxes, frame, frame_index]) => await scrollToNextPage(draw_boxes, frame, frame_index)"
+        js_script = "async ([draw_boxes, frame, frame_index]) => await window.__skyvern.scrollToNextPage(draw_boxes, frame, frame_index)"
         scroll_y_px = await self.evaluate(
             frame=self.frame,
             expression=js_script,
@@ -237,11 +389,11 @@ class SkyvernFrame:
         Remove the bounding boxes from the page.
         :param page: Page instance to remove the bounding boxes from.
         """
-        js_script = "() => removeBoundingBoxes()"
+        js_script = "() => window.__skyvern.removeBoundingBoxes()"
         await self.evaluate(frame=self.frame, expression=js_script, timeout_ms=BUILDING_ELEMENT_TREE_TIMEOUT_MS)
 
     async def build_elements_and_draw_bounding_boxes(self, frame: str, frame_index: int) -> None:
-        js_script = "async ([frame, frame_index]) => await buildElementsAndDrawBoundingBoxes(frame, frame_index)"
+        js_script = "async ([frame, frame_index]) => await window.__skyvern.buildElementsAndDrawBoundingBoxes(frame, frame_index)"
         await self.evaluate(
             frame=self.frame,
             expression=js_script,
@@ -250,19 +402,19 @@ class SkyvernFrame:
         )
 
     async def is_window_scrollable(self) -> bool:
-        js_script = "() => isWindowScrollable()"
+        js_script = "() => window.__skyvern.isWindowScrollable()"
         return await self.evaluate(frame=self.frame, expression=js_script)
 
     async def is_parent(self, parent: ElementHandle, child: ElementHandle) -> bool:
-        js_script = "([parent, child]) => isParent(parent, child)"
+        js_script = "([parent, child]) => window.__skyvern.isParent(parent, child)"
         return await self.evaluate(frame=self.frame, expression=js_script, arg=[parent, child])
 
     async def is_sibling(self, el1: ElementHandle, el2: ElementHandle) -> bool:
-        js_script = "([el1, el2]) => isSibling(el1, el2)"
+        js_script = "([el1, el2]) => window.__skyvern.isSibling(el1, el2)"
         return await self.evaluate(frame=self.frame, expression=js_script, arg=[el1, el2])
 
     async def has_ASP_client_control(self) -> bool:
-        js_script = "() => hasASPClientControl()"
+        js_script = "() => window.__skyvern.hasASPClientControl()"
         return await self.evaluate(frame=self.frame, expression=js_script)
 
     async def click_element_in_javascript(self, element: ElementHandle) -> None: